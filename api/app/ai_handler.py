@@ -3,10 +3,15 @@
 import asyncio
 import logging
 import json
-from typing import List, Dict, Any
-from openai import OpenAI
+import time
+import weakref
+from collections import deque
+from typing import Deque, List, Dict, Any, Optional, Tuple
+from openai import OpenAI, APIStatusError, APITimeoutError, RateLimitError
 from pydantic import BaseModel, Field
 from datetime import datetime
+from .concurrency import AdaptiveConcurrencyLimiter, ConcurrencyLimitExceeded
+from .metrics import metrics
 
 logger = logging.getLogger("ella_app")
 
@@ -19,12 +24,29 @@ class NPCResponse(BaseModel):
     action: NPCAction
     internal_state: Dict[str, Any] = Field(default_factory=dict)
 
+def is_overload_error(error: Exception) -> bool:
+    """Whether an OpenAI error means the upstream is saturated (429/5xx/timeout)"""
+    if isinstance(error, (RateLimitError, APITimeoutError, asyncio.TimeoutError)):
+        return True
+    return isinstance(error, APIStatusError) and error.status_code >= 500
+
+# Failures older than this drop out of ``recent_failures``
+FAILURE_WINDOW_SECONDS = 60.0
+
 class AIHandler:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, request_timeout: float = 15.0):
         self.client = OpenAI(api_key=api_key)
+        # (monotonic time, kind) of recent timeouts, sheds and errors
+        self.failures: Deque[Tuple[float, str]] = deque(maxlen=1000)
+        self.last_error: Optional[str] = None
+        _handlers.add(self)
         self.response_cache = {}
         self.max_parallel_requests = 5
-        self.semaphore = asyncio.Semaphore(self.max_parallel_requests)
+        self.request_timeout = request_timeout
+        self.limiter = AdaptiveConcurrencyLimiter(
+            initial_limit=self.max_parallel_requests,
+            max_limit=self.max_parallel_requests * 4
+        )
 
         # Define the response schema once
         self.response_schema = {
@@ -66,12 +88,42 @@ class AIHandler:
         self,
         messages: List[Dict[str, str]],
         system_prompt: str,
-        max_tokens: int = 200
+        max_tokens: int = 200,
+        timeout: Optional[float] = None
+    ) -> NPCResponse:
+        """Get structured response from OpenAI within a per-request deadline"""
+        if timeout is None:
+            timeout = self.request_timeout
+        deadline = time.monotonic() + timeout
+        try:
+            return await asyncio.wait_for(
+                self._limited_response(messages, system_prompt, max_tokens, deadline),
+                timeout=timeout
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"AI response timed out after {timeout:.1f}s")
+            self._record_failure("timeout")
+            return self._timeout_response()
+        except ConcurrencyLimitExceeded as e:
+            logger.warning(f"Shedding AI request: {e}")
+            self._record_failure("shed")
+            return NPCResponse(
+                message="Give me just a moment...",
+                action=NPCAction(type="none"),
+                internal_state={"shed": True}
+            )
+
+    async def _limited_response(
+        self,
+        messages: List[Dict[str, str]],
+        system_prompt: str,
+        max_tokens: int,
+        deadline: float
     ) -> NPCResponse:
-        """Get structured response from OpenAI"""
+        """Run one completion inside a limiter slot"""
         try:
-            async with self.semaphore:
-                completion = await asyncio.to_thread(
+            with metrics.timer("openai", "chat.completions"):
+                completion = await self.limiter.run_in_thread(
                     self.client.chat.completions.create,
                     model="gpt-4o-mini",
                     messages=[
@@ -80,50 +132,123 @@ class AIHandler:
                     ],
                     max_tokens=max_tokens,
                     response_format=self.response_schema,
-                    temperature=0.7
+                    temperature=0.7,
+                    timeout=max(deadline - time.monotonic(), 0.1),
+                    is_overload=is_overload_error
                 )
 
-                # Check for refusal
-                if hasattr(completion.choices[0].message, 'refusal') and completion.choices[0].message.refusal:
-                    logger.warning("AI refused to respond")
-                    return NPCResponse(
-                        message="I cannot respond to that request.",
-                        action=NPCAction(type="none")
-                    )
-
-                # Check for incomplete response
-                if completion.choices[0].finish_reason != "stop":
-                    logger.warning(f"Response incomplete: {completion.choices[0].finish_reason}")
-                    return NPCResponse(
-                        message="I apologize, but I was unable to complete my response.",
-                        action=NPCAction(type="none")
-                    )
-
-                # Parse the response into our Pydantic model
-                response_data = completion.choices[0].message.content
-                logger.debug(f"Raw AI response: {response_data}")
-                
-                return NPCResponse(**json.loads(response_data))
+            # Check for refusal
+            if hasattr(completion.choices[0].message, 'refusal') and completion.choices[0].message.refusal:
+                logger.warning("AI refused to respond")
+                return NPCResponse(
+                    message="I cannot respond to that request.",
+                    action=NPCAction(type="none")
+                )
+
+            # Check for incomplete response
+            if completion.choices[0].finish_reason != "stop":
+                logger.warning(f"Response incomplete: {completion.choices[0].finish_reason}")
+                return NPCResponse(
+                    message="I apologize, but I was unable to complete my response.",
+                    action=NPCAction(type="none")
+                )
 
+            # Parse the response into our Pydantic model
+            response_data = completion.choices[0].message.content
+            logger.debug(f"Raw AI response: {response_data}")
+            
+            return NPCResponse(**json.loads(response_data))
+
+        except (asyncio.CancelledError, ConcurrencyLimitExceeded):
+            raise
         except Exception as e:
             logger.error(f"Error getting AI response: {str(e)}", exc_info=True)
+            self._record_failure("error", e)
             return NPCResponse(
                 message="Hello! How can I help you today?",
                 action=NPCAction(type="none")
             )
 
+    def _record_failure(self, kind: str, error: Optional[Exception] = None):
+        self.failures.append((time.monotonic(), kind))
+        if error is not None:
+            self.last_error = f"{type(error).__name__}: {error}"
+
+    def _timeout_response(self) -> NPCResponse:
+        return NPCResponse(
+            message="Hmm, let me think about that...",
+            action=NPCAction(type="none"),
+            internal_state={"timed_out": True}
+        )
+
     async def process_parallel_responses(
         self,
-        requests: List[Dict[str, Any]]
+        requests: List[Dict[str, Any]],
+        timeout: Optional[float] = None
     ) -> List[NPCResponse]:
-        """Process multiple requests in parallel"""
+        """Process multiple requests in parallel, returning partial results on timeout
+
+        Each request may carry its own ``timeout``; ``timeout`` here bounds the
+        whole batch. Requests still running at the batch deadline are cancelled
+        and answered with a fallback response so callers always get one result
+        per request, in order.
+        """
         tasks = [
-            self.get_response(
+            asyncio.create_task(self.get_response(
                 req["messages"],
                 req["system_prompt"],
-                req.get("max_tokens", 200)
-            )
+                req.get("max_tokens", 200),
+                req.get("timeout")
+            ))
             for req in requests
         ]
-        
-        return await asyncio.gather(*tasks)
\ No newline at end of file
+        if not tasks:
+            return []
+
+        done, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+            logger.warning(
+                f"Batch deadline hit: {len(done)}/{len(tasks)} responses completed, "
+                f"queue depth {self.limiter.queue_depth}"
+            )
+
+        return [
+            task.result() if task in done else self._timeout_response()
+            for task in tasks
+        ]
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get concurrency metrics and recent failures for monitoring"""
+        cutoff = time.monotonic() - FAILURE_WINDOW_SECONDS
+        recent: Dict[str, int] = {"timeout": 0, "shed": 0, "error": 0}
+        for failed_at, kind in list(self.failures):
+            if failed_at >= cutoff:
+                recent[kind] += 1
+        return {
+            **self.limiter.get_metrics(),
+            "recent_failures": recent,
+            "last_error": self.last_error
+        }
+
+# Every live handler, so health checks can report on them
+_handlers: "weakref.WeakSet[AIHandler]" = weakref.WeakSet()
+
+def openai_health() -> Dict[str, Any]:
+    """Limiter state and recent failures summed over the live handlers"""
+    handlers = [handler.get_metrics() for handler in list(_handlers)]
+    recent = {"timeout": 0, "shed": 0, "error": 0}
+    for handler in handlers:
+        for kind, count in handler["recent_failures"].items():
+            recent[kind] += count
+    return {
+        "handlers": len(handlers),
+        "limit": sum(handler["limit"] for handler in handlers),
+        "in_flight": sum(handler["in_flight"] for handler in handlers),
+        "queue_depth": sum(handler["queue_depth"] for handler in handlers),
+        "saturated": any(handler["in_flight"] >= handler["limit"] for handler in handlers),
+        "recent_failures": recent,
+        "last_error": next((handler["last_error"] for handler in handlers if handler["last_error"]), None)
+    }
\ No newline at end of file
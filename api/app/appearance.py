@@ -0,0 +1,148 @@
+"""Appearance descriptions for group payloads, pre-summarized
+
+Group updates name members by display name, and a member may be an NPC or a
+player. ``AppearanceDirectory`` answers by id or display name with the short
+form embedded in group blocks.
+
+NPC appearances are held in memory and rebuilt from the NPC directory
+whenever it is replaced. Players go through the bounded, TTL-expiring
+PLAYER_CACHE by id and a matching cache by display name, both falling back
+to SQLite, so a description stored by another worker shows up once the entry
+expires, and renamed players stop answering to their old name.
+``prefetch`` fills both caches for a whole group in one batched query each.
+Async handlers prefetch in a thread and then build payloads with
+``cached_summary``, which never touches SQLite.
+"""
+import logging
+import re
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .cache import PLAYER_CACHE, NPCDirectory, PlayerCache, get_npc_directory
+from .config import APPEARANCE_SUMMARY_CHARS, PLAYER_CACHE_MAX_SIZE
+from .database import get_player_infos_by_name
+
+logger = logging.getLogger("roblox_app")
+
+def summarize_appearance(description: str, limit: int = APPEARANCE_SUMMARY_CHARS) -> str:
+    """Collapse whitespace and cut at a word boundary to fit ``limit`` characters"""
+    text = re.sub(r"\s+", " ", description or "").strip()
+    if len(text) <= limit:
+        return text
+    cut = text.rfind(" ", 0, limit - 3)
+    return text[:cut if cut > 0 else limit - 3].rstrip(" ,.;:") + "..."
+
+@dataclass(frozen=True)
+class Appearance:
+    """A description and the summary embedded in group blocks"""
+    description: str
+    summary: str
+
+    @classmethod
+    def of(cls, description: str) -> "Appearance":
+        return _appearance(description or "")
+
+@lru_cache(maxsize=PLAYER_CACHE_MAX_SIZE)
+def _appearance(description: str) -> Appearance:
+    """Summaries are computed once per distinct description"""
+    return Appearance(description, summarize_appearance(description))
+
+class PlayerNameCache(PlayerCache):
+    """PlayerCache keyed by display name; entries carry the player_id"""
+
+    def _fetch(self, display_names: List[str]) -> Dict[str, dict]:
+        return get_player_infos_by_name(display_names)
+
+class AppearanceDirectory:
+    """NPC and player appearances by id and display name
+
+    NPC maps are replaced rather than edited in place, so lookups need no
+    lock. NPC names are scoped per game; players are not tied to a game.
+    """
+
+    def __init__(self, players: Optional[PlayerCache] = None, names: Optional[PlayerCache] = None):
+        self._npc_source: Optional[NPCDirectory] = None
+        self._npcs_by_id: Dict[str, Appearance] = {}
+        self._npcs_by_name: Dict[Tuple[int, str], Appearance] = {}
+        self._players = PLAYER_CACHE if players is None else players
+        self._names = PlayerNameCache() if names is None else names
+        self._lock = threading.Lock()  # Serializes NPC map rebuilds
+
+    def _npcs(self, game_id: Optional[int]):
+        """NPC maps for the current NPC directory, rebuilt if it was replaced"""
+        directory = get_npc_directory()
+        if directory is not self._npc_source:
+            with self._lock:
+                if directory is not self._npc_source:
+                    by_id, by_name = {}, {}
+                    for entry in directory.entries():
+                        appearance = Appearance.of(entry.description)
+                        by_id[entry.npc_id] = appearance
+                        by_name[(entry.game_id, entry.display_name)] = appearance
+                    self._npcs_by_id, self._npcs_by_name = by_id, by_name
+                    self._npc_source = directory
+        game = directory.default_game_id if game_id is None else game_id
+        return self._npcs_by_id, self._npcs_by_name, game
+
+    def _npc(self, key: str, game_id: Optional[int]) -> Optional[Appearance]:
+        npcs_by_id, npcs_by_name, game = self._npcs(game_id)
+        return npcs_by_name.get((game, key)) or npcs_by_id.get(key)
+
+    def _by_name(self, name: str, info: Optional[dict]) -> Optional[dict]:
+        """A display-name entry, unless the player has since been renamed"""
+        if not info:
+            return None
+        current = self._players.peek(info["player_id"])
+        if current is not None and current.get("display_name") not in (None, name):
+            self._names.invalidate(name)
+            return None
+        return info
+
+    def _player(self, key: str) -> Optional[Appearance]:
+        info = self._players.lookup(key) or self._by_name(key, self._names.lookup(key))
+        return Appearance.of(info.get("description")) if info else None
+
+    def _cached_player(self, key: str) -> Optional[Appearance]:
+        info = self._players.peek(key) or self._by_name(key, self._names.peek(key))
+        return Appearance.of(info.get("description")) if info else None
+
+    def prefetch(self, keys: Iterable[str], game_id: Optional[int] = None):
+        """Load every player among ``keys`` (ids or names) with one query per cache"""
+        keys = [key for key in dict.fromkeys(keys) if self._npc(key, game_id) is None]
+        if not keys:
+            return
+        found = self._players.lookup_many(keys)
+        names = [key for key in keys if found.get(key) is None]
+        if names:
+            self._names.lookup_many(names)
+
+    def set_player(self, player_id: str, description: str, display_name: Optional[str] = None):
+        """Record a newly stored player description"""
+        fields = {"description": description}
+        if display_name:
+            fields["display_name"] = display_name
+            self._names.update(display_name, player_id=player_id, **fields)
+        self._players.update(player_id, **fields)
+
+    def get(self, key: str, game_id: Optional[int] = None) -> Optional[Appearance]:
+        """Appearance for an NPC or player, by id or display name"""
+        return self._npc(key, game_id) or self._player(key)
+
+    def summary(self, key: str, game_id: Optional[int] = None, default: str = "") -> str:
+        """Short appearance for a group block (blocking: may query SQLite)"""
+        appearance = self.get(key, game_id)
+        return appearance.summary if appearance and appearance.summary else default
+
+    def cached_summary(self, key: str, game_id: Optional[int] = None, default: str = "") -> str:
+        """Short appearance from memory only; ``default`` for players not loaded yet"""
+        appearance = self._npc(key, game_id) or self._cached_player(key)
+        return appearance.summary if appearance and appearance.summary else default
+
+    def stats(self) -> Dict[str, int]:
+        npcs_by_id, _, _ = self._npcs(None)
+        return {"npcs": len(npcs_by_id), "players": len(self._players), "player_names": len(self._names)}
+
+# Global appearance directory
+appearances = AppearanceDirectory()
@@ -1,24 +1,180 @@
-"""In-memory cache for static game data"""
+"""In-memory cache for static game data
+
+NPC and location data is cached per game. The default game (DEFAULT_GAME_ID)
+is loaded at startup and backs the module-level NPC_CACHE/LOCATION_CACHE
+dicts; any other game is loaded the first time a request names it and is
+evicted again once idle. NPC ids are unique across games, so AGENT_ID_CACHE
+stays a single process-wide map.
+
+Edits are applied row by row through ``publish_change``: the dashboard
+publishes after each write, and cache_poller picks up writes from other
+processes. After every change an immutable ``NPCDirectory`` is rebuilt and
+swapped in, giving lock-free lookups by name, npc_id, agent_id and asset_id.
+"""
+import asyncio
 import logging
-from typing import Dict, Optional, List
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Callable, Dict, Iterable, Optional, List, Set, Tuple
+from .config import (
+    DEFAULT_GAME_ID,
+    GAME_CACHE_MAX_GAMES,
+    GAME_CACHE_IDLE_SECONDS,
+    PLAYER_CACHE_MAX_SIZE,
+    PLAYER_CACHE_TTL_SECONDS,
+    PLAYER_CACHE_NEGATIVE_TTL_SECONDS
+)
 from .database import (
     get_db, 
     get_all_locations, 
-    get_player_info as db_get_player_info,
-    get_player_description as db_get_player_description
+    get_player_infos as db_get_player_infos
 )
+from .logging_utils import get_logger
+from .metrics import metrics
 
 logger = logging.getLogger("roblox_app")
+cache_logger = get_logger("cache")
+
+class PlayerCache:
+    """LRU cache of player_descriptions rows with TTL expiry
+
+    Players that are not in the database are cached as missing for a much
+    shorter ``negative_ttl_seconds``, so repeated lookups for an unknown id
+    (or a display name passed where an id was expected) stop hitting SQLite.
+    """
+
+    def __init__(
+        self,
+        max_size: int = PLAYER_CACHE_MAX_SIZE,
+        ttl_seconds: float = PLAYER_CACHE_TTL_SECONDS,
+        negative_ttl_seconds: float = PLAYER_CACHE_NEGATIVE_TTL_SECONDS
+    ):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        # player_id -> (expires_at, info); info is None for a known-missing player
+        self._entries: "OrderedDict[str, Tuple[float, Optional[dict]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _cached(self, player_id: str, now: float):
+        """(found, info) for a live entry; caller holds the lock"""
+        entry = self._entries.get(player_id)
+        if entry is None:
+            return False, None
+        expires_at, info = entry
+        if expires_at <= now:
+            del self._entries[player_id]
+            return False, None
+        self._entries.move_to_end(player_id)
+        if info is None:
+            self.negative_hits += 1
+        else:
+            self.hits += 1
+        return True, info
+
+    def _store(self, player_id: str, info: Optional[dict], now: float):
+        """Insert or replace an entry and trim to max_size; caller holds the lock"""
+        ttl = self.ttl_seconds if info is not None else self.negative_ttl_seconds
+        self._entries[player_id] = (now + ttl, info)
+        self._entries.move_to_end(player_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _fetch(self, player_ids: List[str]) -> Dict[str, dict]:
+        """Rows for the given keys in one batched query; unknown keys are omitted"""
+        return db_get_player_infos(player_ids)
+
+    def lookup(self, player_id: str) -> Optional[dict]:
+        """Player info from cache, falling back to the DB; None if the player is unknown"""
+        with self._lock:
+            found, info = self._cached(player_id, time.monotonic())
+            if found:
+                return info
+            self.misses += 1
+
+        info = self._fetch([player_id]).get(player_id)
+        with self._lock:
+            self._store(player_id, info, time.monotonic())
+        return info
+
+    def lookup_many(self, player_ids: List[str]) -> Dict[str, Optional[dict]]:
+        """Info for every id, fetching all misses in one batched query"""
+        results: Dict[str, Optional[dict]] = {}
+        missing = []
+        with self._lock:
+            now = time.monotonic()
+            for player_id in dict.fromkeys(player_ids):
+                found, info = self._cached(player_id, now)
+                if found:
+                    results[player_id] = info
+                else:
+                    missing.append(player_id)
+            self.misses += len(missing)
+
+        if missing:
+            fetched = self._fetch(missing)
+            with self._lock:
+                now = time.monotonic()
+                for player_id in missing:
+                    info = fetched.get(player_id)
+                    self._store(player_id, info, now)
+                    results[player_id] = info
+        return results
+
+    def peek(self, player_id: str) -> Optional[dict]:
+        """Cached info without touching the DB or the stats"""
+        with self._lock:
+            entry = self._entries.get(player_id)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+
+    def update(self, player_id: str, /, **fields):
+        """Merge fields into a player's entry (creating it), resetting its TTL"""
+        with self._lock:
+            entry = self._entries.get(player_id)
+            info = dict(entry[1]) if entry is not None and entry[1] is not None else {}
+            info.update(fields)
+            self._store(player_id, info, time.monotonic())
+
+    def invalidate(self, player_id: str) -> bool:
+        with self._lock:
+            return self._entries.pop(player_id, None) is not None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __contains__(self, player_id: str) -> bool:
+        return self.peek(player_id) is not None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round((self.hits + self.negative_hits) / lookups, 4) if lookups else 0.0
+        }
 
 # Standardized cache structures
-PLAYER_CACHE: Dict[str, dict] = {
-    # player_id: {
-    #     'id': str,
-    #     'display_name': str,
-    #     'description': str
-    # }
-}
+PLAYER_CACHE = PlayerCache()  # player_id -> {'description': str, 'display_name': str}
 
+# Default game's NPCs
 NPC_CACHE: Dict[str, dict] = {
     # display_name: {
     #     'id': str,
@@ -31,6 +187,7 @@ AGENT_ID_CACHE: Dict[str, str] = {
     # npc_id: agent_id
 }
 
+# Default game's locations
 LOCATION_CACHE: Dict[str, dict] = {
     # slug: {
     #     'name': str,
@@ -38,183 +195,544 @@ LOCATION_CACHE: Dict[str, dict] = {
     # }
 }
 
-def init_static_cache():
-    """Initialize static data caches on server boot"""
-    logger.info("Initializing static data caches...")
-    refresh_npc_cache()
-    refresh_location_cache()
+NPC_QUERY = """
+    SELECT 
+        n.npc_id,
+        n.display_name,
+        n.system_prompt,
+        n.asset_id,
+        a.description as asset_description
+    FROM npcs n
+    LEFT JOIN assets a ON n.asset_id = a.asset_id AND a.game_id = n.game_id
+    WHERE n.game_id = ?
+"""
 
-def refresh_npc_cache():
-    """Refresh NPC and agent caches"""
-    GAME_ID = 74  # Hardcode for now
-    try:
+AGENT_MAPPING_QUERY = """
+    SELECT a.npc_id, a.letta_agent_id
+    FROM npc_agents a
+    JOIN npcs n ON n.npc_id = a.npc_id
+    WHERE a.participant_id = 'letta_v3' AND n.game_id = ?
+"""
+
+@dataclass(frozen=True)
+class CacheChange:
+    """A row in npcs, assets or npc_agents changed and should be re-read"""
+    table: str
+    key: str  # npc_id or asset_id
+    game_id: Optional[int] = None
+
+@dataclass(frozen=True)
+class NPCEntry:
+    """One NPC as seen by the directory"""
+    npc_id: str
+    game_id: int
+    display_name: str
+    asset_id: Optional[str]
+    agent_id: Optional[str]
+    description: str = ''
+
+class NPCDirectory:
+    """Read-only NPC lookups in every direction
+
+    Built in one pass from the game caches and never modified afterwards;
+    a change builds a new directory and swaps the module reference, so a
+    reader holding one always sees a consistent view without locking.
+    Display names are only unique within a game, so name and asset lookups
+    take a game id (the default game when None).
+    """
+
+    def __init__(self, entries: Iterable[NPCEntry] = (), default_game_id: int = DEFAULT_GAME_ID):
+        self.default_game_id = default_game_id
+        by_id, by_agent, by_name, by_asset = {}, {}, {}, {}
+        for entry in entries:
+            by_id[entry.npc_id] = entry
+            by_name[(entry.game_id, entry.display_name)] = entry
+            if entry.agent_id:
+                by_agent[entry.agent_id] = entry
+            if entry.asset_id:
+                by_asset.setdefault((entry.game_id, entry.asset_id), []).append(entry)
+        self._by_id = MappingProxyType(by_id)
+        self._by_agent = MappingProxyType(by_agent)
+        self._by_name = MappingProxyType(by_name)
+        self._by_asset = MappingProxyType({key: tuple(entries) for key, entries in by_asset.items()})
+
+    def _game(self, game_id: Optional[int]) -> int:
+        return self.default_game_id if game_id is None else game_id
+
+    def by_npc_id(self, npc_id: str) -> Optional[NPCEntry]:
+        return self._by_id.get(npc_id)
+
+    def by_agent_id(self, agent_id: str) -> Optional[NPCEntry]:
+        return self._by_agent.get(agent_id)
+
+    def by_name(self, display_name: str, game_id: Optional[int] = None) -> Optional[NPCEntry]:
+        return self._by_name.get((self._game(game_id), display_name))
+
+    def by_asset_id(self, asset_id: str, game_id: Optional[int] = None) -> Tuple[NPCEntry, ...]:
+        return self._by_asset.get((self._game(game_id), asset_id), ())
+
+    def agent_for_name(self, display_name: str, game_id: Optional[int] = None) -> Optional[str]:
+        entry = self.by_name(display_name, game_id)
+        return entry.agent_id if entry else None
+
+    def name_for_agent(self, agent_id: str) -> Optional[str]:
+        entry = self._by_agent.get(agent_id)
+        return entry.display_name if entry else None
+
+    def entries(self) -> Iterable[NPCEntry]:
+        return self._by_id.values()
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+class GameCache:
+    """Static NPC and location data for one game"""
+
+    def __init__(self, game_id: int, npcs: Optional[Dict[str, dict]] = None, locations: Optional[Dict[str, dict]] = None):
+        self.game_id = game_id
+        self.npcs: Dict[str, dict] = npcs if npcs is not None else {}
+        self.locations: Dict[str, dict] = locations if locations is not None else {}
+        self.loaded = False
+        self.last_used = time.monotonic()
+        # npc_id -> (display_name, asset_id) and asset_id -> location slug,
+        # so a single changed row can be found and replaced
+        self._npc_index: Dict[str, Tuple[str, str]] = {}
+        self._location_assets: Dict[str, str] = {}
+        # Serializes reloads (dashboard publish vs. change poller); reads take no lock
+        self._reload_lock = threading.RLock()
+
+    def load(self):
+        self.load_npcs()
+        self.load_locations()
+        self.loaded = True
+
+    def _fetch_npcs(self, clause: str = "", params: tuple = ()):
         with get_db() as db:
-            # Get agent mappings directly first
-            cursor = db.execute("""
-                SELECT npc_id, letta_agent_id 
-                FROM npc_agents 
-                WHERE participant_id = 'letta_v3'
-            """)
-            agent_mappings = {row['npc_id']: row['letta_agent_id'] for row in cursor.fetchall()}
-            logger.info("=== Agent Mappings from DB ===")
-            for npc_id, agent_id in agent_mappings.items():
-                logger.info(f"{npc_id} -> {agent_id}")
-
-            # Then get NPC data
-            cursor = db.execute("""
-                SELECT 
-                    n.npc_id,
-                    n.display_name,
-                    n.system_prompt,
-                    a.description as asset_description
-                FROM npcs n
-                LEFT JOIN assets a ON n.asset_id = a.asset_id
-                WHERE n.game_id = ?
-            """, (GAME_ID,))
-            
-            npcs = cursor.fetchall()
-            
-            # Clear existing caches
-            NPC_CACHE.clear()
-            AGENT_ID_CACHE.clear()
-            
-            # Update both NPC and agent ID caches
-            logger.info("=== Caching NPCs and Agents ===")
+            npcs = db.execute(NPC_QUERY + clause, (self.game_id, *params)).fetchall()
+            agent_mappings = {
+                row['npc_id']: row['letta_agent_id']
+                for row in db.execute(AGENT_MAPPING_QUERY + clause, (self.game_id, *params)).fetchall()
+            }
+        return npcs, agent_mappings
+
+    @staticmethod
+    def _npc_entry(npc) -> dict:
+        return {
+            'id': npc['npc_id'],
+            'system_prompt': npc['system_prompt'],
+            'description': npc['asset_description']
+        }
+
+    def _add_npc(self, npc):
+        self.npcs[npc['display_name']] = self._npc_entry(npc)
+        self._npc_index[npc['npc_id']] = (npc['display_name'], npc['asset_id'])
+
+    def _drop_npc(self, npc_id: str):
+        display_name, _ = self._npc_index.pop(npc_id, (None, None))
+        if display_name is not None and self.npcs.get(display_name, {}).get('id') == npc_id:
+            del self.npcs[display_name]
+        AGENT_ID_CACHE.pop(npc_id, None)
+
+    def load_npcs(self):
+        """Reload this game's NPCs and their agent mappings
+
+        The new entries are built aside and then swapped into the live dicts,
+        so concurrent readers never see an empty or half-filled cache.
+        """
+        npcs, agent_mappings = self._fetch_npcs()
+        new_npcs = {}
+        new_index = {}
+        for npc in npcs:
+            new_npcs[npc['display_name']] = self._npc_entry(npc)
+            new_index[npc['npc_id']] = (npc['display_name'], npc['asset_id'])
+
+        with self._reload_lock:
+            for npc_id in self._npc_index.keys() - new_index.keys():
+                AGENT_ID_CACHE.pop(npc_id, None)
+            _swap(self.npcs, new_npcs)
+            _swap(self._npc_index, new_index)
+            AGENT_ID_CACHE.update(agent_mappings)
+
+        logger.info(f"Game {self.game_id}: loaded {len(self.npcs)} NPCs, {len(agent_mappings)} agent IDs")
+        for name, npc in self.npcs.items():
+            cache_logger.debug("  %s (%s) -> %s", name, npc['id'], agent_mappings.get(npc['id']))
+
+    def reload_npc(self, npc_id: str):
+        """Re-read one NPC, dropping it if it no longer belongs to this game"""
+        self._reload_npcs(" AND n.npc_id = ?", (npc_id,), {npc_id})
+
+    def _reload_npcs(self, clause: str, params: tuple, stale_ids: Set[str]):
+        npcs, agent_mappings = self._fetch_npcs(clause, params)
+        with self._reload_lock:
+            for npc_id in stale_ids | {npc['npc_id'] for npc in npcs}:
+                self._drop_npc(npc_id)
             for npc in npcs:
-                logger.info(f"Processing {npc['display_name']}")
-                logger.info(f"  NPC ID: {npc['npc_id']}")
-                logger.info(f"  Has agent: {npc['npc_id'] in agent_mappings}")
-                
-                NPC_CACHE[npc['display_name']] = {
-                    'id': npc['npc_id'],
-                    'system_prompt': npc['system_prompt'],
-                    'description': npc['asset_description']
-                }
-                if npc['npc_id'] in agent_mappings:
-                    AGENT_ID_CACHE[npc['npc_id']] = agent_mappings[npc['npc_id']]
-                    logger.info(f"  Cached agent: {agent_mappings[npc['npc_id']]}")
-            
-            logger.info(f"Loaded {len(NPC_CACHE)} NPCs into cache")
-            logger.info(f"Loaded {len(AGENT_ID_CACHE)} agent IDs into cache")
+                self._add_npc(npc)
+            AGENT_ID_CACHE.update(agent_mappings)
+        cache_logger.debug("Game %s: reloaded NPCs %s", self.game_id, sorted(stale_ids | set(agent_mappings)))
+
+    def load_locations(self):
+        """Reload this game's locations"""
+        with get_db() as db:
+            locations = db.execute("""
+                SELECT asset_id, name, slug, position_x, position_y, position_z 
+                FROM assets 
+                WHERE is_location = 1 AND game_id = ?
+            """, (self.game_id,)).fetchall()
+
+        new_locations = {loc['slug']: self._location_entry(loc) for loc in locations}
+        with self._reload_lock:
+            _swap(self.locations, new_locations)
+            _swap(self._location_assets, {loc['asset_id']: loc['slug'] for loc in locations})
+
+        logger.info(f"Game {self.game_id}: loaded {len(self.locations)} locations")
+        for slug, data in self.locations.items():
+            cache_logger.debug("  %s: %s", slug, data)
+
+    @staticmethod
+    def _location_entry(loc) -> dict:
+        return {
+            'name': loc['name'],
+            'coordinates': [loc['position_x'], loc['position_y'], loc['position_z']]
+        }
+
+    def _add_location(self, loc):
+        self.locations[loc['slug']] = self._location_entry(loc)
+        self._location_assets[loc['asset_id']] = loc['slug']
+
+    def reload_asset(self, asset_id: str):
+        """Re-read one asset: its location entry and the NPCs that use it"""
+        with get_db() as db:
+            loc = db.execute("""
+                SELECT asset_id, name, slug, position_x, position_y, position_z 
+                FROM assets 
+                WHERE is_location = 1 AND game_id = ? AND asset_id = ?
+            """, (self.game_id, asset_id)).fetchone()
+
+        with self._reload_lock:
+            old_slug = self._location_assets.pop(asset_id, None)
+            if old_slug is not None:
+                self.locations.pop(old_slug, None)
+            if loc is not None:
+                self._add_location(loc)
+
+            # NPCs carry their asset's description
+            stale_ids = {npc_id for npc_id, (_, npc_asset) in self._npc_index.items() if npc_asset == asset_id}
+            self._reload_npcs(" AND n.asset_id = ?", (asset_id,), stale_ids)
+
+    def has_npc(self, npc_id: str) -> bool:
+        return npc_id in self._npc_index
+
+    def directory_entries(self) -> List[NPCEntry]:
+        """This game's NPCs with their current agent ids"""
+        return [
+            NPCEntry(
+                npc_id, self.game_id, display_name, asset_id, AGENT_ID_CACHE.get(npc_id),
+                self.npcs.get(display_name, {}).get('description') or ''
+            )
+            for npc_id, (display_name, asset_id) in list(self._npc_index.items())
+        ]
+
+    def release_agents(self):
+        """Drop this game's NPCs from the shared agent ID cache"""
+        for npc_id in self._npc_index:
+            AGENT_ID_CACHE.pop(npc_id, None)
+
+def _swap(live: dict, new: dict):
+    """Make ``live`` hold exactly ``new`` without ever emptying it
+
+    The default game's dicts are the module-level NPC_CACHE/LOCATION_CACHE,
+    which other modules import by name, so they are updated in place rather
+    than rebound: new and changed keys go in first, then stale keys go.
+    """
+    live.update(new)
+    for key in live.keys() - new.keys():
+        live.pop(key, None)
+
+class GameCacheRegistry:
+    """Per-game caches, loaded on first use and evicted when idle
+
+    The default game is pinned and never evicted. Other games are kept in
+    LRU order; a game unused for ``idle_seconds`` or pushed past
+    ``max_games`` is dropped and reloaded on its next request.
+    """
+
+    def __init__(
+        self,
+        default: GameCache,
+        max_games: int = GAME_CACHE_MAX_GAMES,
+        idle_seconds: float = GAME_CACHE_IDLE_SECONDS
+    ):
+        self.default = default
+        self.max_games = max_games
+        self.idle_seconds = idle_seconds
+        self._games: "OrderedDict[int, GameCache]" = OrderedDict()
+        self._lock = threading.Lock()
+        # game_id -> lock held while that game loads, so it loads once
+        self._loading: Dict[int, threading.Lock] = {}
+        self.loads = 0
+        self.evictions = 0
+
+    def get(self, game_id: Optional[int] = None) -> GameCache:
+        """Cache for ``game_id`` (the default game when None), loading it if needed"""
+        if game_id is None or game_id == self.default.game_id:
+            self.default.last_used = time.monotonic()
+            return self.default
+
+        game = self._touch(game_id)
+        if game is not None:
+            return game
+
+        # Load outside the registry lock so other games stay readable meanwhile
+        with self._lock:
+            loading = self._loading.setdefault(game_id, threading.Lock())
+        with loading:
+            game = self._touch(game_id)
+            if game is not None:
+                return game
+            game = GameCache(game_id)
+            try:
+                game.load()
+            except Exception:
+                with self._lock:
+                    self._loading.pop(game_id, None)
+                raise
+            # Publish and retire the load lock together, so a caller that
+            # misses the loading lock always finds the game instead
+            with self._lock:
+                game.last_used = time.monotonic()
+                self._games[game_id] = game
+                self._loading.pop(game_id, None)
+                self.loads += 1
+                cache_logger.info("Loaded cache for game %s (%d games cached)", game_id, len(self._games))
+                self._evict()
+                rebuild_npc_directory([self.default] + list(self._games.values()))
+        return game
+
+    async def aget(self, game_id: Optional[int] = None) -> GameCache:
+        """Like ``get``, but a game that is not cached yet loads in a worker thread"""
+        game = self.peek(game_id)
+        if game is not None:
+            return self.get(game_id)
+        return await asyncio.to_thread(self.get, game_id)
+
+    def _touch(self, game_id: int) -> Optional[GameCache]:
+        """Mark a held game as used, evicting any that went idle; None if not held"""
+        with self._lock:
+            game = self._games.get(game_id)
+            if game is None:
+                return None
+            self._games.move_to_end(game_id)
+            game.last_used = time.monotonic()
+            if self._evict():
+                rebuild_npc_directory([self.default] + list(self._games.values()))
+            return game
+
+    def peek(self, game_id: Optional[int] = None) -> Optional[GameCache]:
+        """Cache for ``game_id`` if it is currently held, without loading"""
+        if game_id is None or game_id == self.default.game_id:
+            return self.default
+        with self._lock:
+            return self._games.get(game_id)
+
+    def evict_idle(self) -> int:
+        """Drop idle games now; returns how many were evicted"""
+        with self._lock:
+            evicted = self._evict()
+            if evicted:
+                rebuild_npc_directory([self.default] + list(self._games.values()))
+            return evicted
+
+    def _evict(self) -> int:
+        evicted = 0
+        cutoff = time.monotonic() - self.idle_seconds
+        while self._games:
+            game_id, game = next(iter(self._games.items()))
+            if len(self._games) <= self.max_games and game.last_used >= cutoff:
+                break
+            self._games.popitem(last=False)
+            game.release_agents()
+            evicted += 1
+            cache_logger.info("Evicted cache for game %s", game_id)
+        self.evictions += evicted
+        return evicted
+
+    def held(self) -> List[GameCache]:
+        """The default game plus every game currently cached"""
+        with self._lock:
+            return [self.default] + list(self._games.values())
+
+    def stats(self) -> Dict:
+        with self._lock:
+            games = list(self._games)
+        return {
+            "default_game_id": self.default.game_id,
+            "games_cached": [self.default.game_id] + games,
+            "max_games": self.max_games,
+            "loads": self.loads,
+            "evictions": self.evictions
+        }
+
+# Global game cache registry; the default game shares the module-level dicts
+game_caches = GameCacheRegistry(GameCache(DEFAULT_GAME_ID, NPC_CACHE, LOCATION_CACHE))
+
+# Current NPC directory; replaced wholesale, never mutated
+npc_directory = NPCDirectory()
+
+def get_npc_directory() -> NPCDirectory:
+    """The current NPC directory; keep the returned object for a consistent view"""
+    return npc_directory
+
+def rebuild_npc_directory(games: Optional[List[GameCache]] = None) -> NPCDirectory:
+    """Build a directory from the cached games (default game first) and swap it in"""
+    global npc_directory
+    if games is None:
+        games = game_caches.held()
+    npc_directory = NPCDirectory(
+        (entry for game in games for entry in game.directory_entries()),
+        games[0].game_id
+    )
+    cache_logger.debug("Rebuilt NPC directory: %d NPCs", len(npc_directory))
+    return npc_directory
+
+def set_agent_id(npc_id: str, agent_id: str):
+    """Record a new NPC -> agent mapping in the cache and directory"""
+    AGENT_ID_CACHE[npc_id] = agent_id
+    rebuild_npc_directory()
+
+# Called after a change has been applied to the game caches, e.g. to rebuild derived indexes
+change_listeners: List[Callable[[CacheChange], None]] = []
+
+def publish_change(change: CacheChange):
+    """Apply a row-level change to the games that hold it, then notify listeners
+
+    Changes only say which row changed; the row is re-read, so applying the
+    same change twice (dashboard publish, then the change poller) is harmless.
+    Games that are not cached are skipped and load fresh on first use.
+    """
+    try:
+        if change.table == "npc_agents":
+            refresh_agent_mapping(change.key)
+        else:
+            game = game_caches.peek(change.game_id)
+            if game is not None:
+                if change.table == "npcs":
+                    game.reload_npc(change.key)
+                elif change.table == "assets":
+                    game.reload_asset(change.key)
+        rebuild_npc_directory()
+        cache_logger.debug("Applied cache change %s", change)
     except Exception as e:
-        logger.error(f"Error refreshing NPC cache: {str(e)}")
+        # A failed targeted update must not fail the dashboard write that caused it
+        logger.error(f"Error applying cache change {change}: {e}")
+        return
+
+    for listener in change_listeners:
+        try:
+            listener(change)
+        except Exception as e:
+            logger.error(f"Cache change listener failed for {change}: {e}")
+
+def refresh_agent_mapping(npc_id: str):
+    """Re-read one NPC's agent mapping into AGENT_ID_CACHE"""
+    with get_db() as db:
+        row = db.execute("""
+            SELECT letta_agent_id FROM npc_agents
+            WHERE npc_id = ? AND participant_id = 'letta_v3'
+        """, (npc_id,)).fetchone()
+    if row is None:
+        AGENT_ID_CACHE.pop(npc_id, None)
+    elif any(game.has_npc(npc_id) for game in game_caches.held()):
+        AGENT_ID_CACHE[npc_id] = row['letta_agent_id']
+
+def init_static_cache() -> Dict[str, bool]:
+    """Initialize static data caches on server boot; returns which caches loaded"""
+    logger.info("Initializing static data caches...")
+    results = {}
+    for name, refresh in (("npcs", refresh_npc_cache), ("locations", refresh_location_cache)):
+        try:
+            refresh()
+            results[name] = True
+        except Exception:
+            logger.error(f"Failed to load {name} cache", exc_info=True)
+            results[name] = False
+    game_caches.default.loaded = all(results.values())
+    return results
+
+def refresh_npc_cache(game_id: Optional[int] = None):
+    """Refresh NPC and agent caches for a game (default game when None)"""
+    game = game_caches.peek(game_id)
+    if game is None:
+        return  # Not cached; loads fresh on first use
+    try:
+        game.load_npcs()
+    except Exception as e:
+        logger.error(f"Error refreshing NPC cache for game {game.game_id}: {str(e)}")
         raise
+    rebuild_npc_directory()
 
-def refresh_location_cache():
-    """Refresh location cache from database"""
-    global LOCATION_CACHE
-    
+def refresh_location_cache(game_id: Optional[int] = None):
+    """Refresh location cache for a game (default game when None)"""
+    game = game_caches.peek(game_id)
+    if game is None:
+        return
     try:
-        with get_db() as db:
-            cursor = db.execute("""
-                SELECT name, slug, position_x, position_y, position_z 
-                FROM assets 
-                WHERE is_location = 1
-            """)
-            locations = cursor.fetchall()
-            
-            LOCATION_CACHE.clear()
-            for loc in locations:
-                LOCATION_CACHE[loc['slug']] = {
-                    'name': loc['name'],
-                    'coordinates': [loc['position_x'], loc['position_y'], loc['position_z']]
-                }
-                
-            logger.debug("=== Location Cache ===")
-            logger.debug(f"Cached {len(LOCATION_CACHE)} locations:")
-            for slug, data in LOCATION_CACHE.items():
-                logger.debug(f"  {slug}: {data}")
-                
+        game.load_locations()
     except Exception as e:
-        logger.error(f"Error refreshing location cache: {e}")
+        logger.error(f"Error refreshing location cache for game {game.game_id}: {e}")
+        raise
+
+def get_locations(game_id: Optional[int] = None) -> Dict[str, dict]:
+    """Location cache for a game (default game when None)"""
+    return game_caches.get(game_id).locations
 
-def get_npc_id_from_name(display_name: str) -> str:
+@metrics.timed("cache")
+def get_npc_id_from_name(display_name: str, game_id: Optional[int] = None) -> str:
     """Get NPC ID from display name using cache"""
-    npc_data = NPC_CACHE.get(display_name)
+    npc_data = game_caches.get(game_id).npcs.get(display_name)
     return npc_data['id'] if npc_data else None
 
-def get_npc_description(display_name: str) -> str:
+@metrics.timed("cache")
+def get_npc_description(display_name: str, game_id: Optional[int] = None) -> str:
     """Get NPC description from cache"""
-    npc_data = NPC_CACHE.get(display_name)
-    return npc_data['description'] if npc_data else None 
+    npc_data = game_caches.get(game_id).npcs.get(display_name)
+    return (npc_data['description'] or '') if npc_data else ''
 
+@metrics.timed("cache")
 def get_agent_id(npc_id: str) -> str:
     """Get agent ID from NPC ID using cache"""
     agent_id = AGENT_ID_CACHE.get(npc_id)
-    logger.info(f"Looking up agent for NPC {npc_id}")
-    logger.info(f"  Found in cache: {agent_id}")
+    cache_logger.debug("Agent lookup for NPC %s: %s", npc_id, agent_id)
     return agent_id
 
+@metrics.timed("cache")
+def get_agent_id_for_name(display_name: str, game_id: Optional[int] = None) -> Optional[str]:
+    """Get an NPC's agent ID from its display name in one lookup"""
+    game_caches.get(game_id)  # Loads the game on first use
+    return npc_directory.agent_for_name(display_name, game_id)
+
+@metrics.timed("cache")
 def get_player_info(player_id: str) -> Optional[Dict]:
     """Get player info from cache or database"""
-    if player_id in PLAYER_CACHE:
-        logger.debug(f"Cache hit for player {player_id}")
-        return PLAYER_CACHE[player_id]
-        
-    # Cache miss - get from DB and cache it
-    logger.debug(f"Cache miss for player {player_id}, fetching from DB")
-    player_info = db_get_player_info(player_id)
-    if player_info:
-        PLAYER_CACHE[player_id] = player_info
-        
-    return player_info
+    return PLAYER_CACHE.lookup(player_id)
+
+@metrics.timed("cache")
+def prefetch_players(player_ids: List[str]) -> Dict[str, Optional[Dict]]:
+    """Load every listed player into the cache with one batched query"""
+    return PLAYER_CACHE.lookup_many(player_ids)
 
 def invalidate_player_cache(player_id: str) -> None:
     """Remove player from cache (e.g., when description updates)"""
-    if player_id in PLAYER_CACHE:
-        del PLAYER_CACHE[player_id]
+    if PLAYER_CACHE.invalidate(player_id):
         logger.info(f"Invalidated cache for player {player_id}") 
 
+@metrics.timed("cache")
 def get_player_description(player_id: str) -> str:
     """Get player description from cache, falling back to DB"""
-    # Try cache first
-    player_info = PLAYER_CACHE.get(player_id)
-    if player_info and 'description' in player_info:
-        logger.debug(f"Cache hit for player description {player_id}")
-        return player_info['description']
-        
-    # Cache miss - get from DB
-    logger.debug(f"Cache miss for description {player_id}, fetching from DB")
-    description = db_get_player_description(player_id)
-    
-    # Cache the result if we got one
-    if description:
-        if player_id not in PLAYER_CACHE:
-            PLAYER_CACHE[player_id] = {}
-        PLAYER_CACHE[player_id]['description'] = description
-        
-    return description or "Unknown"
+    player_info = PLAYER_CACHE.lookup(player_id)
+    return (player_info or {}).get('description') or "Unknown"
 
 def update_player_cache_with_description(player_id: str, description: str):
     """Update player cache when a new description is stored"""
-    if player_id not in PLAYER_CACHE:
-        PLAYER_CACHE[player_id] = {}
-    PLAYER_CACHE[player_id]['description'] = description
+    PLAYER_CACHE.update(player_id, description=description)
     logger.info(f"Updated PLAYER_CACHE for {player_id} with description")
-
-# Current format needed:
-LOCATION_CACHE = {
-    'petes_stand': {  # Slug as key
-        'name': "Pete's Merch Stand",
-        'coordinates': [-6.8, 3.0, -115.0]
-    },
-    'chipotle': {
-        'name': 'Chipotle',
-        'coordinates': [8.0, 3.0, -12.0]
-    }
-} 
-
-# Keep existing functions as wrappers for backward compatibility
-def get_player_description(player_id: str) -> str:
-    """Legacy wrapper - prefer direct PLAYER_CACHE access"""
-    player_info = PLAYER_CACHE.get(player_id, {})
-    return player_info.get('description', 'Unknown')
-
-def get_npc_description(display_name: str) -> str:
-    """Legacy wrapper - prefer direct NPC_CACHE access"""
-    npc_info = NPC_CACHE.get(display_name, {})
-    return npc_info.get('description', '')
-
-def get_agent_id(npc_id: str) -> str:
-    """Legacy wrapper - prefer direct AGENT_ID_CACHE access"""
-    return AGENT_ID_CACHE.get(npc_id) 
\ No newline at end of file
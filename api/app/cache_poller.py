@@ -0,0 +1,106 @@
+"""Pick up NPC, asset and agent-mapping edits made outside this process
+
+Triggers on npcs, assets and npc_agents append one row per change to
+``cache_changes``. The poller checks ``PRAGMA data_version`` on its own
+connection, which only moves when another connection commits, so an idle
+database costs one pragma per interval; when it moves, new change rows are
+read and applied through ``cache.publish_change``.
+"""
+import asyncio
+import sqlite3
+from pathlib import Path
+from typing import Optional, Set, Tuple, Union
+
+from .cache import CacheChange, publish_change
+from .config import SQLITE_DB_PATH, CACHE_POLL_INTERVAL_MS
+from .database import load_migration
+from .logging_utils import get_logger
+
+logger = get_logger("cache")
+
+# The change log and its triggers, from db/migrations/012_add_cache_changes.py
+SCHEMA = load_migration("012_add_cache_changes").SCHEMA
+
+class CacheChangePoller:
+    """Apply rows from ``cache_changes`` whenever another connection commits"""
+
+    def __init__(
+        self,
+        db_path: Union[str, Path] = SQLITE_DB_PATH,
+        interval_ms: int = CACHE_POLL_INTERVAL_MS,
+        retention_seconds: int = 3600
+    ):
+        self.db_path = db_path
+        self.interval = interval_ms / 1000.0
+        self.retention_seconds = retention_seconds
+        self._db: Optional[sqlite3.Connection] = None
+        self._data_version: Optional[int] = None
+        self.last_seq = 0
+        self.applied = 0
+
+    def open(self):
+        """Install the change log and start from its current end"""
+        self._db = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._db.execute("PRAGMA busy_timeout=5000")
+        self._db.executescript(SCHEMA)
+        self.last_seq = self._db.execute("SELECT COALESCE(MAX(seq), 0) FROM cache_changes").fetchone()[0]
+        self._data_version = self._db.execute("PRAGMA data_version").fetchone()[0]
+
+    def poll(self) -> int:
+        """Apply changes committed since the last poll; returns how many were applied"""
+        if self._db is None:
+            self.open()
+
+        data_version = self._db.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self._data_version:
+            return 0
+        self._data_version = data_version
+
+        rows = self._db.execute(
+            "SELECT seq, table_name, row_key, game_id FROM cache_changes WHERE seq > ? ORDER BY seq",
+            (self.last_seq,)
+        ).fetchall()
+        if not rows:
+            return 0
+        self.last_seq = rows[-1][0]
+
+        # A bulk edit logs the same row many times; re-reading it once is enough
+        changes: Set[Tuple] = set()
+        for _, table, key, game_id in rows:
+            change = (table, key, game_id)
+            if change not in changes:
+                changes.add(change)
+                publish_change(CacheChange(table, key, game_id))
+        self.applied += len(changes)
+        logger.info("Applied %d cache changes from %d change log rows", len(changes), len(rows))
+
+        self._db.execute(
+            "DELETE FROM cache_changes WHERE changed_at < datetime('now', ?)",
+            (f"-{self.retention_seconds} seconds",)
+        )
+        self._db.commit()
+        return len(changes)
+
+    async def run(self):
+        """Poll until cancelled; SQLite reads and cache reloads run in a worker thread"""
+        if self.interval <= 0:
+            return
+        try:
+            await asyncio.to_thread(self.open)
+        except sqlite3.Error as e:
+            logger.warning("Cache change polling disabled: %s", e)
+            return
+        while True:
+            try:
+                await asyncio.to_thread(self.poll)
+            except Exception as e:
+                logger.error("Cache change poll failed: %s", e)
+            await asyncio.sleep(self.interval)
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+# Global cache change poller
+cache_poller = CacheChangePoller()
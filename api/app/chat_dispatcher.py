@@ -0,0 +1,206 @@
+"""Per-agent serialization of Letta chat calls"""
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("roblox_app")
+
+class AgentQueueFull(Exception):
+    """Raised when an agent already has a full queue of pending chats"""
+    pass
+
+class _AgentLane:
+    """One in-flight request per agent, with waiters queued FIFO behind it"""
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.calls = 0  # Submitted and not finished: one in flight, the rest queued
+        self.in_flight = False
+        self.total_requests = 0
+        self.collapsed_requests = 0
+        self.rejected_requests = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.last_used = time.monotonic()
+        self.pending: Dict[Any, "_Call"] = {}
+
+    @property
+    def waiting(self) -> int:
+        return max(self.calls - 1, 0)
+
+    def idle(self) -> bool:
+        return self.calls == 0 and not self.pending
+
+    def record_wait(self, wait: float):
+        self.total_requests += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self.waiting,
+            "in_flight": self.in_flight,
+            "total_requests": self.total_requests,
+            "collapsed_requests": self.collapsed_requests,
+            "rejected_requests": self.rejected_requests,
+            "average_wait": round(self.total_wait / self.total_requests, 3) if self.total_requests else 0.0,
+            "max_wait": round(self.max_wait, 3)
+        }
+
+class _Call:
+    """One submitted call, shared by requests collapsed onto it"""
+    __slots__ = ("task", "started", "waiters")
+
+    def __init__(self):
+        self.task: Optional[asyncio.Task] = None
+        self.started = False
+        self.waiters = 0
+
+class ChatDispatcher:
+    """Run blocking Letta calls in worker threads, one at a time per agent
+
+    Calls for the same agent are serialized so they cannot race each other on
+    the Letta side; calls for different agents run in parallel. Each agent has
+    at most ``max_queue_per_agent`` waiters; further requests are rejected with
+    AgentQueueFull. Requests sharing a ``dedupe_key`` while one is still pending
+    are collapsed onto the pending request's result.
+
+    A submitted call runs as its own task and holds the agent's lane until it
+    has really finished: a caller that gives up (timeout, disconnect) does not
+    free the lane while its worker thread is still talking to Letta, and
+    collapsed requests still get the result. A call that has not started yet
+    is dropped once nobody is waiting for it. Lanes idle for ``idle_seconds``
+    are forgotten.
+    """
+
+    def __init__(self, max_queue_per_agent: int = 3, idle_seconds: float = 300.0):
+        self.max_queue_per_agent = max_queue_per_agent
+        self.idle_seconds = idle_seconds
+        self._lanes: Dict[str, _AgentLane] = {}
+        self._last_sweep = time.monotonic()
+
+    def _lane(self, agent_id: str) -> _AgentLane:
+        lane = self._lanes.get(agent_id)
+        if lane is None:
+            self._sweep()
+            lane = self._lanes[agent_id] = _AgentLane()
+        return lane
+
+    def _sweep(self):
+        """Drop lanes that have been idle for idle_seconds (checked at most every idle_seconds / 2)"""
+        now = time.monotonic()
+        if now - self._last_sweep < self.idle_seconds / 2:
+            return
+        self._last_sweep = now
+        for agent_id in [a for a, lane in self._lanes.items() if lane.idle() and now - lane.last_used >= self.idle_seconds]:
+            del self._lanes[agent_id]
+
+    def _check_capacity(self, agent_id: str, lane: _AgentLane):
+        if lane.waiting >= self.max_queue_per_agent:
+            lane.rejected_requests += 1
+            raise AgentQueueFull(
+                f"Agent {agent_id} already has {lane.waiting} queued chats"
+            )
+
+    async def _acquire(self, lane: _AgentLane):
+        """Take the lane; the caller has already counted itself in ``calls``"""
+        enqueued = time.monotonic()
+        await lane.lock.acquire()
+        lane.record_wait(time.monotonic() - enqueued)
+        lane.in_flight = True
+
+    def _release(self, lane: _AgentLane):
+        lane.in_flight = False
+        lane.calls -= 1
+        lane.last_used = time.monotonic()
+        lane.lock.release()
+
+    @asynccontextmanager
+    async def slot(self, agent_id: str):
+        """Hold the agent's lane for the duration of the block (e.g. a stream)"""
+        lane = self._lane(agent_id)
+        self._check_capacity(agent_id, lane)
+        lane.calls += 1
+        try:
+            await self._acquire(lane)
+        except BaseException:
+            lane.calls -= 1
+            raise
+        try:
+            yield
+        finally:
+            self._release(lane)
+
+    async def _run(self, lane: _AgentLane, call: _Call, func: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+        await self._acquire(lane)
+        call.started = True
+        try:
+            if asyncio.iscoroutinefunction(func):
+                return await func(*args, **kwargs)
+            return await asyncio.to_thread(func, *args, **kwargs)
+        finally:
+            self._release(lane)
+
+    def _finished(self, lane: _AgentLane, call: _Call, task: asyncio.Task):
+        if not call.started:
+            lane.calls -= 1  # Dropped before it got the lane
+        # Retrieve the outcome so a call nobody waits for any more is not logged as unhandled
+        if not task.cancelled():
+            task.exception()
+
+    async def submit(
+        self,
+        agent_id: str,
+        func: Callable[..., Any],
+        /,
+        *args,
+        dedupe_key: Optional[Any] = None,
+        **kwargs
+    ) -> Any:
+        """Run ``func(*args, **kwargs)`` once the agent is free (blocking functions in a thread)"""
+        lane = self._lane(agent_id)
+
+        call = lane.pending.get(dedupe_key) if dedupe_key is not None else None
+        if call is not None:
+            lane.collapsed_requests += 1
+            logger.debug(f"Collapsing duplicate request for agent {agent_id}")
+        else:
+            self._check_capacity(agent_id, lane)
+            lane.calls += 1
+            call = _Call()
+            call.task = asyncio.ensure_future(self._run(lane, call, func, args, kwargs))
+            call.task.add_done_callback(lambda task: self._finished(lane, call, task))
+            if dedupe_key is not None:
+                lane.pending[dedupe_key] = call
+                call.task.add_done_callback(
+                    lambda _: lane.pending.pop(dedupe_key) if lane.pending.get(dedupe_key) is call else None
+                )
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if not call.started and call.waiters == 0 and not call.task.done():
+                call.task.cancel()
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get queue depth and wait time per recently active agent"""
+        self._sweep()
+        return {agent_id: lane.stats() for agent_id, lane in self._lanes.items()}
+
+def greeting_dedupe_key(messages: List[Dict[str, str]]) -> Optional[Tuple[str, ...]]:
+    """Key identical proximity-greeting system messages so they can be collapsed"""
+    greetings = tuple(
+        msg.get('content', '')
+        for msg in messages
+        if msg.get('role') == 'system' and 'has entered your range' in msg.get('content', '')
+    )
+    if greetings and len(greetings) == len(messages):
+        return greetings
+    return None
+
+# Global dispatcher instance
+chat_dispatcher = ChatDispatcher()
@@ -0,0 +1,52 @@
+"""Shared Letta and OpenAI clients, created on first use
+
+Building clients at import time made every import of the routers pay for
+client construction (and a second or third copy of it). These getters build
+one instance per process the first time it is needed; ``set_*_client`` swaps
+in a replacement, e.g. a fake for tests or benchmarks.
+"""
+import logging
+import threading
+from typing import Any, Optional
+
+from .config import OPENAI_API_KEY
+
+logger = logging.getLogger("roblox_app")
+
+_lock = threading.Lock()
+_letta_client: Optional[Any] = None
+_openai_client: Optional[Any] = None
+
+def get_letta_client() -> Any:
+    """Get the shared Letta client"""
+    global _letta_client
+    if _letta_client is None:
+        with _lock:
+            if _letta_client is None:
+                from letta_templates.npc_tools import create_letta_client
+                _letta_client = create_letta_client()
+                logger.info("Created Letta client")
+    return _letta_client
+
+def get_openai_client() -> Any:
+    """Get the shared OpenAI client"""
+    global _openai_client
+    if _openai_client is None:
+        with _lock:
+            if _openai_client is None:
+                from openai import OpenAI
+                _openai_client = OpenAI(api_key=OPENAI_API_KEY)
+                logger.info("Created OpenAI client")
+    return _openai_client
+
+def set_letta_client(client: Optional[Any]):
+    """Replace the shared Letta client (None to rebuild on next use)"""
+    global _letta_client
+    with _lock:
+        _letta_client = client
+
+def set_openai_client(client: Optional[Any]):
+    """Replace the shared OpenAI client (None to rebuild on next use)"""
+    global _openai_client
+    with _lock:
+        _openai_client = client
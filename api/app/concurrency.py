@@ -0,0 +1,200 @@
+"""Concurrency primitives for outbound Letta and OpenAI calls"""
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger("roblox_app")
+
+class ConcurrencyLimitExceeded(Exception):
+    """Raised when the wait queue is full and a request is shed"""
+    pass
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD concurrency limit driven by observed latency and overload signals.
+
+    The limit grows by roughly one slot per window of fast, successful calls
+    and is multiplied by ``backoff`` when a call is rate limited, fails with a
+    5xx, times out, or runs slower than ``latency_target``. Decreases are
+    spaced by ``decrease_cooldown`` so one burst of failures only backs off once.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 5,
+        min_limit: int = 1,
+        max_limit: int = 20,
+        latency_target: float = 5.0,
+        backoff: float = 0.5,
+        decrease_cooldown: float = 1.0,
+        max_queue_depth: Optional[int] = 50
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.decrease_cooldown = decrease_cooldown
+        self.max_queue_depth = max_queue_depth
+
+        self.limit = float(initial_limit)
+        self.in_flight = 0
+        self.queue_depth = 0
+        self.max_observed_queue_depth = 0
+        self.total_requests = 0
+        self.overloaded_requests = 0
+        self.shed_requests = 0
+        self.average_latency = 0.0
+        self._last_decrease = 0.0
+        self._cond = asyncio.Condition()
+        self._orphans = set()
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+    async def acquire(self):
+        """Wait for a slot, raising ConcurrencyLimitExceeded if the queue is full"""
+        if (self.max_queue_depth is not None
+                and not self._has_capacity()
+                and self.queue_depth >= self.max_queue_depth):
+            self.shed_requests += 1
+            raise ConcurrencyLimitExceeded(
+                f"Queue full ({self.queue_depth} waiting, limit {int(self.limit)})"
+            )
+
+        self.queue_depth += 1
+        self.max_observed_queue_depth = max(self.max_observed_queue_depth, self.queue_depth)
+        try:
+            async with self._cond:
+                await self._cond.wait_for(self._has_capacity)
+                self.in_flight += 1
+        finally:
+            self.queue_depth -= 1
+
+    async def release(self, latency: float, overloaded: bool = False):
+        """Release a slot and feed the outcome back into the limit"""
+        self._record(latency, overloaded)
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def _record(self, latency: float, overloaded: bool):
+        self.total_requests += 1
+        self.average_latency += (latency - self.average_latency) * 0.1
+
+        if overloaded or latency > self.latency_target:
+            if overloaded:
+                self.overloaded_requests += 1
+            now = time.monotonic()
+            if now - self._last_decrease >= self.decrease_cooldown:
+                self._last_decrease = now
+                old_limit = self.limit
+                self.limit = max(float(self.min_limit), self.limit * self.backoff)
+                logger.warning(
+                    f"Concurrency limit reduced {old_limit:.1f} -> {self.limit:.1f} "
+                    f"(latency={latency:.2f}s, overloaded={overloaded})"
+                )
+        else:
+            self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+
+    async def run_in_thread(self, func: Callable[..., Any], *args, is_overload: Optional[Callable[[BaseException], bool]] = None, **kwargs) -> Any:
+        """Run a blocking call in a worker thread while holding a slot
+
+        Threads cannot be interrupted, so when the caller is cancelled (its
+        deadline passed) the slot stays held until the thread returns and
+        ``in_flight`` keeps counting calls the upstream is still serving.
+        """
+        await self.acquire()
+        start = time.monotonic()
+        call = asyncio.ensure_future(asyncio.to_thread(func, *args, **kwargs))
+        try:
+            result = await asyncio.shield(call)
+        except asyncio.CancelledError:
+            call.add_done_callback(lambda task: self._release_orphan(task, start))
+            raise
+        except Exception as e:
+            await self.release(time.monotonic() - start, bool(is_overload and is_overload(e)))
+            raise
+        await self.release(time.monotonic() - start)
+        return result
+
+    def _release_orphan(self, call: asyncio.Future, start: float):
+        if not call.cancelled():
+            call.exception()  # Nobody is waiting for the result any more
+        release = asyncio.ensure_future(self.release(time.monotonic() - start, overloaded=True))
+        self._orphans.add(release)
+        release.add_done_callback(self._orphans.discard)
+
+    def slot(self):
+        """Async context manager that times the wrapped call"""
+        return _LimiterSlot(self)
+
+    def get_metrics(self) -> Dict[str, float]:
+        """Get current limiter state"""
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_observed_queue_depth,
+            "total_requests": self.total_requests,
+            "overloaded_requests": self.overloaded_requests,
+            "shed_requests": self.shed_requests,
+            "average_latency": round(self.average_latency, 3)
+        }
+
+class _LimiterSlot:
+    """Holds one limiter slot; set ``overloaded`` before exit to signal backoff"""
+
+    def __init__(self, limiter: AdaptiveConcurrencyLimiter):
+        self.limiter = limiter
+        self.overloaded = False
+        self.start_time = 0.0
+
+    async def __aenter__(self):
+        await self.limiter.acquire()
+        self.start_time = time.monotonic()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is not None and issubclass(exc_type, (asyncio.TimeoutError, asyncio.CancelledError)):
+            self.overloaded = True
+        await self.limiter.release(time.monotonic() - self.start_time, self.overloaded)
+        return False
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key onto one execution
+
+    The first caller for a key runs the (blocking) function in a worker thread;
+    callers arriving while it runs await the same result instead of repeating
+    the work. Once the call finishes the key is forgotten, so later calls run
+    again.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, func, *args, **kwargs):
+        """Run ``func(*args, **kwargs)`` once per in-flight ``key``"""
+        existing = self._calls.get(key)
+        if existing is not None:
+            return await asyncio.shield(existing)
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await asyncio.to_thread(func, *args, **kwargs)
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                future.exception()
+            raise
+        finally:
+            self._calls.pop(key, None)
+
+        future.set_result(result)
+        return result
+
+    def in_flight(self) -> int:
+        """Number of keys currently being computed"""
+        return len(self._calls)
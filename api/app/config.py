@@ -9,6 +9,7 @@ BASE_DIR = Path(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # Database paths
 DB_DIR = BASE_DIR / "db"
 SQLITE_DB_PATH = DB_DIR / "game_data.db"
+MIGRATIONS_DIR = DB_DIR / "migrations"
 
 # Add missing game paths function and directory
 GAMES_DIR = Path(os.path.dirname(BASE_DIR)) / "games"
@@ -68,6 +69,61 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 ADMIN_API_KEY = os.getenv("ADMIN_API_KEY", "your-secure-admin-key")
 GAME_API_KEY = os.getenv("GAME_API_KEY", "your-game-integration-key")
 
+# Letta settings
+# Create missing agents for enabled NPCs at startup instead of on first contact
+LETTA_WARMUP_AGENTS = os.getenv("LETTA_WARMUP_AGENTS", "false").lower() in ("1", "true", "yes")
+
+# Letta call resilience: per-operation timeouts (seconds), circuit breaker,
+# retry budget (extra load retries may add) and hedging delay for reads (0 disables)
+LETTA_DEFAULT_TIMEOUT = float(os.getenv("LETTA_DEFAULT_TIMEOUT", "10"))
+LETTA_CHAT_TIMEOUT = float(os.getenv("LETTA_CHAT_TIMEOUT", "30"))
+LETTA_READ_TIMEOUT = float(os.getenv("LETTA_READ_TIMEOUT", "3"))
+LETTA_WRITE_TIMEOUT = float(os.getenv("LETTA_WRITE_TIMEOUT", "5"))
+LETTA_TIMEOUTS = {
+    "messages.create": LETTA_CHAT_TIMEOUT,
+    "messages.create_stream": LETTA_CHAT_TIMEOUT,
+    "group_members.read": LETTA_READ_TIMEOUT,
+    "group_members.write": LETTA_WRITE_TIMEOUT,
+    "status.write": LETTA_WRITE_TIMEOUT
+}
+LETTA_BREAKER_FAILURES = int(os.getenv("LETTA_BREAKER_FAILURES", "5"))
+LETTA_BREAKER_RESET_SECONDS = float(os.getenv("LETTA_BREAKER_RESET_SECONDS", "30"))
+LETTA_RETRY_BUDGET_RATIO = float(os.getenv("LETTA_RETRY_BUDGET_RATIO", "0.1"))
+LETTA_MAX_RETRIES = int(os.getenv("LETTA_MAX_RETRIES", "1"))
+LETTA_HEDGE_DELAY_MS = int(os.getenv("LETTA_HEDGE_DELAY_MS", "0"))
+
+# Conversation store write-behind interval
+CONVERSATION_FLUSH_MS = int(os.getenv("CONVERSATION_FLUSH_MS", "200"))
+# How long a conversation id missing from the store is remembered as missing
+CONVERSATION_MISS_TTL_SECONDS = float(os.getenv("CONVERSATION_MISS_TTL_SECONDS", "5"))
+
+# Per-stage latency histograms (/metrics); disabled timers are no-ops
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Static game caches: the default game is loaded at startup and used when a
+# request names no game; other games load on first use and are evicted when idle
+DEFAULT_GAME_ID = int(os.getenv("DEFAULT_GAME_ID", "74"))
+GAME_CACHE_MAX_GAMES = int(os.getenv("GAME_CACHE_MAX_GAMES", "16"))
+GAME_CACHE_IDLE_SECONDS = int(os.getenv("GAME_CACHE_IDLE_SECONDS", "3600"))
+
+# Player description cache: LRU-bounded, with a short TTL for players not found
+PLAYER_CACHE_MAX_SIZE = int(os.getenv("PLAYER_CACHE_MAX_SIZE", "10000"))
+PLAYER_CACHE_TTL_SECONDS = int(os.getenv("PLAYER_CACHE_TTL_SECONDS", "600"))
+PLAYER_CACHE_NEGATIVE_TTL_SECONDS = int(os.getenv("PLAYER_CACHE_NEGATIVE_TTL_SECONDS", "30"))
+
+# State shared across uvicorn workers: "memory" (one worker) or "sqlite" (all workers on one host)
+SHARED_STATE_BACKEND = os.getenv("SHARED_STATE_BACKEND", "memory").lower()
+SHARED_STATE_PATH = Path(os.getenv("SHARED_STATE_PATH", str(DB_DIR / "shared_state.db")))
+
+# Longest appearance summary embedded in a group_members block
+APPEARANCE_SUMMARY_CHARS = int(os.getenv("APPEARANCE_SUMMARY_CHARS", "200"))
+
+# Seconds a member must be missing from snapshots before an NPC is told they left
+GROUP_REMOVAL_GRACE_SECONDS = float(os.getenv("GROUP_REMOVAL_GRACE_SECONDS", "15"))
+
+# How often to check SQLite for NPC/asset edits made outside this process (0 disables)
+CACHE_POLL_INTERVAL_MS = int(os.getenv("CACHE_POLL_INTERVAL_MS", "1000"))
+
 # LLM settings
 DEFAULT_LLM = os.getenv("DEFAULT_LLM", "gpt-4o-mini")
 
@@ -1,24 +1,64 @@
+import json
 from datetime import datetime, timedelta
+from typing import Optional
+
+from .conversation_store import ConversationStore
 
 class ConversationManager:
-    def __init__(self):
+    def __init__(self, store: Optional[ConversationStore] = None):
         self.conversations = {}
         self.expiry_time = timedelta(minutes=30)
+        self.store = store
+
+    @staticmethod
+    def _store_id(player_id, npc_id):
+        return f"legacy:{player_id}:{npc_id}"
+
+    def _load(self, player_id, npc_id):
+        """Load a conversation persisted by an earlier run or another worker"""
+        data = self.store.load_conversation(self._store_id(player_id, npc_id), limit=50)
+        if not data:
+            return False
+        if datetime.now() - data["last_update"] > self.expiry_time:
+            self.store.end_conversation(data["id"])
+            return False
+        messages = [json.loads(content) for _, content, _ in data["messages"]]
+        self.conversations[(player_id, npc_id)] = (messages, data["last_update"])
+        return True
 
     def get_conversation(self, player_id, npc_id):
         key = (player_id, npc_id)
+        if key not in self.conversations and self.store:
+            self._load(player_id, npc_id)
         if key in self.conversations:
             conversation, last_update = self.conversations[key]
             if datetime.now() - last_update > self.expiry_time:
                 del self.conversations[key]
+                if self.store:
+                    self.store.end_conversation(self._store_id(player_id, npc_id))
                 return []
             return conversation
         return []
 
     def update_conversation(self, player_id, npc_id, message):
         key = (player_id, npc_id)
+        if key not in self.conversations and self.store:
+            self.get_conversation(player_id, npc_id)
+        now = datetime.now()
         if key not in self.conversations:
-            self.conversations[key] = ([], datetime.now())
+            self.conversations[key] = ([], now)
+            if self.store:
+                self.store.save_conversation(
+                    self._store_id(player_id, npc_id),
+                    "npc_user",
+                    {
+                        str(player_id): {"id": str(player_id), "type": "player", "name": str(player_id)},
+                        str(npc_id): {"id": str(npc_id), "type": "npc", "name": str(npc_id)}
+                    },
+                    now
+                )
         conversation, _ = self.conversations[key]
         conversation.append(message)
-        self.conversations[key] = (conversation[-50:], datetime.now())
\ No newline at end of file
+        self.conversations[key] = (conversation[-50:], now)
+        if self.store:
+            self.store.append_message(self._store_id(player_id, npc_id), str(player_id), json.dumps(message), now)
@@ -1,9 +1,14 @@
 # app/conversation_managerV2.py
 
+from collections import OrderedDict, deque
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Literal, Any
-from pydantic import BaseModel, ConfigDict
+from typing import Deque, Dict, List, Optional, Literal, Any, Set
+from pydantic import BaseModel
+from .config import CONVERSATION_MISS_TTL_SECONDS
 from .models import ConversationMetrics
+from .conversation_store import ConversationStore
+import time
 import uuid
 import logging
 
@@ -14,21 +19,34 @@ class Participant(BaseModel):
     type: Literal["npc", "player"]
     name: str
 
-class Message(BaseModel):
+@dataclass
+class Message:
+    __slots__ = ("sender_id", "content", "timestamp")
+
     sender_id: str
     content: str
     timestamp: datetime
 
-class Conversation(BaseModel):
-    model_config = ConfigDict(arbitrary_types_allowed=True)
-    
-    id: str
-    type: Literal["npc_user", "npc_npc", "group"]
-    participants: Dict[str, Participant]
-    messages: List[Message]
-    created_at: datetime
-    last_update: datetime
-    metadata: Dict[str, Any] = {}
+class Conversation:
+    """Conversation state; ``messages`` keeps only the most recent ``max_messages``"""
+    __slots__ = ("id", "type", "participants", "messages", "created_at", "last_update", "metadata")
+
+    def __init__(
+        self,
+        id: str,
+        type: Literal["npc_user", "npc_npc", "group"],
+        participants: Dict[str, Participant],
+        created_at: datetime,
+        max_messages: Optional[int] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ):
+        self.id = id
+        self.type = type
+        self.participants = participants
+        self.messages: Deque[Message] = deque(maxlen=max_messages)
+        self.created_at = created_at
+        self.last_update = created_at
+        self.metadata = metadata if metadata is not None else {}
 
 class ConversationMetrics:
     def __init__(self):
@@ -54,12 +72,133 @@ class ConversationMetrics:
         }
 
 class ConversationManagerV2:
-    def __init__(self):
-        self.conversations: Dict[str, Conversation] = {}
-        self.participant_conversations: Dict[str, List[str]] = {}
-        self.expiry_time = timedelta(minutes=30)
+    """Tracks active conversations, oldest activity first
+
+    ``conversations`` is kept in last-update order (every touch moves a
+    conversation to the end), so expiry and eviction only ever look at the
+    front instead of scanning everything. Once ``max_conversations`` is
+    reached the least recently active conversation is ended to make room.
+
+    With a ``store``, conversations and messages are persisted write-behind
+    and conversations missing from memory (after a restart, or created by
+    another worker) are loaded on first access; evicted conversations stay
+    in the store instead of being ended. Ids the store does not have are
+    remembered for ``miss_ttl`` so repeated lookups of unknown or ended
+    conversations do not each hit SQLite.
+
+    Memory is authoritative once a conversation is loaded: messages another
+    worker adds to it are not seen here until it is evicted or expires and
+    is loaded again. Route a conversation's requests to one worker (sticky
+    sessions) when every worker needs the full history.
+    """
+
+    def __init__(
+        self,
+        expiry_time: timedelta = timedelta(minutes=30),
+        max_messages: Optional[int] = 50,
+        max_conversations: Optional[int] = 10000,
+        store: Optional[ConversationStore] = None,
+        miss_ttl: timedelta = timedelta(seconds=CONVERSATION_MISS_TTL_SECONDS),
+        max_misses: int = 10000
+    ):
+        self.conversations: "OrderedDict[str, Conversation]" = OrderedDict()
+        self.participant_conversations: Dict[str, Set[str]] = {}
+        self.expiry_time = expiry_time
+        self.max_messages = max_messages
+        self.max_conversations = max_conversations
+        self.evicted_conversations = 0
+        self.store = store
+        self.miss_ttl = miss_ttl.total_seconds()
+        self.max_misses = max_misses
+        # conversation_id -> monotonic time the miss expires, oldest first
+        self._misses: "OrderedDict[str, float]" = OrderedDict()
         self.metrics = ConversationMetrics()
 
+    def _make_room(self):
+        """Evict least recently active conversations down to max_conversations"""
+        if self.max_conversations is None:
+            return
+        while len(self.conversations) >= self.max_conversations:
+            oldest_id = next(iter(self.conversations))
+            if self.store:
+                # Still persisted, so it can be loaded again on next access
+                self._forget(oldest_id)
+                self.metrics.active_conversations -= 1
+            elif not self.end_conversation(oldest_id):
+                self.conversations.pop(oldest_id, None)
+            self.evicted_conversations += 1
+
+    def _track(self, conversation: Conversation):
+        """Add a conversation to memory and the participant index"""
+        self.conversations[conversation.id] = conversation
+        for p_id in conversation.participants:
+            self.participant_conversations.setdefault(p_id, set()).add(conversation.id)
+
+    def _forget(self, conversation_id: str):
+        """Drop a conversation from memory and the participant index"""
+        conversation = self.conversations.pop(conversation_id, None)
+        if not conversation:
+            return
+        for participant_id in conversation.participants:
+            conversation_ids = self.participant_conversations.get(participant_id)
+            if conversation_ids is not None:
+                conversation_ids.discard(conversation_id)
+                if not conversation_ids:
+                    del self.participant_conversations[participant_id]
+
+    def _get(self, conversation_id: str) -> Optional[Conversation]:
+        """Get a conversation from memory, loading it from the store on a miss"""
+        conversation = self.conversations.get(conversation_id)
+        if conversation or not self.store:
+            return conversation
+        if self._is_missing(conversation_id):
+            return None
+
+        data = self.store.load_conversation(conversation_id, limit=self.max_messages)
+        if not data:
+            self._remember_miss(conversation_id)
+            return None
+        if datetime.now() - data["last_update"] > self.expiry_time:
+            self.store.end_conversation(conversation_id)
+            self._remember_miss(conversation_id)
+            return None
+
+        conversation = Conversation(
+            id=data["id"],
+            type=data["type"],
+            participants={
+                pid: Participant(**participant)
+                for pid, participant in data["participants"].items()
+            },
+            created_at=data["created_at"],
+            max_messages=self.max_messages,
+            metadata=data["metadata"]
+        )
+        conversation.last_update = data["last_update"]
+        conversation.messages.extend(Message(*msg) for msg in data["messages"])
+
+        self._make_room()
+        self._track(conversation)
+        self.metrics.active_conversations += 1
+        logger.debug(f"Loaded conversation {conversation_id} from store")
+        return conversation
+
+    def _is_missing(self, conversation_id: str) -> bool:
+        """Whether the store recently had no such conversation"""
+        now = time.monotonic()
+        # Oldest expiry is at the front; drop the expired ones first
+        while self._misses and next(iter(self._misses.values())) <= now:
+            self._misses.popitem(last=False)
+        return conversation_id in self._misses
+
+    def _remember_miss(self, conversation_id: str):
+        if self.miss_ttl <= 0:
+            return
+        self._misses.pop(conversation_id, None)
+        self._misses[conversation_id] = time.monotonic() + self.miss_ttl
+        while len(self._misses) > self.max_misses:
+            self._misses.popitem(last=False)
+
     def create_conversation(
         self,
         type: Literal["npc_user", "npc_npc", "group"],
@@ -81,8 +220,10 @@ class ConversationManagerV2:
                 name=participant2_data.get("name", f"Entity_{participant2_data['id']}")
             )
 
+            # Make room by dropping the least recently active conversation
+            self._make_room()
+
             conversation_id = str(uuid.uuid4())
-            now = datetime.now()
             
             conversation = Conversation(
                 id=conversation_id,
@@ -91,20 +232,19 @@ class ConversationManagerV2:
                     participant1.id: participant1,
                     participant2.id: participant2
                 },
-                messages=[],
-                created_at=now,
-                last_update=now,
-                metadata={}
+                created_at=datetime.now(),
+                max_messages=self.max_messages
             )
             
-            # Store conversation
-            self.conversations[conversation_id] = conversation
-            
-            # Update participant indexes
-            for p_id in [participant1.id, participant2.id]:
-                if p_id not in self.participant_conversations:
-                    self.participant_conversations[p_id] = []
-                self.participant_conversations[p_id].append(conversation_id)
+            # Store conversation and update participant indexes
+            self._track(conversation)
+            if self.store:
+                self.store.save_conversation(
+                    conversation_id,
+                    type,
+                    {pid: p.model_dump() for pid, p in conversation.participants.items()},
+                    conversation.created_at
+                )
             
             # Update metrics
             self.metrics.total_conversations += 1
@@ -120,18 +260,16 @@ class ConversationManagerV2:
     def add_message(self, conversation_id: str, sender_id: str, content: str) -> bool:
         """Add a message to a conversation"""
         try:
-            conversation = self.conversations.get(conversation_id)
+            conversation = self._get(conversation_id)
             if not conversation:
                 return False
                 
-            message = Message(
-                sender_id=sender_id,
-                content=content,
-                timestamp=datetime.now()
-            )
-            
-            conversation.messages.append(message)
-            conversation.last_update = datetime.now()
+            now = datetime.now()
+            conversation.messages.append(Message(sender_id, content, now))
+            conversation.last_update = now
+            self.conversations.move_to_end(conversation_id)
+            if self.store:
+                self.store.append_message(conversation_id, sender_id, content, now)
             
             # Update metrics
             self.metrics.total_messages += 1
@@ -144,7 +282,7 @@ class ConversationManagerV2:
     def end_conversation(self, conversation_id: str) -> bool:
         """End and clean up a conversation"""
         try:
-            conversation = self.conversations.get(conversation_id)
+            conversation = self._get(conversation_id)
             if not conversation:
                 return False
                 
@@ -158,13 +296,10 @@ class ConversationManagerV2:
                 avg_time = total_time / len(conversation.messages)
                 self._update_average_response_time(avg_time)
             
-            # Remove from participant tracking
-            for participant_id in conversation.participants:
-                if participant_id in self.participant_conversations:
-                    self.participant_conversations[participant_id].remove(conversation_id)
-                    
-            # Remove conversation
-            del self.conversations[conversation_id]
+            # Remove conversation and participant tracking
+            self._forget(conversation_id)
+            if self.store:
+                self.store.end_conversation(conversation_id)
             return True
             
         except Exception as e:
@@ -182,19 +317,19 @@ class ConversationManagerV2:
 
     def get_history(self, conversation_id: str, limit: Optional[int] = None) -> List[str]:
         """Get conversation history as a list of messages"""
-        conversation = self.conversations.get(conversation_id)
+        conversation = self._get(conversation_id)
         if not conversation:
             return []
             
-        messages = [msg.content for msg in conversation.messages]
-        if limit:
-            messages = messages[-limit:]
+        messages = conversation.messages
+        if limit and limit < len(messages):
+            return [messages[i].content for i in range(len(messages) - limit, len(messages))]
             
-        return messages
+        return [msg.content for msg in messages]
 
     def get_conversation_context(self, conversation_id: str) -> Dict:
         """Get full conversation context"""
-        conversation = self.conversations.get(conversation_id)
+        conversation = self._get(conversation_id)
         if not conversation:
             return {}
             
@@ -212,18 +347,20 @@ class ConversationManagerV2:
 
     def get_active_conversations(self, participant_id: str) -> List[str]:
         """Get all active conversations for a participant"""
-        return self.participant_conversations.get(participant_id, [])
+        return list(self.participant_conversations.get(participant_id, ()))
 
     def cleanup_expired(self) -> int:
         """Remove expired conversations"""
-        now = datetime.now()
-        expired = []
-        
-        for conv_id, conv in self.conversations.items():
-            if now - conv.last_update > self.expiry_time:
-                expired.append(conv_id)
-                
-        for conv_id in expired:
-            self.end_conversation(conv_id)
+        cutoff = datetime.now() - self.expiry_time
+        expired = 0
+
+        # Oldest activity is at the front; stop at the first live conversation
+        while self.conversations:
+            conv_id, conv = next(iter(self.conversations.items()))
+            if conv.last_update >= cutoff:
+                break
+            if not self.end_conversation(conv_id):
+                self.conversations.pop(conv_id, None)
+            expired += 1
             
-        return len(expired)
\ No newline at end of file
+        return expired
\ No newline at end of file
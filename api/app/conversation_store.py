@@ -0,0 +1,208 @@
+"""SQLite persistence for conversation history with write-behind batching"""
+import atexit
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from .config import SQLITE_DB_PATH, CONVERSATION_FLUSH_MS
+from .database import load_migration
+from .logging_utils import get_logger
+
+logger = get_logger("db")
+
+# The conversation tables, from db/migrations/011_add_conversation_store.py
+SCHEMA = load_migration("011_add_conversation_store").SCHEMA
+
+class ConversationStore:
+    """Write-behind conversation persistence
+
+    Writes are buffered in memory and flushed by a background thread in one
+    transaction every ``flush_interval_ms`` (or sooner once ``max_batch``
+    messages are pending), so callers never wait on SQLite. Reads overlay the
+    pending buffer on what is stored, so a process always sees its own writes
+    without forcing a flush; other workers see them after the next flush.
+    """
+
+    def __init__(
+        self,
+        db_path: Union[str, Path] = SQLITE_DB_PATH,
+        flush_interval_ms: int = CONVERSATION_FLUSH_MS,
+        max_batch: int = 500
+    ):
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.max_batch = max_batch
+
+        self._db = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA busy_timeout=5000")
+        self._db.executescript(SCHEMA)
+        self._db_lock = threading.Lock()
+
+        self._lock = threading.Lock()
+        self._conversations: Dict[str, Tuple] = {}
+        self._messages: List[Tuple] = []
+        self._touched: Dict[str, str] = {}
+        self._ended: Dict[str, str] = {}
+
+        self.flushes = 0
+        self.flushed_messages = 0
+
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._flush_loop, name="conversation-store", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def save_conversation(
+        self,
+        conversation_id: str,
+        type: str,
+        participants: Dict[str, Dict[str, Any]],
+        created_at: datetime,
+        metadata: Optional[Dict[str, Any]] = None
+    ):
+        """Queue creation (or replacement) of a conversation record"""
+        created = created_at.isoformat()
+        with self._lock:
+            self._conversations[conversation_id] = (
+                conversation_id, type, json.dumps(participants),
+                json.dumps(metadata or {}), created, created
+            )
+            self._ended.pop(conversation_id, None)
+
+    def append_message(self, conversation_id: str, sender_id: str, content: str, timestamp: datetime):
+        """Queue a message and bump the conversation's last update"""
+        sent_at = timestamp.isoformat()
+        with self._lock:
+            self._messages.append((conversation_id, sender_id, content, sent_at))
+            self._touched[conversation_id] = sent_at
+            pending = len(self._messages)
+        if pending >= self.max_batch:
+            self._wake.set()
+
+    def end_conversation(self, conversation_id: str, ended_at: Optional[datetime] = None):
+        """Queue marking a conversation as ended"""
+        with self._lock:
+            self._ended[conversation_id] = (ended_at or datetime.now()).isoformat()
+
+    def load_conversation(self, conversation_id: str, limit: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Load an active conversation and its most recent messages, pending writes included"""
+        # Same lock order as flush, so the buffer and the tables are read as one state
+        with self._db_lock:
+            with self._lock:
+                if conversation_id in self._ended:
+                    return None
+                pending = self._conversations.get(conversation_id)
+                touched = self._touched.get(conversation_id)
+                pending_messages = [message[1:] for message in self._messages if message[0] == conversation_id]
+
+            row = self._db.execute("""
+                SELECT * FROM conversations
+                WHERE id = ? AND ended_at IS NULL
+            """, (conversation_id,)).fetchone()
+            if pending is not None:
+                # A queued save replaces the stored row (and revives it if ended)
+                row = dict(zip(("id", "type", "participants", "metadata", "created_at", "last_update"), pending))
+            if not row:
+                return None
+
+            if limit:
+                messages = self._db.execute("""
+                    SELECT sender_id, content, timestamp FROM conversation_messages
+                    WHERE conversation_id = ?
+                    ORDER BY id DESC LIMIT ?
+                """, (conversation_id, limit)).fetchall()[::-1]
+            else:
+                messages = self._db.execute("""
+                    SELECT sender_id, content, timestamp FROM conversation_messages
+                    WHERE conversation_id = ?
+                    ORDER BY id
+                """, (conversation_id,)).fetchall()
+
+        messages = [(msg["sender_id"], msg["content"], msg["timestamp"]) for msg in messages] + pending_messages
+        if limit:
+            messages = messages[-limit:]
+        last_update = datetime.fromisoformat(row["last_update"])
+        if touched is not None:
+            last_update = max(last_update, datetime.fromisoformat(touched))
+
+        return {
+            "id": row["id"],
+            "type": row["type"],
+            "participants": json.loads(row["participants"]),
+            "metadata": json.loads(row["metadata"]),
+            "created_at": datetime.fromisoformat(row["created_at"]),
+            "last_update": last_update,
+            "messages": [
+                (sender_id, content, datetime.fromisoformat(sent_at))
+                for sender_id, content, sent_at in messages
+            ]
+        }
+
+    def pending(self) -> int:
+        """Number of buffered writes not yet flushed"""
+        with self._lock:
+            return len(self._conversations) + len(self._messages) + len(self._touched) + len(self._ended)
+
+    def flush(self):
+        """Write all buffered changes in a single transaction"""
+        # Holding the DB lock across the swap keeps batches in queue order
+        with self._db_lock:
+            with self._lock:
+                if not (self._conversations or self._messages or self._touched or self._ended):
+                    return
+                conversations, self._conversations = self._conversations, {}
+                messages, self._messages = self._messages, []
+                touched, self._touched = self._touched, {}
+                ended, self._ended = self._ended, {}
+
+            try:
+                with self._db:
+                    self._db.executemany("""
+                        INSERT OR REPLACE INTO conversations
+                        (id, type, participants, metadata, created_at, last_update)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                    """, conversations.values())
+                    self._db.executemany("""
+                        INSERT INTO conversation_messages (conversation_id, sender_id, content, timestamp)
+                        VALUES (?, ?, ?, ?)
+                    """, messages)
+                    self._db.executemany("""
+                        UPDATE conversations SET last_update = ? WHERE id = ?
+                    """, [(sent_at, conv_id) for conv_id, sent_at in touched.items()])
+                    self._db.executemany("""
+                        UPDATE conversations SET ended_at = ? WHERE id = ?
+                    """, [(ended_at, conv_id) for conv_id, ended_at in ended.items()])
+            except Exception as e:
+                logger.error(f"Error flushing conversation store: {e}")
+                # Put the batch back in front of anything queued meanwhile
+                with self._lock:
+                    self._conversations = {**conversations, **self._conversations}
+                    self._messages = messages + self._messages
+                    self._touched = {**touched, **self._touched}
+                    self._ended = {**ended, **self._ended}
+                return
+
+            self.flushes += 1
+            self.flushed_messages += len(messages)
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def close(self):
+        """Stop the flusher and write anything still buffered"""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join()
+        self.flush()
+        with self._db_lock:
+            self._db.close()
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Request, Depends, Query, Body
 from fastapi.responses import JSONResponse
@@ -44,10 +45,12 @@ import uuid
 from fastapi.templating import Jinja2Templates
 import sqlite3
 from enum import Enum
-from openai import OpenAI
 import numpy as np
 from scipy.spatial.distance import cosine
 from .security import require_admin, require_game_key
+from .metrics import metrics
+from .clients import get_openai_client
+from .cache import CacheChange, publish_change
 
 logger = logging.getLogger("roblox_app")
 
@@ -63,12 +66,9 @@ router = APIRouter()  # No security check
 BASE_DIR = Path(__file__).resolve().parent.parent
 templates = Jinja2Templates(directory=str(BASE_DIR / "templates"))
 
-# Initialize OpenAI client
-client = OpenAI()
-
 def get_embedding(text: str) -> List[float]:
     """Get OpenAI embedding for text"""
-    response = client.embeddings.create(
+    response = get_openai_client().embeddings.create(
         model="text-embedding-ada-002",
         input=text
     )
@@ -501,6 +501,7 @@ async def update_asset(game_id: int, asset_id: str, request: Request):
                 
                 logger.info(f"Successfully updated asset: {dict(updated)}")
                 db.commit()
+                await asyncio.to_thread(publish_change, CacheChange("assets", asset_id, game_id))
                 
                 # Get game slug for file updates
                 cursor = db.execute("SELECT slug FROM games WHERE id = ?", (game_id,))
@@ -663,6 +664,7 @@ async def update_npc(npc_id: str, game_id: int, request: Request):
             save_lua_database(game_slug, db)
             
             db.commit()
+            await asyncio.to_thread(publish_change, CacheChange("npcs", npc_id, game_id))
             return JSONResponse(npc_data)
             
     except Exception as e:
@@ -809,6 +811,7 @@ async def create_asset(
             ))
             db_id = cursor.fetchone()['id']
             db.commit()
+            await asyncio.to_thread(publish_change, CacheChange("assets", asset_id, game_id))
             
             save_lua_database(game_slug, db)
             
@@ -879,6 +882,7 @@ async def create_npc(
                 spawnX, spawnY, spawnZ, abilities
             ))
             db.commit()
+            await asyncio.to_thread(publish_change, CacheChange("npcs", npc_id, game_id))
             
             # Now we have game_slug defined
             save_lua_database(game_slug, db)
@@ -922,6 +926,7 @@ async def delete_npc(npc_id: str, game_id: int):
             """, (npc_id, game_id))
             
             db.commit()
+            await asyncio.to_thread(publish_change, CacheChange("npcs", npc_id, game_id))
             
             # Update Lua files with game_slug
             save_lua_database(game_slug, db)
@@ -966,6 +971,7 @@ async def delete_asset(game_id: int, asset_id: str):
                 save_lua_database(game_slug, db)
                 
                 db.commit()
+                await asyncio.to_thread(publish_change, CacheChange("assets", asset_id, game_id))
                 return JSONResponse({"message": "Asset deleted successfully"})
                 
             except Exception as e:
@@ -1341,7 +1347,7 @@ async def toggle_npc(npc_id: str, request: Request):
         with get_db() as db:
             # First get game info for Lua update
             cursor = db.execute("""
-                SELECT g.slug 
+                SELECT g.id, g.slug 
                 FROM games g 
                 JOIN npcs n ON n.game_id = g.id 
                 WHERE n.npc_id = ?
@@ -1357,6 +1363,7 @@ async def toggle_npc(npc_id: str, request: Request):
                 (enabled, npc_id)
             )
             db.commit()
+            await asyncio.to_thread(publish_change, CacheChange("npcs", npc_id, game['id']))
             
             # Verify the update
             cursor = db.execute(
@@ -1375,6 +1382,16 @@ async def toggle_npc(npc_id: str, request: Request):
         logger.error(f"Failed to toggle NPC: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/api/metrics")
+async def get_metrics_summary():
+    """Per-stage latency summary (count, mean, p50/p95/p99) for the dashboard"""
+    return metrics.summary()
+
+@router.get("/dashboard/metrics")
+async def metrics_dashboard(request: Request):
+    """Render the latency summary as a table"""
+    return templates.TemplateResponse(request, "metrics.html", {"summary": metrics.summary()})
+
 # ... rest of your existing routes ...
 
 
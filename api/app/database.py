@@ -1,12 +1,14 @@
 import sqlite3
 from contextlib import contextmanager
+from importlib import util as importlib_util
 from pathlib import Path
 import json
-from .config import SQLITE_DB_PATH
+from .config import SQLITE_DB_PATH, DEFAULT_GAME_ID, MIGRATIONS_DIR
 from .paths import get_database_paths
-from typing import Optional, Dict, Any, Union, List
+from typing import Optional, Dict, Any, Union, List, Set
 from .models import AgentMapping
-import logging
+from .logging_utils import get_logger
+from .metrics import metrics
 
 __all__ = [
     'get_db',
@@ -17,7 +19,7 @@ __all__ = [
     'get_agent_mapping'
 ]
 
-logger = logging.getLogger("roblox_app")
+logger = get_logger("db")
 
 @contextmanager
 def get_db():
@@ -28,6 +30,13 @@ def get_db():
     finally:
         db.close()
 
+def load_migration(name: str):
+    """Import a db/migrations module by file name, the way run_migrations does"""
+    spec = importlib_util.spec_from_file_location(name, MIGRATIONS_DIR / f"{name}.py")
+    module = importlib_util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
 def generate_lua_from_db(game_slug: str, db_type: str) -> None:
     """Generate Lua file directly from database data"""
     with get_db() as db:
@@ -315,6 +324,7 @@ def migrate_existing_data():
             db.rollback()
             raise
 
+@metrics.timed("sqlite")
 def fetch_all_games():
     """Fetch all games from the database"""
     with get_db() as db:
@@ -341,6 +351,7 @@ def create_game(title: str, slug: str, description: str):
             db.rollback()
             raise e
 
+@metrics.timed("sqlite")
 def fetch_game(slug: str):
     """Fetch a single game by slug"""
     with get_db() as db:
@@ -414,6 +425,7 @@ def count_npcs(game_id: int):
         result = cursor.fetchone()
         return result['count'] if result else 0
 
+@metrics.timed("sqlite")
 def fetch_assets_by_game(game_id: int):
     """Fetch assets for a specific game"""
     with get_db() as db:
@@ -424,6 +436,7 @@ def fetch_assets_by_game(game_id: int):
         """, (game_id,))
         return [dict(row) for row in cursor.fetchall()]
 
+@metrics.timed("sqlite")
 def fetch_npcs_by_game(game_id: int):
     """Fetch NPCs for a specific game"""
     with get_db() as db:
@@ -436,6 +449,17 @@ def fetch_npcs_by_game(game_id: int):
         """, (game_id,))
         return [dict(row) for row in cursor.fetchall()]
 
+@metrics.timed("sqlite")
+def get_enabled_npc_ids() -> Set[str]:
+    """Get the ids of all enabled NPCs"""
+    with get_db() as db:
+        cursor = db.execute("""
+            SELECT npc_id FROM npcs
+            WHERE enabled IS NULL OR enabled = 1
+        """)
+        return {row['npc_id'] for row in cursor.fetchall()}
+
+@metrics.timed("sqlite")
 def get_npc_context(npc_id: str) -> Optional[Dict]:
     """Get NPC details from database"""
     # What fields are we selecting?
@@ -472,6 +496,7 @@ My appearance: {result["asset_description"] or f'You are a {result["asset_name"]
             "description": result["asset_description"]
         }
 
+@metrics.timed("sqlite")
 def create_agent_mapping(npc_id: str, participant_id: str, agent_id: str) -> AgentMapping:
     """Create a new agent mapping"""
     with get_db() as db:
@@ -484,6 +509,7 @@ def create_agent_mapping(npc_id: str, participant_id: str, agent_id: str) -> Age
         db.commit()
         return AgentMapping(**dict(result))
 
+@metrics.timed("sqlite")
 def get_agent_mapping(npc_id: str, participant_id: str, strict_order: bool = True) -> Optional[AgentMapping]:
     """Get existing NPC agent mapping"""
     with get_db() as db:
@@ -551,6 +577,7 @@ def debug_show_npc(npc_id: str):
         else:
             print(f"No NPC found with ID: {npc_id}")
 
+@metrics.timed("sqlite")
 def store_player_description(
     player_id: str, 
     description: str,
@@ -565,6 +592,7 @@ def store_player_description(
         """, (player_id, description, display_name))
         db.commit()
 
+@metrics.timed("sqlite")
 def get_player_description(participant_id: str) -> str:
     """Get stored player description from database"""
     with get_db() as db:
@@ -574,6 +602,7 @@ def get_player_description(participant_id: str) -> str:
         ).fetchone()
         return result['description'] if result else ""
 
+@metrics.timed("sqlite")
 def get_player_info(participant_id: str) -> Dict[str, str]:
     """Get full player info from database"""
     with get_db() as db:
@@ -586,8 +615,49 @@ def get_player_info(participant_id: str) -> Dict[str, str]:
             "display_name": result['display_name'] if result else None
         }
 
-def get_location_coordinates(slug: str, game_id: int = 61) -> Optional[Dict]:
+@metrics.timed("sqlite")
+def get_player_infos(participant_ids: List[str], chunk_size: int = 500) -> Dict[str, Dict[str, str]]:
+    """Get player info for many players in batched IN (...) queries; unknown ids are omitted"""
+    results = {}
+    with get_db() as db:
+        for start in range(0, len(participant_ids), chunk_size):
+            chunk = participant_ids[start:start + chunk_size]
+            placeholders = ",".join("?" * len(chunk))
+            for row in db.execute(
+                f"SELECT player_id, description, display_name FROM player_descriptions WHERE player_id IN ({placeholders})",
+                chunk
+            ):
+                results[row['player_id']] = {
+                    "description": row['description'] or "",
+                    "display_name": row['display_name']
+                }
+    return results
+
+@metrics.timed("sqlite")
+def get_player_infos_by_name(display_names: List[str], chunk_size: int = 500) -> Dict[str, Dict[str, str]]:
+    """Get player info by display name in batched queries; the latest row wins if a name is shared"""
+    results = {}
+    with get_db() as db:
+        for start in range(0, len(display_names), chunk_size):
+            chunk = display_names[start:start + chunk_size]
+            placeholders = ",".join("?" * len(chunk))
+            for row in db.execute(
+                f"""SELECT player_id, description, display_name FROM player_descriptions
+                    WHERE display_name IN ({placeholders}) ORDER BY updated_at""",
+                chunk
+            ):
+                results[row['display_name']] = {
+                    "player_id": row['player_id'],
+                    "description": row['description'] or "",
+                    "display_name": row['display_name']
+                }
+    return results
+
+@metrics.timed("sqlite")
+def get_location_coordinates(slug: str, game_id: Optional[int] = None) -> Optional[Dict]:
     """Get location coordinates from assets table"""
+    if game_id is None:
+        game_id = DEFAULT_GAME_ID
     try:
         with get_db() as db:
             # Match the query from the locations endpoint
@@ -624,8 +694,11 @@ def get_location_coordinates(slug: str, game_id: int = 61) -> Optional[Dict]:
         logger.error(f"Error getting location coordinates: {str(e)}")
         return None
 
-def get_all_locations(game_id: int = 61) -> List[Dict]:
+@metrics.timed("sqlite")
+def get_all_locations(game_id: Optional[int] = None) -> List[Dict]:
     """Get all locations with their coordinates and metadata"""
+    if game_id is None:
+        game_id = DEFAULT_GAME_ID
     try:
         with get_db() as db:
             query = """
@@ -665,6 +738,7 @@ def get_all_locations(game_id: int = 61) -> List[Dict]:
         logger.error(f"Error getting locations: {str(e)}")
         return []
 
+@metrics.timed("sqlite")
 def create_agent_mapping_v3(npc_id: str, agent_id: str) -> AgentMapping:
     """Create a new v3 agent mapping (group chatbot)"""
     with get_db() as db:
@@ -677,6 +751,7 @@ def create_agent_mapping_v3(npc_id: str, agent_id: str) -> AgentMapping:
         db.commit()
         return AgentMapping(**dict(result))
 
+@metrics.timed("sqlite")
 def get_agent_mapping_v3(npc_id: str) -> Optional[AgentMapping]:
     """Get agent mapping for group chatbot"""
     with get_db() as db:
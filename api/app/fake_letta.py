@@ -0,0 +1,350 @@
+"""A fake Letta server for load and regression testing
+
+Implements the part of the Letta API this app uses: creating and listing
+agents, ``agents.messages.create`` (replies with reasoning, an optional tool
+call and an assistant message), ``agents.messages.create_stream`` (the same
+reply split into token chunks) and core memory block get/update. Every
+call can be slowed down and made to fail at a configurable rate, so the
+resilience and throughput of the real endpoints can be measured without a
+live server.
+
+Two ways to use it:
+
+- In process: ``set_letta_client(FakeLettaClient(FakeLetta(latency=0.05)))``
+- Over HTTP: ``python -m app.fake_letta --port 8283 --latency-ms 50`` and
+  point LETTA_BASE_URL at it; any Letta client talks to it as usual
+"""
+import argparse
+import itertools
+import json
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+class FakeLettaError(Exception):
+    """An injected (or not-found) failure, with the HTTP status it maps to"""
+
+    def __init__(self, message: str, status_code: int = 500):
+        super().__init__(message)
+        self.status_code = status_code
+
+class FakeLetta:
+    """In-memory agents and memory blocks with injected latency and errors
+
+    ``latency`` (+ up to ``jitter``) seconds is slept on every call and
+    ``error_rate`` of calls raise a 500. Every ``tool_call_every``-th reply
+    carries a ``navigate_to`` tool call (0 disables tool calls).
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        tool_call_every: int = 3,
+        seed: Optional[int] = None
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.tool_call_every = tool_call_every
+        self.agents: Dict[str, Dict[str, Any]] = {}
+        self.calls: Dict[str, int] = {}
+        self._rng = random.Random(seed)
+        self._replies = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _simulate(self, operation: str):
+        with self._lock:
+            self.calls[operation] = self.calls.get(operation, 0) + 1
+            delay = self.latency + (self._rng.random() * self.jitter if self.jitter else 0.0)
+            failed = self.error_rate > 0 and self._rng.random() < self.error_rate
+        if delay:
+            time.sleep(delay)
+        if failed:
+            raise FakeLettaError(f"Injected failure in {operation}")
+
+    def _agent(self, agent_id: str) -> Dict[str, Any]:
+        agent = self.agents.get(agent_id)
+        if agent is None:
+            raise FakeLettaError(f"Agent {agent_id} not found", status_code=404)
+        return agent
+
+    def create_agent(self, name: str, memory_blocks: Iterable[Any] = ()) -> Dict[str, Any]:
+        self._simulate("agents.create")
+        blocks = {}
+        for block in memory_blocks or ():
+            label = block["label"] if isinstance(block, dict) else block.label
+            value = block["value"] if isinstance(block, dict) else block.value
+            blocks[label] = value if isinstance(value, str) else json.dumps(value)
+        agent_id = f"agent-{uuid.uuid4()}"
+        with self._lock:
+            self.agents[agent_id] = {"id": agent_id, "name": name, "blocks": blocks, "messages": 0}
+        return self.agent_state(agent_id)
+
+    def agent_state(self, agent_id: str) -> Dict[str, Any]:
+        agent = self._agent(agent_id)
+        return {
+            "id": agent_id,
+            "name": agent["name"],
+            "memory": {"blocks": [self.block_state(agent_id, label) for label in agent["blocks"]]}
+        }
+
+    def list_agents(self, after: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Agents in creation order; ``after`` is the cursor clients page with"""
+        self._simulate("agents.list")
+        agent_ids = list(self.agents)
+        if after in self.agents:
+            agent_ids = agent_ids[agent_ids.index(after) + 1:]
+        return [self.agent_state(agent_id) for agent_id in agent_ids[:limit]]
+
+    def delete_agent(self, agent_id: str):
+        self._simulate("agents.delete")
+        with self._lock:
+            self._agent(agent_id)
+            del self.agents[agent_id]
+
+    def block_state(self, agent_id: str, label: str) -> Dict[str, Any]:
+        blocks = self._agent(agent_id)["blocks"]
+        if label not in blocks:
+            raise FakeLettaError(f"Block {label} not found for {agent_id}", status_code=404)
+        return {"id": f"block-{agent_id}-{label}", "label": label, "value": blocks[label], "limit": 5000}
+
+    def retrieve_block(self, agent_id: str, label: str) -> Dict[str, Any]:
+        self._simulate("blocks.retrieve")
+        return self.block_state(agent_id, label)
+
+    def update_block(self, agent_id: str, label: str, value: str) -> Dict[str, Any]:
+        self._simulate("blocks.update")
+        with self._lock:
+            self._agent(agent_id)["blocks"][label] = value
+        return self.block_state(agent_id, label)
+
+    def send_messages(self, agent_id: str, messages: Iterable[Any]) -> Dict[str, Any]:
+        self._simulate("messages.create")
+        return self._reply(agent_id, messages)
+
+    def stream_messages(self, agent_id: str, messages: Iterable[Any]) -> Iterator[Dict[str, Any]]:
+        """The reply as streamed with ``stream_tokens``: text and tool arguments arrive in pieces"""
+        self._simulate("messages.create_stream")
+        return self._chunks(self._reply(agent_id, messages))
+
+    @staticmethod
+    def _chunks(reply: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        for message in reply["messages"]:
+            if message["message_type"] == "assistant_message":
+                words = message["content"].split(" ")
+                for i, word in enumerate(words):
+                    yield {**message, "content": word if i == len(words) - 1 else word + " "}
+            elif message["message_type"] == "tool_call_message":
+                arguments = message["tool_call"]["arguments"]
+                middle = len(arguments) // 2
+                for piece in (arguments[:middle], arguments[middle:]):
+                    yield {**message, "tool_call": {**message["tool_call"], "arguments": piece}}
+            else:
+                yield message
+        yield reply["stop_reason"]
+        yield reply["usage"]
+
+    def _reply(self, agent_id: str, messages: Iterable[Any]) -> Dict[str, Any]:
+        agent = self._agent(agent_id)
+        with self._lock:
+            agent["messages"] += 1
+            reply = next(self._replies)
+
+        last = list(messages or [])[-1:] or [{}]
+        content = last[0].get("content", "") if isinstance(last[0], dict) else getattr(last[0], "content", "")
+        now = datetime.now(timezone.utc).isoformat()
+        response = [{
+            "id": f"message-{uuid.uuid4()}", "date": now, "message_type": "reasoning_message",
+            "reasoning": f"Replying to: {str(content)[:80]}"
+        }]
+        if self.tool_call_every and reply % self.tool_call_every == 0:
+            call_id = f"call-{uuid.uuid4().hex[:12]}"
+            response.append({
+                "id": f"message-{uuid.uuid4()}", "date": now, "message_type": "tool_call_message",
+                "tool_call": {"name": "navigate_to", "arguments": json.dumps({"destination_slug": "market"}), "tool_call_id": call_id}
+            })
+            response.append({
+                "id": f"message-{uuid.uuid4()}", "date": now, "message_type": "tool_return_message",
+                "tool_return": "Navigating to market", "status": "success", "tool_call_id": call_id
+            })
+        response.append({
+            "id": f"message-{uuid.uuid4()}", "date": now, "message_type": "assistant_message",
+            "content": f"{agent['name']} says hello! (reply {reply})"
+        })
+        return {
+            "messages": response,
+            "stop_reason": {"message_type": "stop_reason", "stop_reason": "end_turn"},
+            "usage": {"message_type": "usage_statistics", "step_count": 1}
+        }
+
+def _namespace(value: Any) -> Any:
+    """Dicts to attribute access, the way client response models read"""
+    if isinstance(value, dict):
+        return SimpleNamespace(**{key: _namespace(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return [_namespace(item) for item in value]
+    return value
+
+class _Blocks:
+    def __init__(self, backend: FakeLetta):
+        self._backend = backend
+
+    def retrieve(self, block_label: str, *, agent_id: str, **_):
+        return _namespace(self._backend.retrieve_block(agent_id, block_label))
+
+    def update(self, block_label: str, *, agent_id: str, value: str, **_):
+        return _namespace(self._backend.update_block(agent_id, block_label, value))
+
+    # Older client names for the same calls
+    def retrieve_block(self, agent_id: str, block_label: str, **_):
+        return self.retrieve(block_label, agent_id=agent_id)
+
+    def modify_block(self, agent_id: str, block_label: str, value: str, **_):
+        return self.update(block_label, agent_id=agent_id, value=value)
+
+    modify = update
+
+class _Messages:
+    def __init__(self, backend: FakeLetta):
+        self._backend = backend
+
+    def create(self, agent_id: str, *, messages: Iterable[Any] = (), **_):
+        return _namespace(self._backend.send_messages(agent_id, messages))
+
+    def create_stream(self, agent_id: str, *, messages: Iterable[Any] = (), **_):
+        return _FakeStream(self._backend.stream_messages(agent_id, messages))
+
+class _FakeStream:
+    """Iterable of stream chunks with the client's ``close``"""
+
+    def __init__(self, chunks: Iterator[Dict[str, Any]]):
+        self._chunks = chunks
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            yield _namespace(chunk)
+
+    def close(self):
+        self._chunks.close()
+
+class _Agents:
+    def __init__(self, backend: FakeLetta):
+        self._backend = backend
+        self.blocks = _Blocks(backend)
+        self.core_memory = self.blocks
+        self.messages = _Messages(backend)
+
+    def create(self, *, name: str = "agent", memory_blocks: Iterable[Any] = (), **_):
+        return _namespace(self._backend.create_agent(name, memory_blocks))
+
+    def retrieve(self, agent_id: str, **_):
+        return _namespace(self._backend.agent_state(agent_id))
+
+    def list(self, **_):
+        return _namespace(self._backend.list_agents())
+
+    def delete(self, agent_id: str, **_):
+        self._backend.delete_agent(agent_id)
+
+class FakeLettaClient:
+    """Drop-in for the Letta client object, backed by a FakeLetta"""
+
+    def __init__(self, backend: Optional[FakeLetta] = None):
+        self.backend = backend or FakeLetta()
+        self.agents = _Agents(self.backend)
+
+def create_fake_letta_app(backend: Optional[FakeLetta] = None):
+    """FastAPI app serving the Letta REST paths the client calls"""
+    from fastapi import Body, FastAPI
+    from fastapi.responses import JSONResponse, StreamingResponse
+
+    backend = backend or FakeLetta()
+    app = FastAPI(title="Fake Letta")
+    app.state.backend = backend
+
+    @app.exception_handler(FakeLettaError)
+    async def fake_error(request, exc: FakeLettaError):
+        return JSONResponse(status_code=exc.status_code, content={"detail": str(exc)})
+
+    # Handlers are plain functions so injected latency runs in the threadpool
+    @app.get("/")
+    @app.get("/v1/health")
+    def health():
+        return {"status": "ok", "version": "fake"}
+
+    @app.get("/api/version")
+    def version():
+        return {"version": "fake"}
+
+    @app.post("/v1/agents")
+    @app.post("/v1/agents/")
+    def create_agent(body: Dict[str, Any] = Body(...)):
+        return backend.create_agent(body.get("name", "agent"), body.get("memory_blocks") or ())
+
+    @app.get("/v1/agents")
+    @app.get("/v1/agents/")
+    def list_agents(after: Optional[str] = None, limit: Optional[int] = None):
+        return backend.list_agents(after, limit)
+
+    @app.get("/v1/agents/{agent_id}")
+    def retrieve_agent(agent_id: str):
+        return backend.agent_state(agent_id)
+
+    @app.delete("/v1/agents/{agent_id}")
+    def delete_agent(agent_id: str):
+        backend.delete_agent(agent_id)
+        return {}
+
+    @app.get("/v1/agents/{agent_id}/core-memory/blocks/{label}")
+    def retrieve_block(agent_id: str, label: str):
+        return backend.retrieve_block(agent_id, label)
+
+    @app.patch("/v1/agents/{agent_id}/core-memory/blocks/{label}")
+    def update_block(agent_id: str, label: str, body: Dict[str, Any] = Body(...)):
+        return backend.update_block(agent_id, label, body["value"])
+
+    @app.post("/v1/agents/{agent_id}/messages")
+    def send_messages(agent_id: str, body: Dict[str, Any] = Body(...)):
+        return backend.send_messages(agent_id, body.get("messages") or ())
+
+    @app.post("/v1/agents/{agent_id}/messages/stream")
+    def stream_messages(agent_id: str, body: Dict[str, Any] = Body(...)):
+        chunks = backend.stream_messages(agent_id, body.get("messages") or ())
+        events = (f"data: {json.dumps(chunk)}\n\n" for chunk in chunks)
+        return StreamingResponse(itertools.chain(events, ["data: [DONE]\n\n"]), media_type="text/event-stream")
+
+    @app.get("/fake/stats")
+    def stats():
+        return {"agents": len(backend.agents), "calls": backend.calls}
+
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a fake Letta server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8283)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--tool-call-every", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    import uvicorn
+    backend = FakeLetta(
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        error_rate=args.error_rate,
+        tool_call_every=args.tool_call_every,
+        seed=args.seed
+    )
+    uvicorn.run(create_fake_letta_app(backend), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Pure helpers for the ``group_members`` memory block
+
+The block looks like ``{"members": {entity_id: {...}}, "summary": str, ...}``.
+Keeping the merge here, away from the Letta client, lets a whole batch of
+member changes be folded into one block and written back in a single call.
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+def empty_group_block() -> Dict[str, Any]:
+    return {"members": {}, "summary": "No current members", "updates": []}
+
+def summarize_members(members: Dict[str, Dict]) -> str:
+    present = [member.get("name") or entity_id for entity_id, member in members.items() if member.get("is_present", True)]
+    return f"Current members: {', '.join(present)}" if present else "No current members"
+
+def merge_member_updates(
+    block: Optional[Dict[str, Any]],
+    member_updates: List[Tuple[str, Dict[str, Any]]]
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Upsert every (entity_id, update_data) into a copy of ``block``
+
+    Returns the new block and one result per update, in order, shaped like
+    ``upsert_group_member`` results so callers can report per member.
+    """
+    merged = dict(block) if block else empty_group_block()
+    members = {entity_id: dict(member) for entity_id, member in merged.get("members", {}).items()}
+
+    actions = []
+    for entity_id, update_data in member_updates:
+        existing = members.get(entity_id)
+        members[entity_id] = {**(existing or {}), **update_data}
+        if existing is None:
+            actions.append("added")
+        elif existing.get("is_present", True) != members[entity_id].get("is_present", True):
+            actions.append("joined" if members[entity_id].get("is_present", True) else "left")
+        else:
+            actions.append("updated")
+
+    merged["members"] = members
+    merged["summary"] = summarize_members(members)
+    merged["last_updated"] = datetime.now().isoformat()
+
+    data = {
+        "group_size": len(members),
+        "present_count": sum(1 for member in members.values() if member.get("is_present", True))
+    }
+    results = [
+        {
+            "entity_id": entity_id,
+            "success": True,
+            "message": f"Member {entity_id} {action}",
+            "data": data
+        }
+        for (entity_id, _), action in zip(member_updates, actions)
+    ]
+    return merged, results
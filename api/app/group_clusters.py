@@ -0,0 +1,34 @@
+"""Group-update entries built once per snapshot and shared across NPCs
+
+When a member joins several NPCs' groups in one snapshot, the group
+reconciler reports one delta per NPC. ``joining_members`` builds each
+joining member's entry (and its appearance lookup) once, and every NPC's
+batch reuses it.
+"""
+from typing import Any, Dict, Iterable, Optional
+
+from .appearance import appearances
+
+def joining_members(
+    deltas: Iterable[Any],
+    human_context: Dict[str, Any],
+    game_id: Optional[int] = None
+) -> Dict[str, Dict[str, Any]]:
+    """One group-update entry per member joining any NPC in this snapshot
+
+    Blocking (appearances may fall back to SQLite), so run it in a thread.
+    """
+    joined = sorted({member for delta in deltas for member in delta.joined})
+    appearances.prefetch(joined, game_id)
+    entries = {}
+    for member in joined:
+        context = human_context.get(member)
+        entries[member] = {
+            "entity_id": member,
+            "name": member,
+            "is_joining": True,
+            "appearance": appearances.summary(member, game_id, default="Unknown"),
+            "health_data": getattr(context, "health", None),
+            "location": getattr(context, "location", None)
+        }
+    return entries
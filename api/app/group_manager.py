@@ -1,141 +1,142 @@
-from typing import Dict, Set
+from dataclasses import dataclass
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Set
 import time
 import logging
-from .models import HumanContextData
-from .cache import (  # Use cache instead of direct DB calls
-    get_player_info,
-    get_npc_id_from_name,
-    get_agent_id,
-    NPC_CACHE
-)
+from .config import GROUP_REMOVAL_GRACE_SECONDS
+from .shared_state import SharedState, shared_state
 
 logger = logging.getLogger(__name__)
 
-class GroupMembershipManager:
-    def __init__(self):
-        self.pending_removals: Dict[str, float] = {}  # For future use
-    
-    async def handle_group_change(self, npc_id: str, context: HumanContextData, prev_state: Dict):
-        """Handle immediate group membership changes"""
-        if not context.currentGroups:
-            return
-            
-        current_members = set(context.currentGroups.members)
-        prev_members = set(prev_state.get('currentGroups', {}).get('members', []))
-        
-        # Log changes
-        if current_members != prev_members:
-            added = current_members - prev_members
-            removed = prev_members - current_members
-            if added:
-                logger.info(f"Members added to {npc_id}'s group: {added}")
-            if removed:
-                logger.info(f"Members removed from {npc_id}'s group: {removed}")
-    
-    def cancel_pending_removal(self, member_id: str):
-        """Cancel pending removal if member returns"""
-        if member_id in self.pending_removals:
-            logger.info(f"Cancelling pending removal for returning member {member_id}")
-            del self.pending_removals[member_id]
-    
-    def queue_removal(self, member_id: str):
-        """Queue member for removal"""
-        if member_id not in self.pending_removals:
-            logger.info(f"Queueing {member_id} for removal")
-            self.pending_removals[member_id] = time.time()
-    
-    def get_expired_removals(self) -> Set[str]:
-        """Get members whose removal time has expired"""
-        current_time = time.time()
-        expired = {
-            member for member, timestamp in self.pending_removals.items()
-            if current_time - timestamp > self.removal_timeout
-        }
-        for member in expired:
-            del self.pending_removals[member]
-        return expired
-
-    async def _handle_new_members(self, npc_id: str, new_members: Set[str]):
-        """Process new group members"""
-        agent_id = get_agent_id(npc_id)
-        if not agent_id:
-            logger.warning(f"No agent found for NPC {npc_id}")
+@dataclass(frozen=True)
+class GroupDelta:
+    """Membership change for one NPC's group"""
+    npc: str
+    joined: FrozenSet[str]
+    left: FrozenSet[str]
+    members: FrozenSet[str]
+
+class GroupReconciler:
+    """Derive per-NPC group deltas from consecutive snapshots
+
+    ``observe`` takes the members each NPC is seen with in a snapshot and
+    compares them with the membership already written to that NPC. Arrivals
+    are reported immediately. A member who disappears is only reported as
+    having left once they have been missing for ``removal_timeout`` seconds;
+    if they reappear first, nothing is written. NPCs whose membership did
+    not change produce no delta, so callers write once per changed NPC.
+
+    ``observe`` records the new membership as written. When the caller's
+    Letta write for a delta fails it hands the delta to ``retry``, which
+    puts the change back so the next snapshot reports it again.
+
+    State is kept in shared state per game so any worker can reconcile the
+    next snapshot. Each fold runs under a per-game lease, so workers handling
+    snapshots at the same time do not overwrite each other's result; it
+    blocks, so async callers run it in a thread.
+    """
+
+    NAMESPACE = "group_reconciler"
+
+    def __init__(
+        self,
+        removal_timeout: float = GROUP_REMOVAL_GRACE_SECONDS,
+        state: Optional[SharedState] = None,
+        clock: Callable[[], float] = time.time
+    ):
+        self.removal_timeout = removal_timeout
+        self.state = state or shared_state
+        self.clock = clock
+
+    def _key(self, game_id: Optional[int]) -> str:
+        return "default" if game_id is None else str(game_id)
+
+    def observe(self, observed: Dict[str, Iterable[str]], game_id: Optional[int] = None) -> List[GroupDelta]:
+        """Fold one snapshot's groups in; returns the NPCs whose membership changed"""
+        with self.state.lease(f"{self.NAMESPACE}:lease", self._key(game_id), ttl=30.0, timeout=30.0):
+            return self._observe(observed, game_id)
+
+    def _observe(self, observed: Dict[str, Iterable[str]], game_id: Optional[int]) -> List[GroupDelta]:
+        now = self.clock()
+        saved = self.state.get(self.NAMESPACE, self._key(game_id)) or {}
+        members: Dict[str, Set[str]] = {npc: set(names) for npc, names in saved.get("members", {}).items()}
+        pending: Dict[str, Dict[str, float]] = saved.get("pending", {})
+
+        deltas = []
+        for npc in set(observed) | set(members):
+            seen = set(observed.get(npc, ())) - {npc}
+            current = members.get(npc, set())
+            departing = pending.get(npc, {})
+
+            # Returning members cancel their pending removal; new departures start one
+            for member in seen & departing.keys():
+                logger.debug(f"{member} returned to {npc}'s group")
+                del departing[member]
+            for member in current - seen - departing.keys():
+                departing[member] = now
+
+            joined = seen - current
+            left = {member for member, since in departing.items() if now - since >= self.removal_timeout}
+            for member in left:
+                del departing[member]
+
+            if departing:
+                pending[npc] = departing
+            else:
+                pending.pop(npc, None)
+
+            if joined or left:
+                current = (current | joined) - left
+                deltas.append(GroupDelta(npc, frozenset(joined), frozenset(left), frozenset(current)))
+            if current:
+                members[npc] = current
+            else:
+                members.pop(npc, None)
+
+        self.state.set(self.NAMESPACE, self._key(game_id), {
+            "members": {npc: sorted(names) for npc, names in members.items()},
+            "pending": pending
+        })
+        if deltas:
+            logger.info(f"Group changes: {[(d.npc, sorted(d.joined), sorted(d.left)) for d in deltas]}")
+        return deltas
+
+    def retry(self, deltas: Iterable[GroupDelta], game_id: Optional[int] = None):
+        """Undo deltas whose write failed, so the next ``observe`` reports them again"""
+        deltas = list(deltas)
+        if not deltas:
             return
-            
-        # Cancel any pending removals for returning members
-        for member in new_members:
-            if member in self.pending_removals:
-                logger.info(f"Cancelling pending removal for returning member {member}")
-                del self.pending_removals[member]
-                continue
-        
-        # Add new members with their avatar descriptions
-        try:
-            member_profiles = []
-            for member_id in new_members:
-                # Get stored avatar description
-                player_info = get_player_info(member_id)
-                if player_info and player_info.get('avatar_description'):
-                    member_profiles.append({
-                        "id": member_id,
-                        "name": member_id,
-                        "join_date": time.time(),
-                        "appearance": player_info['avatar_description']
-                    })
+        with self.state.lease(f"{self.NAMESPACE}:lease", self._key(game_id), ttl=30.0, timeout=30.0):
+            saved = self.state.get(self.NAMESPACE, self._key(game_id)) or {}
+            members: Dict[str, Set[str]] = {npc: set(names) for npc, names in saved.get("members", {}).items()}
+            pending: Dict[str, Dict[str, float]] = saved.get("pending", {})
+            # Departures already waited out their grace period; report them as soon as they are seen missing
+            overdue = self.clock() - self.removal_timeout
+
+            for delta in deltas:
+                current = members.get(delta.npc, set())
+                departing = pending.setdefault(delta.npc, {})
+                for member in delta.joined:
+                    current.discard(member)
+                    departing.pop(member, None)
+                for member in delta.left - current:
+                    current.add(member)
+                    departing[member] = overdue
+                if current:
+                    members[delta.npc] = current
                 else:
-                    logger.warning(f"No avatar description found for {member_id}")
-                    member_profiles.append({
-                        "id": member_id,
-                        "name": member_id,
-                        "join_date": time.time()
-                    })
-            
-            # Send system message to NPC about new members
-            system_msg = f"[SYSTEM] New group members have joined: {', '.join(new_members)}. " \
-                        f"Their profiles have been added to your group. Consider making note of " \
-                        f"any important details about them."
-            
-            # Let the NPC process the new members through its own tools
-            await agent_id.messages.create(
-                role="system",
-                content=system_msg
-            )
-            
-            logger.info(f"Added new members to {npc_id}'s group and notified NPC: {new_members}")
-            
-        except Exception as e:
-            logger.error(f"Error handling new members: {e}")
-    
-    async def _handle_departing_members(self, npc_id: str, departed: Set[str]):
-        """Queue departing members for potential removal"""
-        current_time = time.time()
-        for member in departed:
-            if member not in self.pending_removals:
-                logger.info(f"Queueing {member} for removal from {npc_id}'s group")
-                self.pending_removals[member] = current_time
-    
-    async def _process_pending_removals(self, npc_id: str):
-        """Process pending member removals and let NPC archive memories"""
-        current_time = time.time()
-        agent_id = get_agent_id(npc_id)
-        if not agent_id:
-            return
-            
-        for member, timestamp in list(self.pending_removals.items()):
-            time_elapsed = current_time - timestamp
-            
-            # Time to notify NPC to archive memories
-            if time_elapsed > self.removal_timeout:
-                try:
-                    # Final notification about member removal
-                    system_msg = f"[SYSTEM] {member} has been removed from your group."
-                    await agent_id.messages.create(
-                        role="system",
-                        content=system_msg
-                    )
-                    
-                    del self.pending_removals[member]
-                    logger.info(f"Processed removal of {member} from {npc_id}'s group")
-                    
-                except Exception as e:
-                    logger.error(f"Error finalizing member removal {member}: {e}") 
\ No newline at end of file
+                    members.pop(delta.npc, None)
+                if not departing:
+                    pending.pop(delta.npc, None)
+
+            self.state.set(self.NAMESPACE, self._key(game_id), {
+                "members": {npc: sorted(names) for npc, names in members.items()},
+                "pending": pending
+            })
+        logger.warning(f"Group writes failed, will retry: {[(d.npc, sorted(d.joined), sorted(d.left)) for d in deltas]}")
+
+    def pending_removals(self, game_id: Optional[int] = None) -> Dict[str, Dict[str, float]]:
+        saved = self.state.get(self.NAMESPACE, self._key(game_id)) or {}
+        return saved.get("pending", {})
+
+# Global group reconciler
+group_reconciler = GroupReconciler()
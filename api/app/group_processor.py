@@ -1,20 +1,27 @@
 from typing import Dict, Optional, List
+import asyncio
 import logging
-from .cache import (
-    get_npc_description,
-    get_player_info,
-    get_player_description
-)
+from .appearance import appearances
 from .models import GroupUpdate
 from datetime import datetime
-from letta_templates.npc_utils_v2 import upsert_group_member
+from letta_templates.npc_utils_v2 import upsert_group_member, get_memory_block, update_memory_block
+from .group_blocks import merge_member_updates
+from .metrics import metrics
+from .clients import get_letta_client
+from .resilience import letta_resilience
 import json
 
 logger = logging.getLogger(__name__)
 
 class GroupProcessor:
-    def __init__(self, letta_client):
-        self.client = letta_client
+    def __init__(self, letta_client=None, max_concurrent_agents: int = 8):
+        self._client = letta_client
+        self.max_concurrent_agents = max_concurrent_agents
+
+    @property
+    def client(self):
+        """The given client, or the shared one (created on first use)"""
+        return self._client or get_letta_client()
         
     def get_health_status(self, health_data):
         """Convert health numbers to status string"""
@@ -33,55 +40,71 @@ class GroupProcessor:
             return "injured"
         return "healthy"
         
+    def _member_update(self, update: Dict) -> Dict:
+        """Block fields for one member change; departures only touch presence"""
+        update_data = {
+            "name": update["name"],
+            "is_present": update["is_joining"]
+        }
+        if update["is_joining"]:
+            # Snapshot batches carry a prefetched appearance; never query SQLite here
+            update_data["appearance"] = update.get("appearance") or appearances.cached_summary(update["entity_id"], default="Unknown")
+            update_data["health_status"] = self.get_health_status(update.get("health_data"))
+            update_data["last_location"] = update.get("location") or "Unknown"
+        else:
+            update_data["last_seen"] = datetime.now().isoformat()
+        return update_data
+
+    async def _write_agent_batch(self, agent_id: str, updates: List[Dict]) -> List[Dict]:
+        """Read the agent's group block once, merge every update, write it once"""
+        member_updates = [(update["entity_id"], self._member_update(update)) for update in updates]
+        try:
+            # Group writes are non-essential: shed while the Letta circuit is open
+            async with metrics.timer("letta", "group_members.read"):
+                block = await letta_resilience.call(
+                    "group_members.read", get_memory_block, self.client, agent_id, "group_members",
+                    essential=False, idempotent=True
+                )
+            merged, results = merge_member_updates(block, member_updates)
+            async with metrics.timer("letta", "group_members.write"):
+                await letta_resilience.call(
+                    "group_members.write", update_memory_block, self.client, agent_id, "group_members", merged,
+                    essential=False
+                )
+            return results
+        except Exception as e:
+            logger.error(f"Failed to update group for agent {agent_id}: {e}")
+            return [
+                {"entity_id": entity_id, "success": False, "error": str(e)}
+                for entity_id, _ in member_updates
+            ]
+
     async def batch_update_members(
         self,
         npc_id: str,
         updates: List[Dict]
     ) -> Dict:
-        """Efficiently update multiple members at once"""
-        results = []
-        for update in updates:
-            try:
-                # Prepare update data
-                update_data = {
-                    "name": update["name"],
-                    "is_present": update["is_joining"],
-                    "appearance": get_player_description(update["name"]),
-                    "health_status": self.get_health_status(update.get("health_data")),
-                    "last_location": update.get("location", "Unknown")
-                }
-                
-                if not update["is_joining"]:
-                    update_data["last_seen"] = datetime.now().isoformat()
-
-                # Single update call per member
-                result = upsert_group_member(
-                    self.client,
-                    agent_id=npc_id,
-                    entity_id=update["entity_id"],
-                    update_data=update_data
-                )
-                
-                results.append({
-                    "entity_id": update["entity_id"],
-                    "success": result["success"],
-                    "message": result["message"],
-                    "error": result.get("error"),
-                    "data": result.get("data")
-                })
-                
-            except Exception as e:
-                logger.error(f"Failed to update member {update['entity_id']}: {e}")
-                results.append({
-                    "entity_id": update["entity_id"],
-                    "success": False,
-                    "error": str(e)
-                })
-        
+        """Apply all member changes for one agent in a single block write"""
+        results = await self._write_agent_batch(npc_id, updates)
         return {
             "success": any(r["success"] for r in results),
             "results": results
         }
+
+    async def batch_update_agents(
+        self,
+        updates_by_agent: Dict[str, List[Dict]]
+    ) -> Dict[str, Dict]:
+        """Run each agent's batch concurrently (up to max_concurrent_agents at once)"""
+        semaphore = asyncio.Semaphore(self.max_concurrent_agents)
+
+        async def run(agent_id: str, updates: List[Dict]) -> Dict:
+            async with semaphore:
+                return await self.batch_update_members(agent_id, updates)
+
+        agent_ids = list(updates_by_agent)
+        outcomes = await asyncio.gather(*(run(agent_id, updates_by_agent[agent_id]) for agent_id in agent_ids))
+        return dict(zip(agent_ids, outcomes))
         
     async def process_group_update(
         self,
@@ -100,8 +123,12 @@ class GroupProcessor:
             logger.info(f"  Player: {player_id} ({player_name})")
             logger.info(f"  Action: {'joining' if is_joining else 'leaving'}")
 
-            # Get player description
-            player_appearance = get_player_description(player_name)
+            # Load the player off the event loop, then build the payload from memory
+            await asyncio.to_thread(appearances.prefetch, [key for key in (player_id, player_name) if key])
+            player_appearance = (
+                appearances.cached_summary(player_id)
+                or appearances.cached_summary(player_name or "", default="Unknown")
+            )
             
             # Prepare update data with all available fields
             update_data = {
@@ -0,0 +1,81 @@
+"""Liveness/readiness state and the health report behind /healthz and /readyz"""
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from .ai_handler import openai_health
+from .cache import NPC_CACHE, AGENT_ID_CACHE, LOCATION_CACHE, PLAYER_CACHE, game_caches
+from .chat_dispatcher import chat_dispatcher
+from .config import OPENAI_API_KEY, SQLITE_DB_PATH
+from .database import get_db
+from .queue_system import queue_system
+from .resilience import letta_resilience
+
+logger = logging.getLogger("roblox_app")
+
+class ReadinessState:
+    """Warm-up steps the server must finish before it takes traffic
+
+    Each step is registered with ``require`` at startup and marked with
+    ``complete`` when it finishes; the server is ready only once every
+    required step has completed successfully.
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.steps: Dict[str, Dict[str, Any]] = {}
+
+    def require(self, name: str):
+        self.steps[name] = {"done": False, "ok": None, "detail": None}
+
+    def complete(self, name: str, ok: bool = True, detail: Optional[Any] = None):
+        self.steps[name] = {"done": True, "ok": ok, "detail": detail}
+        if ok:
+            logger.info(f"Warm-up step {name} complete")
+        else:
+            logger.warning(f"Warm-up step {name} failed: {detail}")
+
+    @property
+    def ready(self) -> bool:
+        return bool(self.steps) and all(step["done"] and step["ok"] for step in self.steps.values())
+
+    def uptime(self) -> float:
+        return time.time() - self.started_at
+
+def check_database() -> Dict[str, Any]:
+    """Run a trivial query to confirm SQLite is reachable"""
+    start = time.perf_counter()
+    try:
+        with get_db() as db:
+            db.execute("SELECT 1").fetchone()
+        return {"ok": True, "path": str(SQLITE_DB_PATH), "latency_ms": round((time.perf_counter() - start) * 1000, 2)}
+    except Exception as e:
+        return {"ok": False, "path": str(SQLITE_DB_PATH), "error": str(e)}
+
+def collect_health(letta_status: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Cache population, dependency state and queue depths"""
+    dispatcher_stats = chat_dispatcher.get_stats()
+    return {
+        "ready": readiness.ready,
+        "uptime_seconds": round(readiness.uptime(), 1),
+        "warmup": readiness.steps,
+        "caches": {
+            "npcs": len(NPC_CACHE),
+            "agents": len(AGENT_ID_CACHE),
+            "locations": len(LOCATION_CACHE),
+            "games": game_caches.stats(),
+            "players": PLAYER_CACHE.stats()
+        },
+        "database": check_database(),
+        "letta": {**(letta_status or {"reachable": None}), "circuit": letta_resilience.stats()},
+        "openai": {"configured": bool(OPENAI_API_KEY), **openai_health()},
+        "queues": {
+            "chat_waiting": sum(lane["queue_depth"] for lane in dispatcher_stats.values()),
+            "chat_in_flight": sum(1 for lane in dispatcher_stats.values() if lane["in_flight"]),
+            "v4_chat": queue_system.chat_queue.qsize(),
+            "snapshots": queue_system.snapshot_queue.qsize()
+        }
+    }
+
+# Global readiness state
+readiness = ReadinessState()
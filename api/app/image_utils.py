@@ -8,12 +8,13 @@ from fastapi import HTTPException
 from typing import Tuple, Optional
 from pathlib import Path
 from .config import AVATARS_DIR, THUMBNAILS_DIR
-from openai import OpenAI, OpenAIError
+from .metrics import metrics
+from openai import OpenAIError
+from .clients import get_openai_client
 import base64
 import os
 
 logger = logging.getLogger("image_utils")
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 def encode_image(image_path: str) -> str:
     """Encode image to base64."""
@@ -68,26 +69,27 @@ async def generate_image_description(
     base64_image = encode_image(image_path)
     
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": f"{prompt} Limit the description to {max_length} characters."
-                        },
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/jpeg;base64,{base64_image}"
+        with metrics.timer("openai", "image_description"):
+            response = get_openai_client().chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[
+                    {
+                        "role": "user",
+                        "content": [
+                            {
+                                "type": "text",
+                                "text": f"{prompt} Limit the description to {max_length} characters."
                             },
-                        }
-                    ],
-                }
-            ]
-        )
+                            {
+                                "type": "image_url",
+                                "image_url": {
+                                    "url": f"data:image/jpeg;base64,{base64_image}"
+                                },
+                            }
+                        ],
+                    }
+                ]
+            )
         description = response.choices[0].message.content
         return description
     except OpenAIError as e:
@@ -1,21 +1,21 @@
 from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import StreamingResponse
 from typing import Dict, Any, Optional, List, Tuple, Set
 from pydantic import BaseModel, validator
 from datetime import datetime
 import logging
+import asyncio
 import json
 import uuid
 import time
 import requests
 import httpx
-import inspect
 from letta_client import Letta
 import os
 
 # Core agent and tools
 from letta_templates.npc_tools import (
     create_personalized_agent_v3,
-    create_letta_client,
     TOOL_INSTRUCTIONS,
     TOOL_REGISTRY,
     navigate_to,
@@ -48,7 +48,8 @@ from .database import (
     get_location_coordinates,
     get_all_locations,
     create_agent_mapping_v3,
-    get_agent_mapping_v3
+    get_agent_mapping_v3,
+    get_enabled_npc_ids
 )
 from .cache import (
     NPC_CACHE,        # Contains all NPC info including descriptions
@@ -56,16 +57,23 @@ from .cache import (
     AGENT_ID_CACHE,   # Maps NPCs to agents
     get_npc_id_from_name,  # Cache lookup helpers
     get_agent_id,
+    get_agent_id_for_name,
+    get_npc_directory,
+    set_agent_id,
     get_npc_description,
     LOCATION_CACHE,   # Add this import
-    get_player_description
+    get_player_description,
+    get_locations,
+    game_caches
 )
 from .mock_player import MockPlayer
 from .config import (
     DEFAULT_LLM, 
     LLM_CONFIGS, 
     EMBEDDING_CONFIGS, 
-    DEFAULT_EMBEDDING
+    DEFAULT_EMBEDDING,
+    DEFAULT_GAME_ID,
+    LETTA_CHAT_TIMEOUT
 )
 from .models import (
     GameSnapshot,
@@ -76,12 +84,24 @@ from .models import (
 from .letta_utils import extract_tool_results
 from pathlib import Path
 from .queue_system import queue_system, ChatQueueItem, SnapshotQueueItem
-from .snapshot_processor import enrich_snapshot_with_context
+from .shared_state import shared_state
+from .snapshot_ingest import SnapshotDecodeError, decode_snapshot, enrich_snapshot
 from .main import LETTA_CONFIG
-from .group_manager import GroupMembershipManager
+from .appearance import appearances
+from .resilience import CircuitOpen, letta_resilience
+from .group_clusters import joining_members
+from .group_manager import GroupDelta, group_reconciler
 from letta_templates.npc_prompts import PLAYER_JOIN_MESSAGE, PLAYER_LEAVE_MESSAGE
 from .utils import get_current_action  # Import from utils instead
 from .group_processor import GroupProcessor
+
+# Group block writes for snapshot reconciliation (uses the shared Letta client)
+group_processor = GroupProcessor()
+from .chat_dispatcher import chat_dispatcher, greeting_dedupe_key, AgentQueueFull
+from .concurrency import SingleFlight
+from .logging_utils import get_logger, Lazy, LazyJSON
+from .metrics import metrics
+from .clients import get_letta_client
 from .image_utils import (
     download_avatar_image,
     generate_image_description,
@@ -101,22 +121,13 @@ from .image_utils import (
 # }
 
 logger = logging.getLogger("roblox_app")
-logger.setLevel(logging.DEBUG)  # Set to DEBUG to see all logs
-
-# Add a debug message to verify level
-logger.debug("=== LOGGER DEBUG TEST ===")
+chat_logger = get_logger("chat")
+snapshot_logger = get_logger("snapshot")
 
 # Initialize router and client
 router = APIRouter(prefix="/letta/v1", tags=["letta"])
 
-# Initialize ONE client properly
-direct_client = create_letta_client()
-
-print("\nDEBUG - Message API Signature:")
-print(inspect.signature(direct_client.agents.messages.create))
-
-print("\nDEBUG - Group Update Function Signature:")
-print(inspect.signature(letta_update_group))
+# The shared Letta client is created on first use (see clients.get_letta_client)
 
 """
 Letta AI Integration Router
@@ -653,6 +664,54 @@ def extract_tool_results(response):
 
 #     return agent
 
+def tool_call_to_action(tool_call: dict, tool_results: Optional[List[dict]] = None) -> Optional[dict]:
+    """Convert a single completed tool call into a Roblox action, if it produces one"""
+    if tool_call["tool"] == "perform_action":
+        # Try to get result from either tool_return or tool_results
+        tool_return = tool_call.get("tool_return")
+        
+        # If no tool_return, look in tool_results array
+        if not tool_return:
+            for result in tool_results or []:
+                if result["tool_call"]["id"] == tool_call["id"]:
+                    tool_return = result["result"]
+                    break
+        
+        if not tool_return:
+            logger.debug(f"No tool_return found in tool call or results")
+            return None
+            
+        result = json.loads(tool_return)
+        chat_logger.debug("Parsed result: %s", LazyJSON(result, indent=2))
+        
+        # Look for roblox_format in the tool return
+        roblox_format = result.get("roblox_format")
+        logger.debug(f"Roblox format: {roblox_format}")
+        
+        if roblox_format:
+            return {
+                "type": roblox_format["type"],
+                "data": roblox_format["data"],
+                "message": roblox_format["message"]
+            }
+
+    elif tool_call["tool"] == "navigate_to":
+        args = tool_call.get("args", {})
+        destination = args.get("destination_slug")
+        logger.debug(f"Processing navigate_to for destination: {destination}")
+        
+        coordinates = get_coordinates_for_slug(destination)
+        if coordinates:
+            return {
+                "type": "navigate",
+                "data": {
+                    "coordinates": coordinates
+                },
+                "message": f"Moving to {destination}..."
+            }
+
+    return None
+
 def process_tool_results(tool_results: dict) -> Tuple[str, dict]:
     """Process tool results into Roblox action format"""
     actions = []
@@ -662,58 +721,17 @@ def process_tool_results(tool_results: dict) -> Tuple[str, dict]:
         logger.debug("=== Tool Results Structure ===")
         if "tool_results" in tool_results:
             for result in tool_results["tool_results"]:
-                logger.debug(f"Tool result: {json.dumps(result, indent=2)}")
+                chat_logger.debug("Tool result: %s", LazyJSON(result, indent=2))
                 if "tool_return" in result:
                     parsed = json.loads(result["tool_return"])
                     logger.debug(f"Found roblox_format: {parsed.get('roblox_format')}")
 
         for tool_call in tool_results.get("tool_calls", []):
-            if tool_call["tool"] == "perform_action":
-                # Try to get result from either tool_return or tool_results
-                tool_return = tool_call.get("tool_return")
-                
-                # If no tool_return, look in tool_results array
-                if not tool_return:
-                    tool_results_array = tool_results.get("tool_results", [])
-                    for result in tool_results_array:
-                        if result["tool_call"]["id"] == tool_call["id"]:
-                            tool_return = result["result"]
-                            break
-                
-                if not tool_return:
-                    logger.debug(f"No tool_return found in tool call or results")
-                    continue
-                    
-                result = json.loads(tool_return)
-                logger.debug(f"Parsed result: {json.dumps(result, indent=2)}")
-                
-                # Look for roblox_format in the tool return
-                roblox_format = result.get("roblox_format")
-                logger.debug(f"Roblox format: {roblox_format}")
-                
-                if roblox_format:
-                    actions.append({
-                        "type": roblox_format["type"],
-                        "data": roblox_format["data"],
-                        "message": roblox_format["message"]
-                    })
-                    if not message:
-                        message = roblox_format["message"]
-
-            elif tool_call["tool"] == "navigate_to":
-                args = tool_call.get("args", {})
-                destination = args.get("destination_slug")
-                logger.debug(f"Processing navigate_to for destination: {destination}")
-                
-                coordinates = get_coordinates_for_slug(destination)
-                if coordinates:
-                    actions.append({
-                        "type": "navigate",
-                        "data": {
-                            "coordinates": coordinates
-                        },
-                        "message": f"Moving to {destination}..."
-                    })
+            action = tool_call_to_action(tool_call, tool_results.get("tool_results", []))
+            if action:
+                actions.append(action)
+                if not message and tool_call["tool"] == "perform_action":
+                    message = action["message"]
 
         return message, {"actions": actions} if actions else {"type": "none"}
 
@@ -721,12 +739,13 @@ def process_tool_results(tool_results: dict) -> Tuple[str, dict]:
         logger.error(f"Error processing tool results: {str(e)}", exc_info=True)
         return "I'm having trouble right now.", {"type": "none"}
 
-def get_coordinates_for_slug(slug: str) -> Optional[Dict]:
+def get_coordinates_for_slug(slug: str, game_id: Optional[int] = None) -> Optional[Dict]:
     """Look up coordinates from cache first, then database"""
     try:
         # First check the cache
-        if slug in LOCATION_CACHE:
-            location_data = LOCATION_CACHE[slug]
+        locations = get_locations(game_id)
+        if slug in locations:
+            location_data = locations[slug]
             coords = location_data['coordinates']
             logger.info(f"Found coordinates for slug {slug} in cache: {coords}")
             # Convert array format to dict if needed
@@ -738,7 +757,7 @@ def get_coordinates_for_slug(slug: str) -> Optional[Dict]:
         with get_db() as db:
             location = db.execute(
                 "SELECT coordinates FROM locations WHERE slug = ? AND game_id = ?",
-                (slug, 61)
+                (slug, DEFAULT_GAME_ID if game_id is None else game_id)
             ).fetchone()
             
             if location and location['coordinates']:
@@ -777,72 +796,79 @@ def create_memory_blocks(npc_details: dict) -> dict:
         "journal": "[]"
     }
 
-@router.post("/snapshot/game")
-async def process_game_snapshot(snapshot: GameSnapshot):
+@router.post("/snapshot/game", openapi_extra={
+    "requestBody": {"required": True, "content": {"application/json": {"schema": GameSnapshot.model_json_schema()}}}
+})
+async def process_game_snapshot(request: Request):
+    # Decoded once, straight into compact records (see snapshot_ingest)
     try:
-        logger.info("=== Processing New Game Snapshot ===")
-        logger.debug(f"Raw snapshot data: {json.dumps(snapshot.dict(), indent=2)}")
-        
-        # Use our tested enrichment logic
-        enriched_snapshot = enrich_snapshot_with_context(snapshot)
-        logger.info("Snapshot enriched with context")
+        snapshot = decode_snapshot(await request.body())
+    except SnapshotDecodeError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    try:
+        snapshot_logger.info("Processing game snapshot", extra={"sample_rate": 20})
+        snapshot_logger.debug("Raw snapshot data: %s", LazyJSON(snapshot, indent=2))
         
-        group_manager = GroupMembershipManager()
-        logger.info(f"Group Manager State - Pending Removals: {group_manager.pending_removals}")
+        # Reads and stores the previous state, which may wait on other workers' locks
+        enriched_snapshot = await asyncio.to_thread(enrich_snapshot, snapshot)
+        snapshot_logger.debug("Snapshot enriched with context")
         
         # Process each entity
+        npcs = (await game_caches.aget(snapshot.gameId)).npcs
+        observed_groups = {}
         for entity_id, context in enriched_snapshot.humanContext.items():
-            if entity_id not in NPC_CACHE:
+            if entity_id not in npcs:
                 continue
                 
-            logger.info(f"\n=== Processing NPC: {entity_id} ===")
-            
-            # Handle group join/leave messages first
-            # ... (keep existing group message logic) ...
+            snapshot_logger.debug("Processing NPC: %s", entity_id)
+            observed_groups[entity_id] = context.currentGroups.members if context.currentGroups else []
             
             # Use our tested status block update
-            logger.info("Processing status updates...")
             await process_npc_status(entity_id, context, enriched_snapshot)
             
-        logger.info("=== Snapshot Processing Complete ===")
+        # Group membership: one block write per NPC whose group changed
+        await reconcile_groups(observed_groups, enriched_snapshot)
+            
+        snapshot_logger.debug("Snapshot processing complete")
         return {"status": "success"}
         
     except Exception as e:
-        logger.error(f"Error processing snapshot: {str(e)}", exc_info=True)
+        snapshot_logger.error("Error processing snapshot: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/chat/v3")
-async def chat_with_npc_v3(request: ChatRequest):
-    try:
-        logger.info(f"Processing chat request for NPC {request.npc_id}")
+def _provision_agent(npc_id: str) -> str:
+    """Create (or recover) the Letta agent for an NPC; runs in a worker thread"""
+    # Another request may have finished provisioning while we waited
+    agent_id = get_agent_id(npc_id)
+    if agent_id:
+        return agent_id
+
+    # A mapping can exist in the DB without being cached (e.g. created by another worker)
+    mapping = get_agent_mapping_v3(npc_id)
+    if mapping:
+        set_agent_id(npc_id, mapping.letta_agent_id)
+        logger.info(f"Recovered agent {mapping.letta_agent_id} for NPC {npc_id} from database")
+        return mapping.letta_agent_id
+
+    # Only one worker process creates the agent; the others wait for its mapping
+    with shared_state.lease("agent_provisioning", npc_id, ttl=120, timeout=120):
+        mapping = get_agent_mapping_v3(npc_id)
+        if mapping:
+            set_agent_id(npc_id, mapping.letta_agent_id)
+            logger.info(f"Agent {mapping.letta_agent_id} for NPC {npc_id} was created by another worker")
+            return mapping.letta_agent_id
+
+        logger.info(f"No cached agent for NPC {npc_id} - creating new one")
         
-        # Add detailed message sequence logging
-        logger.info("=== Message Sequence Start ===")
-        for i, msg in enumerate(request.messages):
-            logger.info(f"Message {i}:")
-            logger.info(f"  Role: {msg.get('role')}")
-            logger.info(f"  Content: {msg.get('content')}")
-            logger.info(f"  Context: {msg.get('context')}")
-            logger.info(f"  Name: {msg.get('name')}")
-            logger.info(f"  Is System Message: {msg.get('role') == 'system'}")
-            logger.info(f"  Is Assistant Message: {msg.get('role') == 'assistant'}")
-            logger.info(f"  Is User Message: {msg.get('role') == 'user'}")
-        logger.info("=== Message Sequence End ===")
-
-        # Continue with normal processing - no blocking
-        agent_id = get_agent_id(request.npc_id)
+        # Get NPC details
+        npc_details = get_npc_context(npc_id)
+        if not npc_details:
+            raise ValueError(f"NPC {npc_id} not found")
         
-        if not agent_id:
-            # Only create new agent if not in cache
-            logger.info(f"No cached agent for NPC {request.npc_id} - creating new one")
-            
-            # Get NPC details
-            npc_details = get_npc_context(request.npc_id)
-            
-            # Create new agent
-            #logger.info("Creating memory blocks for NPC")
-            blocks = create_memory_blocks(npc_details)
-            #logger.info(f"Created memory blocks to pass into create_personalized_agent_v3: {blocks}") -- Validated as correct
+        # Create new agent
+        blocks = create_memory_blocks(npc_details)
+        with metrics.timer("letta", "agents.create"):
             agent = create_personalized_agent_v3(
                 name=npc_details['display_name'],
                 memory_blocks=blocks,
@@ -851,16 +877,89 @@ async def chat_with_npc_v3(request: ChatRequest):
                 prompt_version="FULL"
             )
 
-            # Create mapping and update cache
-            mapping = create_agent_mapping_v3(request.npc_id, agent.id)
-            AGENT_ID_CACHE[request.npc_id] = agent.id
-            logger.info(f"Created new agent {agent.id} and updated cache")
-            agent_id = agent.id
-        else:
-            logger.info(f"Using cached agent {agent_id} for NPC {request.npc_id}")
+        # Create mapping and update cache
+        create_agent_mapping_v3(npc_id, agent.id)
+    set_agent_id(npc_id, agent.id)
+    logger.info(f"Created new agent {agent.id} and updated cache")
+    return agent.id
+
+@metrics.timed("letta", "messages.create")
+def send_agent_messages(**letta_request):
+    """Blocking Letta messages.create call, run through the chat dispatcher"""
+    return get_letta_client().agents.messages.create(**letta_request)
+
+@metrics.timed("letta", "messages.create_stream")
+def open_agent_stream(**letta_request):
+    """Blocking Letta messages.create_stream call; chunks are read through letta_resilience.stream"""
+    return get_letta_client().agents.messages.create_stream(**letta_request)
+
+async def send_agent_messages_guarded(**letta_request):
+    """messages.create under the Letta circuit breaker
+
+    Returns only once the Letta call has finished, so the agent's dispatcher
+    lane stays held while a timed-out call is still running; callers apply
+    the chat timeout around ``chat_dispatcher.submit``.
+    """
+    return await letta_resilience.call("messages.create", send_agent_messages, drain=True, **letta_request)
+
+# One agent creation per NPC at a time; concurrent first contacts share it
+agent_provisioning = SingleFlight()
+
+async def get_or_create_agent_id(npc_id: str) -> str:
+    """Get the cached Letta agent for an NPC, creating one on first contact"""
+    agent_id = get_agent_id(npc_id)
+    if agent_id:
+        chat_logger.debug("Using cached agent %s for NPC %s", agent_id, npc_id)
+        return agent_id
+    return await agent_provisioning.do(npc_id, _provision_agent, npc_id)
+
+async def warm_up_agents(max_concurrent: int = 4) -> Dict[str, Any]:
+    """Pre-provision agents for all enabled NPCs so first contact skips creation"""
+    enabled = get_enabled_npc_ids()
+    pending = [
+        npc['id'] for npc in NPC_CACHE.values()
+        if npc['id'] in enabled and not get_agent_id(npc['id'])
+    ]
+    logger.info(f"Warming up agents for {len(pending)} NPCs")
+
+    semaphore = asyncio.Semaphore(max_concurrent)
+    failed = []
+
+    async def provision(npc_id: str):
+        async with semaphore:
+            try:
+                await agent_provisioning.do(npc_id, _provision_agent, npc_id)
+            except Exception as e:
+                logger.error(f"Agent warm-up failed for NPC {npc_id}: {e}")
+                failed.append(npc_id)
+
+    await asyncio.gather(*(provision(npc_id) for npc_id in pending))
+    logger.info(f"Agent warm-up complete: {len(pending) - len(failed)} created, {len(failed)} failed")
+    return {"provisioned": len(pending) - len(failed), "failed": failed}
+
+def is_proximity_greeting(messages: List[Dict[str, str]]) -> bool:
+    """Whether the request carries a 'has entered your range' system message"""
+    return any(
+        msg.get('role') == 'system' and 'has entered your range' in msg.get('content', '')
+        for msg in messages
+    )
+
+@router.post("/chat/v3")
+async def chat_with_npc_v3(request: ChatRequest):
+    try:
+        chat_logger.info("Processing chat request for NPC %s (%d messages)", request.npc_id, len(request.messages))
+        if chat_logger.isEnabledFor(logging.DEBUG):
+            for i, msg in enumerate(request.messages):
+                chat_logger.debug(
+                    "Message %d: role=%s name=%s content=%s context=%s",
+                    i, msg.get('role'), msg.get('name'), msg.get('content'), msg.get('context')
+                )
+
+        # Continue with normal processing - no blocking
+        agent_id = await get_or_create_agent_id(request.npc_id)
 
         # Send message using cached agent_id
-        logger.info(f"Sending message to agent {agent_id}")
+        chat_logger.debug("Sending message to agent %s", agent_id)
         try:
             # Send message using new API format
             letta_request = {
@@ -868,29 +967,30 @@ async def chat_with_npc_v3(request: ChatRequest):
                 "messages": request.messages
             }
             
-            # Log what we're sending to Letta
-            logger.info("=== Sending to Letta ===")
-            logger.info(f"Agent ID: {agent_id}")
-            logger.info(f"Request: {json.dumps(letta_request, indent=2)}")
+            chat_logger.debug("Letta request: %s", LazyJSON(letta_request, indent=2))
             
-            response = direct_client.agents.messages.create(**letta_request)
+            response = await asyncio.wait_for(
+                chat_dispatcher.submit(
+                    agent_id,
+                    send_agent_messages_guarded,
+                    dedupe_key=greeting_dedupe_key(request.messages),
+                    **letta_request
+                ),
+                LETTA_CHAT_TIMEOUT
+            )
             
-            # Log raw response from Letta - but handle datetime objects
-            logger.info("=== Raw Letta Response ===")
-            logger.info(f"Response Type: {type(response)}")
-            logger.info(f"Response Content: {str(response)}")  # Use str() instead of json.dumps
+            # Raw response is only stringified when debug logging is on
+            chat_logger.debug("Raw Letta response: %s", response)
             
-            # Log what we extract
             result = extract_agent_response(response)
-            logger.info("=== Extracted Response ===")
-            logger.info(f"Message: {result.get('message')}")
-            logger.info(f"Tool Calls: {result.get('tool_calls')}")
-            logger.info(f"Reasoning: {result.get('reasoning')}")
+            chat_logger.debug(
+                "Extracted response: message=%s tool_calls=%s reasoning=%s",
+                result.get('message'), result.get('tool_calls'), result.get('reasoning')
+            )
             
             # If system message about proximity and no response, add default greeting
-            if (any(msg.get('role') == 'system' and 'has entered your range' in msg.get('content', '') 
-                    for msg in request.messages) and not result.get('message')):
-                logger.info("Adding default greeting for proximity message")
+            if is_proximity_greeting(request.messages) and not result.get('message'):
+                chat_logger.info("Adding default greeting for proximity message")
                 result['message'] = "Hi there! Default greeting!"
             
             # Process all actions consistently
@@ -905,6 +1005,22 @@ async def chat_with_npc_v3(request: ChatRequest):
                 }
             )
 
+        except AgentQueueFull as e:
+            chat_logger.warning("Dropping chat for NPC %s: %s", request.npc_id, e)
+            return ChatResponse(
+                message="",
+                action={"type": "none"},
+                metadata={"error": "agent_busy"}
+            )
+
+        except asyncio.TimeoutError:
+            chat_logger.warning("Letta did not answer chat for NPC %s in time", request.npc_id)
+            return ChatResponse(
+                message="",
+                action={"type": "none"},
+                metadata={"error": "letta_timeout"}
+            )
+
         except Exception as e:
             logger.error(f"Error in chat endpoint: {str(e)}", exc_info=True)
             return ChatResponse(
@@ -921,127 +1037,105 @@ async def chat_with_npc_v3(request: ChatRequest):
             metadata={"error": str(e)}
         )
 
-async def process_snapshot_groups(human_context):
-    """Process group updates from snapshot data using LettaDev patterns"""
+def _stream_event(event_type: str, **data) -> str:
+    """Encode one NDJSON stream event"""
+    return json.dumps({"type": event_type, **data}, default=str) + "\n"
+
+async def _stream_npc_chat(request: ChatRequest):
+    """Forward Letta stream chunks to the client as NDJSON events
+
+    Events, one JSON object per line:
+      {"type": "text", "content": ...}        assistant text as it arrives
+      {"type": "tool_call", "tool": ..., "id": ...}
+      {"type": "action", "action": {...}}     emitted as soon as a tool returns
+      {"type": "done", "message": ..., "action": ..., "metadata": ...}
+      {"type": "error", "message": ..., "error": ...}
+    """
+    text_parts: List[str] = []
+    tool_calls: Dict[str, dict] = {}
+    actions: List[dict] = []
+    reasoning: List[str] = []
+
     try:
-        logger.info("🔍 === SNAPSHOT DEBUG START ===")  # Use emoji for visibility
-        
-        # Test log at different levels
-        logger.debug("🔍 DEBUG TEST")
-        logger.info("🔍 INFO TEST")
-        logger.warning("🔍 WARNING TEST")
-        logger.error("🔍 ERROR TEST")
-        
-        for entity_name, context in human_context.items():
-            logger.info(f"🔍 Entity: {entity_name}")  # Use INFO instead of DEBUG
-            logger.info(f"🔍 Raw context: {context}")
-            logger.info(f"🔍 Has position: {hasattr(context, 'position')}")
-            
-            if hasattr(context, 'position'):
-                logger.info(f"🔍 Position values: x={getattr(context.position, 'x', None)}, "
-                          f"y={getattr(context.position, 'y', None)}, "
-                          f"z={getattr(context.position, 'z', None)}")
+        agent_id = await get_or_create_agent_id(request.npc_id)
+        async with chat_dispatcher.slot(agent_id):
+            chunks = letta_resilience.stream(
+                "messages.create_stream",
+                open_agent_stream,
+                agent_id=agent_id,
+                messages=request.messages,
+                stream_tokens=True
+            )
+            try:
+                async for chunk in chunks:
+                    message_type = getattr(chunk, "message_type", None)
+
+                    if message_type == "assistant_message":
+                        content = chunk.content if isinstance(chunk.content, str) else str(chunk.content or "")
+                        if content:
+                            text_parts.append(content)
+                            yield _stream_event("text", content=content)
+
+                    elif message_type == "reasoning_message":
+                        reasoning.append(chunk.reasoning or "")
+
+                    elif message_type == "tool_call_message":
+                        call_id = chunk.tool_call.tool_call_id or chunk.tool_call.name
+                        current = tool_calls.get(call_id)
+                        if current is None:
+                            current = {"id": call_id, "tool": chunk.tool_call.name, "arguments": ""}
+                            tool_calls[call_id] = current
+                            yield _stream_event("tool_call", tool=current["tool"], id=call_id)
+                        # Arguments arrive in pieces when tokens are streamed
+                        current["arguments"] += chunk.tool_call.arguments or ""
+
+                    elif message_type == "tool_return_message":
+                        call_id = chunk.tool_call_id
+                        current = tool_calls.get(call_id)
+                        if current is None:
+                            continue
+                        try:
+                            current["args"] = json.loads(current["arguments"] or "{}")
+                        except json.JSONDecodeError:
+                            logger.error(f"Failed to parse streamed tool arguments: {current['arguments']}")
+                            current["args"] = {}
+                        current["tool_return"] = chunk.tool_return
+                        current["status"] = chunk.status
+
+                        action = tool_call_to_action(current)
+                        if action:
+                            actions.append(action)
+                            yield _stream_event("action", action=action)
+            finally:
+                # Runs when the client disconnects too, so the Letta stream is closed right away
+                await chunks.aclose()
+
+        message = "".join(text_parts)
+        if is_proximity_greeting(request.messages) and not message:
+            message = "Hi there! Default greeting!"
+            yield _stream_event("text", content=message)
+
+        yield _stream_event(
+            "done",
+            message=message,
+            action={"actions": actions} if actions else {"type": "none"},
+            metadata={
+                "tool_calls": list(tool_calls.values()),
+                "reasoning": "".join(reasoning)
+            }
+        )
 
-        # Group NPCs by their current group members
-        cluster_groups = {}
-        
-        for entity_name, context in human_context.items():
-            position = getattr(context, "position", None)
-            
-            # Get narrative location if we have position
-            location = "Unknown"
-            if position:
-                location = position.get_location_narrative()  # Use narrative instead of coordinates
-                logger.debug(f"[Position] Formatted location for {entity_name}: {location}")
-            
-            # Debug group formation
-            group_key = tuple(sorted(context.currentGroups.members))
-            logger.debug(f"\nProcessing group for {entity_name}")
-            logger.debug(f"Group key: {group_key}")
-            
-            if group_key not in cluster_groups:
-                cluster_groups[group_key] = {
-                    'members': set(context.currentGroups.members),
-                    'agent_ids': [],
-                    'locations': {}
-                }
-                logger.debug(f"Created new cluster group: {cluster_groups[group_key]}")
-            
-            # Store location
-            cluster_groups[group_key]['locations'][entity_name] = location
-            logger.debug(f"Stored location for {entity_name}: {location}")
-            
-            # Get agent info
-            npc_id = get_npc_id_from_name(entity_name)
-            if npc_id:
-                agent_id = get_agent_id(npc_id)
-                if agent_id:
-                    cluster_groups[group_key]['agent_ids'].append(agent_id)
-                    logger.debug(f"Added agent {agent_id} for {entity_name}")
-                    
-                    # Debug current memory state
-                    status = get_memory_block(direct_client, agent_id, "status")
-                    logger.debug(f"\nCurrent status for {entity_name} ({agent_id}):")
-                    logger.debug(json.dumps(status, indent=2))
-
-        # Process clusters
-        logger.debug("\n=== PROCESSING CLUSTERS ===")
-        for members_key, data in cluster_groups.items():
-            logger.debug(f"\nCluster members: {members_key}")
-            logger.debug(f"Locations: {data['locations']}")
-            logger.debug(f"Agent IDs: {data['agent_ids']}")
-            
-            nearby_players = [
-                {
-                    "id": member,
-                    "name": member,
-                    "appearance": get_npc_description(member) or '',
-                    "notes": ''
-                }
-                for member in data['members']
-            ]
-            
-            for agent_id in data['agent_ids']:
-                try:
-                    member_name = next(name for name in data['members'] 
-                                    if get_agent_id(get_npc_id_from_name(name)) == agent_id)
-                    location = data['locations'].get(member_name, "Unknown")
-                    
-                    # Update location with new function
-                    status = update_location_status(
-                        client=direct_client,
-                        agent_id=agent_id,
-                        current_location=location,
-                        current_action="idle"
-                    )
-                    
-                    # Update group with new function
-                    group = update_group_members_v2(
-                        client=direct_client,
-                        agent_id=agent_id,
-                        members=[{
-                            "id": p["id"],
-                            "name": p["name"],
-                            "location": p.get("location", "Unknown"),
-                            "appearance": p.get("appearance", "")
-                        } for p in nearby_players]
-                    )
-                    
-                    # Get histories for logging
-                    location_history = get_location_history(direct_client, agent_id)
-                    group_history = get_group_history(direct_client, agent_id)
-                    logger.debug(f"Location history: {json.dumps(location_history, indent=2)}")
-                    logger.debug(f"Group history: {json.dumps(group_history, indent=2)}")
-                    
-                except Exception as e:
-                    logger.error(f"Failed to update agent {agent_id}: {str(e)}")
-                    continue
-        
-        logger.debug("=== SNAPSHOT DEBUG END ===")
-            
     except Exception as e:
-        logger.error(f"Error in process_snapshot_groups: {str(e)}")
-        raise
+        logger.error(f"Error in streaming chat endpoint: {str(e)}", exc_info=True)
+        yield _stream_event("error", message="Something went wrong!", error=str(e))
+
+@router.post("/chat/v3/stream")
+async def chat_with_npc_v3_stream(request: ChatRequest):
+    """Streaming variant of /chat/v3 that returns NDJSON events as Letta produces them"""
+    return StreamingResponse(
+        _stream_npc_chat(request),
+        media_type="application/x-ndjson"
+    )
 
 def verify_group_state(client, agent_ids: List[str], snapshot_data: Dict[str, Any]):
     """Debug helper to check group state consistency"""
@@ -1073,13 +1167,8 @@ def run_group_health_check(client, members: Tuple[str, ...]) -> bool:
     """Regular health check for group state"""
     try:
         # Get agent IDs for members
-        agent_ids = []
-        for member in members:
-            npc_id = get_npc_id_from_name(member)
-            if npc_id:
-                agent_id = get_agent_id(npc_id)
-                if agent_id:
-                    agent_ids.append(agent_id)
+        directory = get_npc_directory()
+        agent_ids = [agent_id for agent_id in map(directory.agent_for_name, members) if agent_id]
         
         if not agent_ids:
             logger.warning("No agent IDs found for health check")
@@ -1148,11 +1237,16 @@ async def chat_with_npc_v4(request: ChatRequest):
         logger.error(f"[CHAT_V4] Queue error: {str(e)}")
         raise
 
+@router.get("/chat/dispatcher")
+async def get_chat_dispatcher_status():
+    """Get per-agent chat queue depth and wait times"""
+    return {"agents": chat_dispatcher.get_stats()}
+
 @router.get("/v4/queue")
 async def get_queue_status():
     """Get current queue status"""
     try:
-        status = queue_system.get_queue_sizes()
+        status = await asyncio.to_thread(queue_system.get_queue_sizes)
         
         # Get last 3 snapshots safely
         snapshot_queue = queue_system.snapshot_queue._queue
@@ -1193,9 +1287,9 @@ async def get_queue_status():
             }
         }
         
-        logger.info(f"[QUEUE] Status: {json.dumps(summary['overview'], indent=2)}")
-        logger.info(f"[QUEUE] Active chats: {len(summary['chat_queue'])}")
-        logger.info(f"[QUEUE] Recent snapshots: {json.dumps(summary['snapshot_queue']['last_snapshots'], indent=2)}")
+        logger.info("[QUEUE] Status: %s", LazyJSON(summary['overview']))
+        logger.info("[QUEUE] Active chats: %d", len(summary['chat_queue']))
+        logger.debug("[QUEUE] Recent snapshots: %s", LazyJSON(summary['snapshot_queue']['last_snapshots'], indent=2))
         
         return summary
     except Exception as e:
@@ -1204,7 +1298,8 @@ async def get_queue_status():
 
 async def process_npc_status(entity_id: str, context: HumanContextData, enriched_snapshot: GameSnapshot):
     try:
-        agent_id = get_agent_id(get_npc_id_from_name(entity_id))
+        game_id = enriched_snapshot.gameId
+        agent_id = get_agent_id_for_name(entity_id, game_id)
         if not agent_id:
             logger.warning(f"No agent ID found for NPC {entity_id} - skipping status update")
             return
@@ -1222,40 +1317,65 @@ async def process_npc_status(entity_id: str, context: HumanContextData, enriched
             
             status_text = f"Location: {current_location} | Action: {current_action}"
             logger.info(f"Updating status for {entity_id}: {status_text}")
-            letta_update_status(direct_client, agent_id, status_text, send_notification=False)
-        
-        # Only update group if members changed
-        if context.currentGroups and context.currentGroups.members:
-            # Get current group data
-            current_group = get_memory_block(direct_client, agent_id, "group_members")
-            current_members = set(current_group.get("members", {}).keys()) if current_group else set()
-            new_members = set(context.currentGroups.members)
-            
-            if current_members != new_members:
-                logger.info(f"Group members changed for {entity_id}")
-                logger.info(f"  Old members: {current_members}")
-                logger.info(f"  New members: {new_members}")
-                
-                group_data = {
-                    "members": {},
-                    "summary": f"Current members: {', '.join(new_members)}",
-                    "updates": []
-                }
-                
-                for member in new_members:
-                    appearance = get_npc_description(member)
-                    group_data["members"][member] = {
-                        "name": member,
-                        "appearance": appearance or '',
-                        "last_seen": datetime.now().isoformat(),
-                        "notes": ""
-                    }
-                
-                letta_update_group(direct_client, agent_id, group_data, send_notification=False)
+            # Snapshot status writes are non-essential: shed while the Letta circuit is open
+            await letta_resilience.call(
+                "status.write", letta_update_status, get_letta_client(), agent_id, status_text,
+                send_notification=False, essential=False
+            )
 
+    except CircuitOpen:
+        snapshot_logger.debug("Skipped status update for %s: Letta circuit open", entity_id)
     except Exception as e:
         logger.error(f"Error updating status block: {e}", exc_info=True)
 
+async def reconcile_groups(observed_groups: Dict[str, List[str]], enriched_snapshot: GameSnapshot):
+    """Fold a snapshot's groups into the reconciler and write the NPCs whose group changed"""
+    game_id = enriched_snapshot.gameId
+    deltas = await asyncio.to_thread(group_reconciler.observe, observed_groups, game_id)
+    snapshot_logger.debug("Group deltas: %s, pending removals: %s", deltas, Lazy(group_reconciler.pending_removals, game_id))
+    if not deltas:
+        return
+    # Anything not written (including on an error) is reported again next snapshot
+    failed = deltas
+    try:
+        failed = await apply_group_deltas(deltas, enriched_snapshot)
+    finally:
+        if failed:
+            await asyncio.to_thread(group_reconciler.retry, failed, game_id)
+
+async def apply_group_deltas(deltas: List[GroupDelta], enriched_snapshot: GameSnapshot) -> List[GroupDelta]:
+    """Write each changed NPC's group block once, all NPCs concurrently
+
+    Returns the part of each delta that was not written (shed while the
+    Letta circuit is open, or failed), for ``group_reconciler.retry``.
+    """
+    game_id = enriched_snapshot.gameId
+    # Each joining member's entry is built once and shared by every NPC they joined
+    joining = await asyncio.to_thread(joining_members, deltas, enriched_snapshot.humanContext, game_id)
+    updates_by_agent = {}
+    delta_by_agent = {}
+    for delta in deltas:
+        agent_id = get_agent_id_for_name(delta.npc, game_id)
+        if not agent_id:
+            logger.warning(f"No agent ID found for NPC {delta.npc} - skipping group update")
+            continue
+        updates = [joining[member] for member in sorted(delta.joined)]
+        for member in sorted(delta.left):
+            updates.append({"entity_id": member, "name": member, "is_joining": False})
+        updates_by_agent[agent_id] = updates
+        delta_by_agent[agent_id] = delta
+
+    results = await group_processor.batch_update_agents(updates_by_agent)
+    failed = []
+    for agent_id, result in results.items():
+        unwritten = {r["entity_id"] for r in result["results"] if not r["success"]}
+        if not unwritten:
+            continue
+        logger.error(f"Group update failed for agent {agent_id}: {result['results']}")
+        delta = delta_by_agent[agent_id]
+        failed.append(GroupDelta(delta.npc, delta.joined & unwritten, delta.left & unwritten, delta.members))
+    return failed
+
 def get_current_action(context: HumanContextData) -> str:
     """Determine current action from context"""
     if context.health and context.health.get('state') == 'Dead':
@@ -1280,13 +1400,18 @@ async def update_group(update: GroupUpdate):
         logger.info(f"[GROUP] Updating group for NPC {update.npc_id} -> Agent {agent_id}")
         logger.info(f"[GROUP] Looking up player {update.player_id} ({update.player_name})")
         
-        player_info = PLAYER_CACHE.get(update.player_id, {})
-        appearance = player_info.get('description', 'Unknown')
-        logger.info(f"[GROUP] Found in cache: {json.dumps(player_info, indent=2)}")
+        # Load the player (by id, then display name) off the event loop, then read from memory
+        await asyncio.to_thread(
+            appearances.prefetch, [key for key in (update.player_id, update.player_name) if key]
+        )
+        appearance = (
+            appearances.cached_summary(update.player_id)
+            or appearances.cached_summary(update.player_name or "", default="Unknown")
+        )
         
         # Use upsert_group_member
         result = upsert_group_member(
-            client=direct_client,
+            client=get_letta_client(),
             agent_id=agent_id,
             entity_id=str(update.player_id),
             update_data={
@@ -1334,8 +1459,10 @@ async def update_npc_status(request: StatusUpdateRequest):
         }
         
         # Update using new format
-        letta_update_status(
-            client=direct_client,
+        await letta_resilience.call(
+            "status.write",
+            letta_update_status,
+            client=get_letta_client(),
             agent_id=agent_id,
             field_updates=status_block
         )
@@ -1403,8 +1530,9 @@ async def get_player_description_endpoint(data: PlayerDescriptionRequest):
                 description=description,
                 display_name=display_name
             )
-            # Update the cache
+            # Update the caches
             update_player_cache_with_description(data.user_id, description)
+            appearances.set_player(data.user_id, description, display_name)
             logger.info(f"Stored description for player {data.user_id}: {description[:50]}...")
         except Exception as e:
             logger.error(f"Failed to store player description for {data.user_id}: {e}")
@@ -28,4 +28,32 @@ def find_nearest_location(x: float, y: float, z: float, location_cache: Dict) ->
             min_distance = distance
             nearest = loc_data["name"]
     
-    return nearest if min_distance <= 15 else "Unknown Area" 
\ No newline at end of file
+    return nearest if min_distance <= 15 else "Unknown Area" 
+
+def describe_distance(distance: float, location_name: str, x: float, y: float, z: float) -> str:
+    """Narrative for a position ``distance`` studs from a named location"""
+    if distance < 5:
+        return f"at the entrance to {location_name}"
+    if distance < 15:
+        return f"right outside {location_name}"
+    if distance < 30:
+        return f"near {location_name}"
+    if distance < 50:
+        return f"in the vicinity of {location_name}"
+    return f"at ({x}, {y}, {z})"
+
+def location_narrative(x: float, y: float, z: float, location_cache: Dict) -> str:
+    """Describe a position relative to the nearest location in the cache"""
+    min_distance_sq = float('inf')
+    nearest = None
+
+    for loc_data in location_cache.values():
+        loc_x, loc_y, loc_z = loc_data["coordinates"]
+        distance_sq = (x - loc_x)**2 + (y - loc_y)**2 + (z - loc_z)**2
+        if distance_sq < min_distance_sq:
+            min_distance_sq = distance_sq
+            nearest = loc_data
+
+    if nearest is None:
+        return f"at coordinates ({x}, {y}, {z})"
+    return describe_distance(min_distance_sq**0.5, nearest["name"], x, y, z)
@@ -0,0 +1,151 @@
+"""Structured, low-overhead logging for the API
+
+Hot paths log through per-subsystem child loggers of ``roblox_app``
+(``roblox_app.chat``, ``.snapshot``, ``.cache``, ``.db``) using %-style
+arguments, so nothing is formatted unless the record is actually emitted.
+Expensive payloads are wrapped in ``LazyJSON``/``Lazy`` so that serialization
+also only happens on emit. Records are handed to a background thread through
+a QueueHandler, keeping console/file I/O off the request path.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+from typing import Any, Callable, Dict, Optional
+
+ROOT_LOGGER = "roblox_app"
+SUBSYSTEMS = ("chat", "snapshot", "cache", "db")
+
+DEFAULT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Attributes every LogRecord has; anything else came in through ``extra``
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+def get_logger(subsystem: str) -> logging.Logger:
+    """Get the logger for a subsystem (chat, snapshot, cache, db)"""
+    return logging.getLogger(f"{ROOT_LOGGER}.{subsystem}")
+
+class Lazy:
+    """Defer an expensive computation until the log record is formatted"""
+    __slots__ = ("func", "args")
+
+    def __init__(self, func: Callable[..., Any], *args):
+        self.func = func
+        self.args = args
+
+    def __str__(self) -> str:
+        return str(self.func(*self.args))
+
+class LazyJSON:
+    """Serialize a payload (dict, list, pydantic model or snapshot record) only when emitted"""
+    __slots__ = ("payload", "indent")
+
+    def __init__(self, payload: Any, indent: Optional[int] = None):
+        self.payload = payload
+        self.indent = indent
+
+    def __str__(self) -> str:
+        payload = self.payload
+        if hasattr(payload, "model_dump"):
+            payload = payload.model_dump()
+        elif hasattr(payload, "as_dict"):
+            payload = payload.as_dict()
+        return json.dumps(payload, indent=self.indent, default=str)
+
+class SamplingFilter(logging.Filter):
+    """Pass 1 in N records that set ``extra={"sample_rate": N}``
+
+    Records are grouped by logger and message template, so each distinct
+    high-frequency event is sampled independently. Records without a
+    sample rate always pass.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._counts: Dict[tuple, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = getattr(record, "sample_rate", None)
+        if not rate or rate <= 1:
+            return True
+        key = (record.name, record.msg)
+        with self._lock:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+        return count % rate == 0
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line, including any ``extra`` fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and key != "sample_rate":
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+def _level(name: str, default: str) -> int:
+    value = os.getenv(name, default).upper()
+    return getattr(logging, value, logging.INFO)
+
+def apply_log_levels():
+    """Set levels from the environment
+
+    LOG_LEVEL sets the app-wide level; LOG_LEVEL_CHAT, LOG_LEVEL_SNAPSHOT,
+    LOG_LEVEL_CACHE and LOG_LEVEL_DB override it per subsystem.
+    """
+    base_level = _level("LOG_LEVEL", "INFO")
+    logging.getLogger().setLevel(base_level)
+    logging.getLogger(ROOT_LOGGER).setLevel(base_level)
+    for subsystem in SUBSYSTEMS:
+        get_logger(subsystem).setLevel(_level(f"LOG_LEVEL_{subsystem.upper()}", logging.getLevelName(base_level)))
+
+def configure_logging():
+    """Apply levels from the environment and install the queue-backed handler
+
+    Levels are re-applied on every call; the handler is installed once.
+    LOG_FORMAT=json switches to one JSON object per line.
+    """
+    global _listener
+    apply_log_levels()
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler()
+    if os.getenv("LOG_FORMAT", "text").lower() == "json":
+        output.setFormatter(JSONFormatter())
+    else:
+        output.setFormatter(logging.Formatter(DEFAULT_FORMAT))
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+def stop_logging():
+    """Flush queued records and stop the background writer"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
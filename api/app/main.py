@@ -3,24 +3,24 @@ from pathlib import Path
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
 from fastapi.templating import Jinja2Templates
 from dotenv import load_dotenv
 import logging
+import asyncio
 from .cache import init_static_cache
+from .cache_poller import cache_poller
+from .logging_utils import configure_logging, stop_logging
 import requests
 from requests.exceptions import RequestException
 
-# Configure logging first
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger("roblox_app")
-
 # Load environment variables
 load_dotenv()
 
+# Configure logging first (levels and format come from the environment)
+configure_logging()
+logger = logging.getLogger("roblox_app")
+
 # Get Letta configuration from environment
 LETTA_CONFIG = {
     'host': os.getenv('LETTA_SERVER_HOST', 'localhost'),
@@ -34,7 +34,8 @@ logger.info(f"Host: {LETTA_CONFIG['host']}")
 logger.info(f"Port: {LETTA_CONFIG['port']}")
 
 # Import after logging setup
-from .config import BASE_DIR
+from .config import BASE_DIR, LETTA_WARMUP_AGENTS
+from .middleware import ConversationMiddleware, StaticCacheControlMiddleware, conversation_metrics
 
 # Setup paths - use BASE_DIR from config
 STATIC_DIR = BASE_DIR / "static"
@@ -43,7 +44,6 @@ TEMPLATES_DIR = BASE_DIR / "templates"
 # Debug information
 logger.info(f"Base directory: {BASE_DIR}")
 logger.info(f"Static directory: {STATIC_DIR}")
-logger.info(f"Directory contents: {os.listdir(BASE_DIR)}")
 
 # Create FastAPI app
 app = FastAPI()
@@ -57,9 +57,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Track chat/conversation requests (pure ASGI, safe for streaming responses)
+app.add_middleware(ConversationMiddleware)
+
 # Import routers after FastAPI initialization
 from .dashboard_router import router as dashboard_router
-from .letta_router import router as letta_router
+from .letta_router import router as letta_router, warm_up_agents
+from .metrics import metrics
+from .health import readiness, collect_health
 
 # Include routers
 app.include_router(dashboard_router)
@@ -84,6 +89,30 @@ async def serve_dashboard(request: Request, allowed_ips=Depends(check_allowed_ip
     return templates.TemplateResponse("dashboard_new.html", {"request": request})
 
 
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and serving requests"""
+    return {"status": "ok", "uptime_seconds": round(readiness.uptime(), 1)}
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: warm-up finished; includes cache, DB, dependency and queue state"""
+    report = await asyncio.to_thread(collect_health, getattr(app.state, "letta_status", None))
+    return JSONResponse(status_code=200 if report["ready"] else 503, content=report)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Per-stage latency histograms in Prometheus text format"""
+    return PlainTextResponse(
+        metrics.render_prometheus(),
+        media_type="text/plain; version=0.0.4"
+    )
+
+@app.get("/metrics/conversations")
+async def get_conversation_metrics():
+    """Conversation request counters from ConversationMiddleware"""
+    return conversation_metrics.dict()
+
 #Route handlers
 # @app.get("/")
 # @app.get("/dashboard")
@@ -91,36 +120,77 @@ async def serve_dashboard(request: Request, allowed_ips=Depends(check_allowed_ip
 #     """Serve the dashboard"""
 #     return templates.TemplateResponse("dashboard_new.html", {"request": request})
 
+def _check_letta_server() -> dict:
+    """Blocking connectivity and version check against the Letta server"""
+    status = {"reachable": False, "version": None}
+    try:
+        response = requests.get(LETTA_CONFIG['base_url'], timeout=10)
+        status["reachable"] = response.ok
+        if not response.ok:
+            logger.warning(f"Letta server returned status {response.status_code}")
+            return status
+        try:
+            version_response = requests.get(f"{LETTA_CONFIG['base_url']}/api/version", timeout=5)
+            if version_response.ok:
+                status["version"] = version_response.json()
+        except (RequestException, ValueError):
+            pass  # Version check is optional
+    except RequestException as e:
+        logger.error(f"Failed to connect to Letta server: {str(e)}")
+    return status
+
+async def probe_letta_server():
+    """Probe Letta off the event loop and record the result on app.state"""
+    logger.info(f"Testing connection to Letta server at {LETTA_CONFIG['base_url']}")
+    status = await asyncio.to_thread(_check_letta_server)
+    app.state.letta_status = status
+    if status["reachable"]:
+        logger.info(f"Successfully connected to Letta server (version: {status['version']})")
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize on server startup"""
     logger.info("Starting Roblox API server...")
     
-    # Test Letta connection
-    try:
-        logger.info(f"Testing connection to Letta server at {LETTA_CONFIG['base_url']}")
-        # Just test the base URL since we know it works
-        response = requests.get(LETTA_CONFIG['base_url'], timeout=10)  # Increased timeout
-        if response.ok:
-            logger.info("Successfully connected to Letta server")
-            # Try to get version info
-            try:
-                version_response = requests.get(f"{LETTA_CONFIG['base_url']}/api/version")
-                if version_response.ok:
-                    logger.info(f"Letta server version: {version_response.json()}")
-            except:
-                pass  # Version check is optional
-        else:
-            logger.warning(f"Letta server returned status {response.status_code}")
-    except RequestException as e:
-        logger.error(f"Failed to connect to Letta server: {str(e)}")
+    # Check Letta in the background; a slow Letta server must not delay startup
+    app.state.letta_status = {"reachable": None, "version": None}
+    app.state.letta_probe = asyncio.create_task(probe_letta_server())
     
-    init_static_cache()
+    # Caches (and optionally agents) warm up in the background; /readyz
+    # reports not-ready until they are done
+    readiness.require("static_cache")
+    if LETTA_WARMUP_AGENTS:
+        readiness.require("agent_warmup")
+    app.state.warmup = asyncio.create_task(warm_up())
+    
+    # Follow NPC/asset edits made by other processes (scripts/, other workers)
+    app.state.cache_poller = asyncio.create_task(cache_poller.run())
+
+async def warm_up(retry_delay: float = 5.0):
+    """Load static caches (retrying until they load), then pre-provision agents"""
+    while True:
+        results = await asyncio.to_thread(init_static_cache)
+        if all(results.values()):
+            break
+        logger.error(f"Static cache initialization incomplete ({results}), retrying in {retry_delay}s")
+        await asyncio.sleep(retry_delay)
+    readiness.complete("static_cache", detail=results)
     logger.info("Static caches initialized")
 
+    if LETTA_WARMUP_AGENTS:
+        try:
+            result = await warm_up_agents()
+            # Agents that failed here are still created lazily on first contact
+            readiness.complete("agent_warmup", detail=result)
+        except Exception as e:
+            readiness.complete("agent_warmup", ok=False, detail=str(e))
+
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("RobloxAPI app is shutting down...")
+    app.state.cache_poller.cancel()
+    cache_poller.close()
+    stop_logging()
 
 @app.exception_handler(500)
 async def internal_error_handler(request: Request, exc: Exception):
@@ -135,10 +205,5 @@ logger.info(f"Static files being served from: {STATIC_DIR}")
 app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
 
 # Add cache control middleware
-@app.middleware("http")
-async def add_cache_control_headers(request: Request, call_next):
-    response = await call_next(request)
-    if request.url.path.startswith("/static/"):
-        response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
-    return response
+app.add_middleware(StaticCacheControlMiddleware)
 
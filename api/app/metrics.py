@@ -0,0 +1,198 @@
+"""Per-stage latency histograms exposed as Prometheus text and JSON
+
+Every stage (snapshot enrichment, location resolution, cache lookups,
+SQLite queries, Letta/OpenAI calls, Lua export) records into one
+``roblox_stage_duration_seconds`` histogram labelled by stage and operation.
+With METRICS_ENABLED=false, ``timer()`` hands back a shared no-op context
+manager and decorated functions call straight through.
+"""
+import functools
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .config import METRICS_ENABLED
+
+# Latency buckets in seconds, from sub-millisecond cache hits to slow LLM calls
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+
+class _Series:
+    """Bucket counts for one label combination"""
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, bucket_count: int):
+        self.counts = [0] * (bucket_count + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+class Histogram:
+    """Fixed-bucket histogram keyed by (stage, operation)"""
+
+    def __init__(self, name: str, help: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self._series: Dict[Tuple[str, str], _Series] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, stage: str, operation: str = ""):
+        key = (stage, operation)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series(len(self.buckets))
+            series.counts[index] += 1
+            series.sum += value
+            series.count += 1
+
+    def _quantile(self, counts: List[int], total: int, q: float) -> float:
+        """Estimate a quantile by interpolating inside the matching bucket"""
+        rank = q * total
+        seen = 0
+        for i, count in enumerate(counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * ((rank - seen) / count)
+            seen += count
+        return 0.0
+
+    def summary(self) -> List[Dict]:
+        """Count, mean and p50/p95/p99 per stage and operation"""
+        with self._lock:
+            items = [(key, series.count, series.sum, list(series.counts)) for key, series in self._series.items()]
+
+        results = []
+        for (stage, operation), count, total, counts in sorted(items):
+            results.append({
+                "stage": stage,
+                "operation": operation,
+                "count": count,
+                "mean_ms": round(total / count * 1000, 3) if count else 0.0,
+                "p50_ms": round(self._quantile(counts, count, 0.50) * 1000, 3),
+                "p95_ms": round(self._quantile(counts, count, 0.95) * 1000, 3),
+                "p99_ms": round(self._quantile(counts, count, 0.99) * 1000, 3)
+            })
+        return results
+
+    def render(self) -> List[str]:
+        """Prometheus text exposition lines"""
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, list(s.counts), s.sum, s.count) for key, s in self._series.items())
+
+        for (stage, operation), counts, total, count in items:
+            labels = f'stage="{stage}",operation="{operation}"'
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total}")
+            lines.append(f"{self.name}_count{{{labels}}} {count}")
+        return lines
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+class _Timer:
+    """Context manager that records elapsed time on exit"""
+    __slots__ = ("histogram", "stage", "operation", "start")
+
+    def __init__(self, histogram: Histogram, stage: str, operation: str):
+        self.histogram = histogram
+        self.stage = stage
+        self.operation = operation
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.start, self.stage, self.operation)
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+class _NoopTimer:
+    """Shared do-nothing timer used while metrics are disabled"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+_NOOP = _NoopTimer()
+
+class MetricsRegistry:
+    """Holds the stage histogram and the enabled switch"""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.stage_latency = Histogram(
+            "roblox_stage_duration_seconds",
+            "Time spent in each processing stage"
+        )
+
+    def timer(self, stage: str, operation: str = ""):
+        """Time a block: ``with metrics.timer("letta", "messages.create"):``"""
+        if not self.enabled:
+            return _NOOP
+        return _Timer(self.stage_latency, stage, operation)
+
+    def timed(self, stage: str, operation: Optional[str] = None) -> Callable:
+        """Decorator timing a sync or async function (operation defaults to its name)"""
+        def decorator(func):
+            op = operation or func.__name__
+
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    if not self.enabled:
+                        return await func(*args, **kwargs)
+                    start = time.perf_counter()
+                    try:
+                        return await func(*args, **kwargs)
+                    finally:
+                        self.stage_latency.observe(time.perf_counter() - start, stage, op)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.stage_latency.observe(time.perf_counter() - start, stage, op)
+            return wrapper
+        return decorator
+
+    def render_prometheus(self) -> str:
+        return "\n".join(self.stage_latency.render()) + "\n"
+
+    def summary(self) -> Dict:
+        return {"enabled": self.enabled, "stages": self.stage_latency.summary()}
+
+# Global metrics instance
+metrics = MetricsRegistry(enabled=METRICS_ENABLED)
@@ -1,126 +1,165 @@
+import re
 import time
 import logging
-from typing import Dict, Any, Optional
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
-from datetime import datetime
+from typing import Dict, Optional, Tuple
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .metrics import metrics
 
 logger = logging.getLogger("ella_app")
 
+# Only the start of the body is scanned for ids; chat payloads put them first
+BODY_SCAN_LIMIT = 4096
+CONVERSATION_ID_PATTERN = re.compile(rb'"conversation_id"\s*:\s*"([^"]{1,128})"')
+CONVERSATION_TYPE_PATTERN = re.compile(rb'"conversation_type"\s*:\s*"([a-z_]{1,32})"')
+
 class ConversationMetrics:
     def __init__(self):
         self.total_conversations = 0
         self.successful_conversations = 0
         self.failed_conversations = 0
         self.average_duration = 0.0
+        self.active_conversations = 0
         self.conversation_types: Dict[str, int] = {
             "npc_user": 0,
             "npc_npc": 0,
             "group": 0
         }
 
-class ConversationMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app):
-        super().__init__(app)
-        self.metrics = ConversationMetrics()
-        self.active_conversations: Dict[str, Dict[str, Any]] = {}
+    def record(self, conversation_type: str, duration: float, success: bool):
+        """Fold one finished request into the counters"""
+        self.total_conversations += 1
+        if success:
+            self.successful_conversations += 1
+        else:
+            self.failed_conversations += 1
+        if conversation_type in self.conversation_types:
+            self.conversation_types[conversation_type] += 1
+        self.average_duration += (duration - self.average_duration) / self.total_conversations
+
+    def dict(self):
+        return {
+            "total_conversations": self.total_conversations,
+            "successful_conversations": self.successful_conversations,
+            "failed_conversations": self.failed_conversations,
+            "average_duration": self.average_duration,
+            "active_conversations": self.active_conversations,
+            "conversation_types": dict(self.conversation_types)
+        }
 
-    async def dispatch(self, request: Request, call_next):
-        # Only track conversation endpoints
-        if not request.url.path.startswith("/robloxgpt/v"):
-            return await call_next(request)
+# Global metrics shared by every ConversationMiddleware instance
+conversation_metrics = ConversationMetrics()
 
-        start_time = time.time()
-        conversation_id = None
+class ConversationMiddleware:
+    """Track conversation requests without touching how the body is read
 
-        try:
-            # Extract conversation details from request
-            body = await request.json()
-            conversation_id = body.get("conversation_id")
-            conversation_type = body.get("conversation_type", "npc_user")
-
-            # Track conversation start
-            if conversation_id:
-                self.active_conversations[conversation_id] = {
-                    "start_time": start_time,
-                    "type": conversation_type,
-                    "message_count": 0
-                }
-
-            # Process the request
-            response = await call_next(request)
-
-            # Update metrics on successful response
-            if response.status_code == 200:
-                self._update_metrics(
-                    conversation_id,
-                    conversation_type,
-                    start_time,
-                    success=True
-                )
-            else:
-                self._update_metrics(
-                    conversation_id,
-                    conversation_type,
-                    start_time,
-                    success=False
-                )
-
-            return response
+    Pure ASGI: the conversation id comes from the ``X-Conversation-Id`` header,
+    or is picked out of the first few KB of the body as the endpoint itself
+    reads it, so the body is never buffered or parsed twice. The request is
+    timed until the last response chunk is sent, so streaming responses pass
+    through untouched and are measured end to end.
+    """
 
+    def __init__(
+        self,
+        app: ASGIApp,
+        path_prefixes: Tuple[str, ...] = ("/robloxgpt/v", "/letta/v1/chat/"),
+        conversation_metrics_override: Optional[ConversationMetrics] = None
+    ):
+        self.app = app
+        self.path_prefixes = path_prefixes
+        self.metrics = conversation_metrics_override or conversation_metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        # Chat routes are all POSTs; status polls such as GET /letta/v1/chat/dispatcher are not chat traffic
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or not scope["path"].startswith(self.path_prefixes)
+        ):
+            return await self.app(scope, receive, send)
+
+        start_time = time.perf_counter()
+        conversation_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-conversation-id":
+                conversation_id = value.decode("latin-1")
+                break
+
+        head = bytearray()
+        status_code = 500
+        finished = False
+
+        async def tracking_receive() -> Message:
+            message = await receive()
+            if message["type"] == "http.request" and len(head) < BODY_SCAN_LIMIT:
+                head.extend(message.get("body", b"")[:BODY_SCAN_LIMIT - len(head)])
+            return message
+
+        async def tracking_send(message: Message):
+            nonlocal status_code, finished
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                # Claimed before sending so the handlers below never finish it twice
+                finished = True
+                sent = False
+                try:
+                    await send(message)
+                    sent = True
+                finally:
+                    self._finish(conversation_id, head, start_time, sent and status_code < 400)
+                return
+            await send(message)
+
+        self.metrics.active_conversations += 1
+        try:
+            await self.app(scope, tracking_receive, tracking_send)
         except Exception as e:
-            logger.error(f"Error in conversation middleware: {e}")
-            self._update_metrics(
-                conversation_id,
-                "unknown",
-                start_time,
-                success=False
-            )
+            logger.error("Error in conversation middleware: %s", e)
+            if not finished:
+                finished = True
+                self._finish(conversation_id, head, start_time, False)
             raise
+        finally:
+            if not finished:
+                # Client went away before the response completed
+                self._finish(conversation_id, head, start_time, False)
 
-    def _update_metrics(
-        self,
-        conversation_id: Optional[str],
-        conversation_type: str,
-        start_time: float,
-        success: bool
-    ):
+    def _finish(self, conversation_id: Optional[str], head: bytearray, start_time: float, success: bool):
         """Update conversation metrics"""
-        duration = time.time() - start_time
-        
-        # Update total counts
-        self.metrics.total_conversations += 1
-        if success:
-            self.metrics.successful_conversations += 1
-        else:
-            self.metrics.failed_conversations += 1
+        duration = time.perf_counter() - start_time
+        self.metrics.active_conversations -= 1
+
+        if conversation_id is None:
+            match = CONVERSATION_ID_PATTERN.search(head)
+            conversation_id = match.group(1).decode("utf-8", "replace") if match else None
+        match = CONVERSATION_TYPE_PATTERN.search(head)
+        conversation_type = match.group(1).decode("utf-8", "replace") if match else "npc_user"
+
+        self.metrics.record(conversation_type, duration, success)
+        if metrics.enabled:
+            metrics.stage_latency.observe(duration, "conversation", conversation_type)
+
+        logger.debug(
+            "Conversation processed - ID: %s, Type: %s, Duration: %.2fs, Success: %s",
+            conversation_id, conversation_type, duration, success
+        )
 
-        # Update conversation type counts
-        if conversation_type in self.metrics.conversation_types:
-            self.metrics.conversation_types[conversation_type] += 1
+class StaticCacheControlMiddleware:
+    """Disable browser caching for /static/ responses"""
 
-        # Update average duration
-        current_avg = self.metrics.average_duration
-        total = self.metrics.total_conversations
-        self.metrics.average_duration = (
-            (current_avg * (total - 1) + duration) / total
-        )
+    def __init__(self, app: ASGIApp):
+        self.app = app
 
-        # Log metrics
-        logger.info(
-            f"Conversation processed - "
-            f"ID: {conversation_id}, "
-            f"Type: {conversation_type}, "
-            f"Duration: {duration:.2f}s, "
-            f"Success: {success}"
-        )
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not scope["path"].startswith("/static/"):
+            return await self.app(scope, receive, send)
+
+        async def send_with_headers(message: Message):
+            if message["type"] == "http.response.start":
+                headers = [(k, v) for k, v in message.get("headers", []) if k != b"cache-control"]
+                headers.append((b"cache-control", b"no-cache, no-store, must-revalidate"))
+                message = {**message, "headers": headers}
+            await send(message)
 
-        # Remove from active conversations if completed
-        if conversation_id and conversation_id in self.active_conversations:
-            conv_data = self.active_conversations.pop(conversation_id)
-            logger.debug(
-                f"Conversation completed - "
-                f"ID: {conversation_id}, "
-                f"Messages: {conv_data['message_count']}, "
-                f"Duration: {duration:.2f}s"
-            ) 
\ No newline at end of file
+        await self.app(scope, receive, send_with_headers)
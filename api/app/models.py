@@ -4,9 +4,12 @@ from pydantic import BaseModel, Field
 from typing import Optional, Dict, Any, List, Literal, Set
 from datetime import datetime, timedelta
 import logging
-from .location_utils import find_nearest_location
+from .location_utils import find_nearest_location, location_narrative, describe_distance
+from .logging_utils import get_logger
+from .metrics import metrics
 
 logger = logging.getLogger(__name__)
+snapshot_logger = get_logger("snapshot")
 
 class NPCAction(BaseModel):
     type: Literal["follow", "unfollow", "stop_talking", "none"]
@@ -132,44 +135,28 @@ class PositionData(BaseModel):
                 data[coord] = round(float(data[coord]), 3)
         super().__init__(**data)
 
-    def get_nearest_location(self) -> str:
-        """Calculate nearest known location"""
-        from .cache import LOCATION_CACHE  # Import here to avoid circular import
-        return find_nearest_location(self.x, self.y, self.z, LOCATION_CACHE)
+    def get_nearest_location(self, locations: Optional[Dict[str, dict]] = None) -> str:
+        """Calculate nearest known location (default game's locations unless given)"""
+        if locations is None:
+            from .cache import LOCATION_CACHE as locations  # Import here to avoid circular import
+        return find_nearest_location(self.x, self.y, self.z, locations)
 
-    def get_location_narrative(self) -> str:
+    @metrics.timed("location_resolution")
+    def get_location_narrative(self, locations: Optional[Dict[str, dict]] = None) -> str:
         """Generate narrative description of position relative to known locations"""
         try:
-            from .cache import LOCATION_CACHE
+            if locations is None:
+                from .cache import LOCATION_CACHE as locations
             
-            logger.debug(f"Generating location narrative for position ({self.x}, {self.y}, {self.z})")
+            snapshot_logger.debug("Generating location narrative for position (%s, %s, %s)", self.x, self.y, self.z)
             
-            if not LOCATION_CACHE:
+            if not locations:
                 logger.warning("Location cache is empty")
                 return f"at coordinates ({self.x}, {self.y}, {self.z})"
 
-            min_distance = float('inf')
-            nearest = None
-
-            for slug, loc_data in LOCATION_CACHE.items():
-                loc_x, loc_y, loc_z = loc_data["coordinates"]
-                # Calculate distance the same way as test
-                distance = ((self.x - loc_x)**2 + 
-                           (self.y - loc_y)**2 + 
-                           (self.z - loc_z)**2)**0.5
-                
-                logger.debug(f"Distance to {loc_data['name']}: {distance:.1f}")
-
-                if distance < min_distance:
-                    min_distance = distance
-                    nearest = loc_data
-
-            if nearest:
-                narrative = self._get_distance_description(min_distance, nearest['name'])
-                logger.debug(f"Generated narrative: {narrative}")
-                return narrative
-
-            return f"at coordinates ({self.x}, {self.y}, {self.z})"
+            narrative = location_narrative(self.x, self.y, self.z, locations)
+            snapshot_logger.debug("Generated narrative: %s", narrative)
+            return narrative
 
         except Exception as e:
             logger.error(f"Error generating location narrative: {str(e)}")
@@ -177,21 +164,7 @@ class PositionData(BaseModel):
 
     def _get_distance_description(self, distance: float, location_name: str) -> str:
         """Helper to generate distance-based description"""
-        logger.debug(f"Calculating description for distance {distance:.1f} to {location_name}")
-        
-        if distance < 5:
-            desc = f"at the entrance to {location_name}"
-        elif distance < 15:
-            desc = f"right outside {location_name}"
-        elif distance < 30:
-            desc = f"near {location_name}"
-        elif distance < 50:
-            desc = f"in the vicinity of {location_name}"
-        else:
-            desc = f"at ({self.x}, {self.y}, {self.z})"
-        
-        logger.debug(f"Generated description: {desc} (distance: {distance:.1f})")
-        return desc
+        return describe_distance(distance, location_name, self.x, self.y, self.z)
 
 class GroupData(BaseModel):
     members: List[str]
@@ -213,6 +186,7 @@ class HumanContextData(BaseModel):
 
 class GameSnapshot(BaseModel):
     timestamp: int  # Required
+    gameId: Optional[int] = None  # Defaults to DEFAULT_GAME_ID
     events: List[Dict[str, Any]]  # Required
     clusters: List[Dict[str, Any]]
     humanContext: Dict[str, Any]
@@ -4,6 +4,7 @@ from datetime import datetime
 from pydantic import BaseModel
 import logging
 import time
+from .shared_state import SharedState, shared_state
 
 logger = logging.getLogger("roblox_app")
 
@@ -20,57 +21,77 @@ class SnapshotQueueItem(BaseModel):
     timestamp: float
 
 class QueueSystem:
-    def __init__(self):
+    """Per-worker work queues with counters and snapshot rate shared across workers"""
+
+    NAMESPACE = "queue_system"
+
+    def __init__(self, state: Optional[SharedState] = None):
+        self.state = state or shared_state
         self.chat_queue = asyncio.Queue()
         self.snapshot_queue = asyncio.Queue()
         self.is_running = False
-        self.total_chats = 0
-        self.total_snapshots = 0
-        # Add rate tracking
-        self.last_snapshot_time = time.time()
-        self.snapshot_count_window = []  # Track timestamps in last second
         self.RATE_LIMIT = 1  # max snapshots per second
         self.RATE_WINDOW = 2.0  # window size in seconds
+        if self.state.get(self.NAMESPACE, "last_snapshot_time") is None:
+            self.state.set(self.NAMESPACE, "last_snapshot_time", time.time())
+
+    @property
+    def total_chats(self) -> int:
+        return self.state.get(self.NAMESPACE, "total_chats", 0)
+
+    @property
+    def total_snapshots(self) -> int:
+        return self.state.get(self.NAMESPACE, "total_snapshots", 0)
+
+    @property
+    def last_snapshot_time(self) -> float:
+        return self.state.get(self.NAMESPACE, "last_snapshot_time", time.time())
+
+    def _snapshot_rate(self, now: float) -> float:
+        """Snapshots per second over RATE_WINDOW, counted in one-second buckets"""
+        buckets = self.state.items(f"{self.NAMESPACE}:snapshot_rate")
+        oldest = int(now - self.RATE_WINDOW)
+        return sum(count for second, count in buckets.items() if int(second) > oldest) / self.RATE_WINDOW
         
     async def enqueue_chat(self, item: ChatQueueItem):
         """Add chat request to queue"""
         await self.chat_queue.put(item)
-        self.total_chats += 1
-        logger.debug(f"Chat queued. Total: {self.total_chats}")
+        total = await asyncio.to_thread(self.state.incr, self.NAMESPACE, "total_chats")
+        logger.debug(f"Chat queued. Total: {total}")
+
+    def _count_snapshot(self, current_time: float):
+        """Update the shared snapshot counters; returns (rate before this one, total)"""
+        # Calculate current rate (snapshots per second, across all workers)
+        rate = self._snapshot_rate(current_time)
+        # Count this snapshot in its one-second bucket
+        self.state.incr(f"{self.NAMESPACE}:snapshot_rate", str(int(current_time)), ttl=self.RATE_WINDOW + 1)
+        self.state.set(self.NAMESPACE, "last_snapshot_time", current_time)
+        return rate, self.state.incr(self.NAMESPACE, "total_snapshots")
         
     async def enqueue_snapshot(self, item: SnapshotQueueItem):
         """Add snapshot to queue with rate limiting"""
-        current_time = time.time()
-        
-        # Clean old timestamps (older than rate window)
-        self.snapshot_count_window = [t for t in self.snapshot_count_window 
-                                    if current_time - t < self.RATE_WINDOW]
-        
-        # Calculate current rate (snapshots per second)
-        rate = len(self.snapshot_count_window) / self.RATE_WINDOW
+        # Shared state may wait on other workers' locks; keep it off the event loop
+        rate, total = await asyncio.to_thread(self._count_snapshot, time.time())
         
         # Log if rate is high
         if rate > self.RATE_LIMIT:
             logger.warning(f"High snapshot rate detected: {rate:.1f}/sec")
             
-        # Add current timestamp and enqueue
-        self.snapshot_count_window.append(current_time)
         await self.snapshot_queue.put(item)
-        self.total_snapshots += 1
         
         # Log every 10 snapshots instead of 100
-        if self.total_snapshots % 10 == 0:
-            logger.info(f"Snapshot queued. Total: {self.total_snapshots}, Current rate: {rate:.1f}/sec")
+        if total % 10 == 0:
+            logger.info(f"Snapshot queued. Total: {total}, Current rate: {rate:.1f}/sec")
         
     def get_queue_sizes(self) -> Dict[str, int]:
         """Get current queue sizes and rate info"""
-        current_rate = len(self.snapshot_count_window)
+        now = time.time()
         return {
             "total_chats": self.total_chats,
             "total_snapshots": self.total_snapshots,
-            "current_snapshot_rate": current_rate,
-            "queue_age_seconds": time.time() - self.last_snapshot_time
+            "current_snapshot_rate": self._snapshot_rate(now) * self.RATE_WINDOW,
+            "queue_age_seconds": now - self.last_snapshot_time
         }
 
 # Global queue system instance
-queue_system = QueueSystem() 
\ No newline at end of file
+queue_system = QueueSystem()
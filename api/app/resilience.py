@@ -0,0 +1,309 @@
+"""Timeouts, circuit breaking, retry budgets and hedging for Letta calls
+
+Every Letta call used to be tried on its own and only logged on failure, so
+when Letta was degraded each snapshot still tried every NPC and each chat
+waited out the client's full timeout. ``LettaResilience.call`` runs the
+blocking client call in a worker thread with:
+
+- a per-operation timeout
+- a shared circuit breaker: after repeated failures it opens and sheds
+  non-essential calls (status and group writes) until a probe succeeds;
+  essential calls (chat) are still attempted and close it on success
+- a retry budget: retries are only spent while they stay a small fraction
+  of total calls, so retries cannot multiply load on a struggling server
+- optional hedging for idempotent reads: if the first attempt has not
+  answered after ``hedge_delay`` seconds a second one is started and the
+  first result wins
+
+Worker threads cannot be interrupted, so a timed-out call keeps running in
+the background. Callers that must not overlap calls (the per-agent chat
+lane) pass ``drain=True``: the timeout is still recorded, but ``call`` only
+returns once every thread it started has finished. ``stream`` applies the
+same timeout and breaker to streamed responses, per chunk.
+"""
+import asyncio
+import logging
+import time
+from collections import Counter
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from .config import (
+    LETTA_TIMEOUTS,
+    LETTA_DEFAULT_TIMEOUT,
+    LETTA_BREAKER_FAILURES,
+    LETTA_BREAKER_RESET_SECONDS,
+    LETTA_RETRY_BUDGET_RATIO,
+    LETTA_MAX_RETRIES,
+    LETTA_HEDGE_DELAY_MS
+)
+
+logger = logging.getLogger("roblox_app")
+
+class CircuitOpen(Exception):
+    """A non-essential call was shed because the circuit is open"""
+    pass
+
+class CircuitBreaker:
+    """Consecutive-failure breaker with a half-open probe
+
+    Opens after ``failure_threshold`` failures in a row. While open, only
+    essential calls are let through. After ``reset_timeout`` seconds it is
+    half-open: one non-essential probe is allowed, and its outcome (or any
+    essential call's) closes or re-opens the circuit.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = LETTA_BREAKER_FAILURES,
+        reset_timeout: float = LETTA_BREAKER_RESET_SECONDS,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.times_opened = 0
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self, essential: bool = True) -> bool:
+        state = self.state
+        if state == self.CLOSED or essential:
+            return True
+        if state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self):
+        if self.opened_at is not None:
+            logger.info("Letta circuit closed")
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or (self.opened_at is None and self.failures >= self.failure_threshold):
+            if self.opened_at is None:
+                self.times_opened += 1
+                logger.warning(f"Letta circuit opened after {self.failures} consecutive failures")
+            self.opened_at = self.clock()
+        self._probing = False
+
+class RetryBudget:
+    """Token bucket that lets retries add at most ``ratio`` extra load
+
+    Every call deposits ``ratio`` tokens and every retry withdraws one.
+    ``reserve`` tokens are available from the start so a quiet service can
+    still retry; the balance is capped at ``max_tokens``.
+    """
+
+    def __init__(self, ratio: float = LETTA_RETRY_BUDGET_RATIO, reserve: float = 10.0, max_tokens: float = 100.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = reserve
+        self.exhausted = 0
+
+    def deposit(self):
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        self.exhausted += 1
+        return False
+
+class LettaResilience:
+    """Runs blocking Letta client calls through timeouts, the breaker and the retry budget"""
+
+    def __init__(
+        self,
+        timeouts: Optional[Dict[str, float]] = None,
+        default_timeout: float = LETTA_DEFAULT_TIMEOUT,
+        breaker: Optional[CircuitBreaker] = None,
+        budget: Optional[RetryBudget] = None,
+        max_retries: int = LETTA_MAX_RETRIES,
+        hedge_delay: Optional[float] = LETTA_HEDGE_DELAY_MS / 1000 if LETTA_HEDGE_DELAY_MS > 0 else None,
+        retry_backoff: float = 0.1
+    ):
+        self.timeouts = dict(LETTA_TIMEOUTS if timeouts is None else timeouts)
+        self.default_timeout = default_timeout
+        self.breaker = breaker or CircuitBreaker()
+        self.budget = budget or RetryBudget()
+        self.max_retries = max_retries
+        self.hedge_delay = hedge_delay
+        self.retry_backoff = retry_backoff
+        self.calls = Counter()
+        self.failures = Counter()
+        self.timeouts_hit = Counter()
+        self.shed = Counter()
+        self.retries = Counter()
+        self.hedges = Counter()
+
+    async def call(
+        self,
+        operation: str,
+        func: Callable[..., Any],
+        *args,
+        essential: bool = True,
+        idempotent: bool = False,
+        drain: bool = False,
+        **kwargs
+    ) -> Any:
+        """Run ``func(*args, **kwargs)`` in a thread; only idempotent calls are retried or hedged
+
+        With ``drain`` the call does not return (or raise) until its worker
+        threads have finished, even after a timeout.
+        """
+        if not self.breaker.allow(essential):
+            self.shed[operation] += 1
+            raise CircuitOpen(f"Letta circuit open; shed {operation}")
+
+        timeout = self.timeouts.get(operation, self.default_timeout)
+        max_retries = self.max_retries if idempotent else 0
+        self.calls[operation] += 1
+        self.budget.deposit()
+
+        attempt = 0
+        while True:
+            leftovers: Optional[List[asyncio.Future]] = [] if drain else None
+            try:
+                result = await asyncio.wait_for(
+                    self._race(operation, func, args, kwargs, idempotent, leftovers), timeout
+                )
+            except Exception as e:
+                self.failures[operation] += 1
+                if isinstance(e, asyncio.TimeoutError):
+                    self.timeouts_hit[operation] += 1
+                    logger.warning(f"Letta {operation} timed out after {timeout}s")
+                self.breaker.record_failure()
+                await self._drain(leftovers)
+                if attempt >= max_retries or not self.breaker.allow(essential) or not self.budget.withdraw():
+                    raise
+                attempt += 1
+                self.retries[operation] += 1
+                await asyncio.sleep(self.retry_backoff * attempt)
+                continue
+            self.breaker.record_success()
+            await self._drain(leftovers)
+            return result
+
+    @staticmethod
+    async def _drain(leftovers: Optional[List[asyncio.Future]]):
+        """Wait for attempts that were abandoned but are still running in their threads"""
+        if not leftovers:
+            return
+        await asyncio.wait(leftovers)
+        for task in leftovers:
+            # Their outcome was already given up on; retrieve it so it is not logged as unhandled
+            task.cancelled() or task.exception()
+
+    async def _race(
+        self,
+        operation: str,
+        func: Callable[..., Any],
+        args: tuple,
+        kwargs: dict,
+        hedge: bool,
+        leftovers: Optional[List[asyncio.Future]] = None
+    ) -> Any:
+        """First successful result of the call and, once ``hedge_delay`` passes, a hedge
+
+        Attempts still running when this returns (or is cancelled by the
+        timeout) are cancelled, or handed to ``leftovers`` to be waited for.
+        """
+        pending = {asyncio.ensure_future(asyncio.to_thread(func, *args, **kwargs))}
+        can_hedge = hedge and self.hedge_delay is not None
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=self.hedge_delay if can_hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    can_hedge = False
+                    self.hedges[operation] += 1
+                    pending.add(asyncio.ensure_future(asyncio.to_thread(func, *args, **kwargs)))
+                    continue
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # Worker threads cannot be interrupted; a losing attempt finishes and is ignored
+            if leftovers is not None:
+                leftovers.extend(pending)
+            else:
+                for task in pending:
+                    task.cancel()
+
+    async def stream(self, operation: str, func: Callable[..., Any], *args, **kwargs) -> AsyncIterator[Any]:
+        """Open a streamed response with ``func`` and yield its chunks
+
+        Opening the stream and waiting for each chunk are subject to the
+        operation's timeout; a failure or timeout counts against the breaker
+        and ends the stream. Streams are never retried. The underlying stream
+        is closed, and its reader thread waited for, when iteration stops.
+        """
+        stream = await self.call(operation, func, *args, drain=True, **kwargs)
+        timeout = self.timeouts.get(operation, self.default_timeout)
+        chunks = iter(stream)
+        done = object()
+        reader: Optional[asyncio.Future] = None
+        try:
+            while True:
+                reader = asyncio.ensure_future(asyncio.to_thread(next, chunks, done))
+                try:
+                    chunk = await asyncio.wait_for(asyncio.shield(reader), timeout)
+                except Exception as e:
+                    self.failures[operation] += 1
+                    if isinstance(e, asyncio.TimeoutError):
+                        self.timeouts_hit[operation] += 1
+                        logger.warning(f"Letta {operation} stalled for {timeout}s")
+                    self.breaker.record_failure()
+                    raise
+                if chunk is done:
+                    break
+                yield chunk
+            self.breaker.record_success()
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                # Also unblocks a reader still waiting on the connection
+                await asyncio.to_thread(close)
+            await self._drain([reader] if reader is not None else None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "times_opened": self.breaker.times_opened,
+            "retry_tokens": round(self.budget.tokens, 2),
+            "retry_budget_exhausted": self.budget.exhausted,
+            "calls": dict(self.calls),
+            "failures": dict(self.failures),
+            "timeouts": dict(self.timeouts_hit),
+            "shed": dict(self.shed),
+            "retries": dict(self.retries),
+            "hedges": dict(self.hedges)
+        }
+
+# Global Letta resilience layer
+letta_resilience = LettaResilience()
@@ -0,0 +1,288 @@
+"""Key/value state shared by every worker process
+
+Under ``uvicorn --workers N`` each process has its own memory, so state that
+must agree across requests (the previous snapshot used for diffs, queue
+counters, who is creating an agent) lives behind a ``SharedState`` backend:
+
+- ``InProcessState``: plain dicts, for a single worker (the default)
+- ``SQLiteState``: a WAL-mode SQLite file, shared by all workers on one box
+
+Values are namespaced, may carry a TTL, and must be JSON-serializable for the
+SQLite backend. ``lease`` gives a cross-process mutex for work that must only
+happen once, such as creating a Letta agent.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from .config import SHARED_STATE_BACKEND, SHARED_STATE_PATH
+from .logging_utils import get_logger
+
+logger = get_logger("cache")
+
+class LeaseTimeout(Exception):
+    """Could not acquire a lease before the timeout"""
+
+class SharedState(ABC):
+    """Interface shared by the state backends
+
+    Backends may block (the SQLite one waits on other processes' locks), so
+    async code calls them through ``asyncio.to_thread``.
+    """
+
+    @abstractmethod
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        raise NotImplementedError
+
+    @abstractmethod
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, namespace: str, key: str):
+        raise NotImplementedError
+
+    @abstractmethod
+    def incr(self, namespace: str, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        """Atomically add to a counter (created at 0); ttl applies when it is created"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def items(self, namespace: str) -> Dict[str, Any]:
+        """Every live key in a namespace"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def acquire(self, namespace: str, key: str, owner: str, ttl: float) -> bool:
+        """Take ``key`` for ``owner`` if it is free, expired or already theirs"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def release(self, namespace: str, key: str, owner: str):
+        raise NotImplementedError
+
+    @contextmanager
+    def lease(self, namespace: str, key: str, ttl: float = 60.0, timeout: float = 60.0, poll_interval: float = 0.05):
+        """Hold ``key`` exclusively across processes; blocks, so call from a worker thread"""
+        owner = f"{os.getpid()}:{threading.get_ident()}:{uuid.uuid4().hex}"
+        deadline = time.monotonic() + timeout
+        while not self.acquire(namespace, key, owner, ttl):
+            if time.monotonic() >= deadline:
+                raise LeaseTimeout(f"Timed out waiting for lease {namespace}/{key}")
+            time.sleep(poll_interval)
+        try:
+            yield owner
+        finally:
+            self.release(namespace, key, owner)
+
+class InProcessState(SharedState):
+    """Shared state for a single process"""
+
+    def __init__(self):
+        self._data: Dict[str, Dict[str, tuple]] = {}
+        self._lock = threading.Lock()
+
+    def _live(self, namespace: str, key: str):
+        """(found, value) for an unexpired entry; caller holds the lock"""
+        entry = self._data.get(namespace, {}).get(key)
+        if entry is None:
+            return False, None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self._data[namespace][key]
+            return False, None
+        return True, value
+
+    def _put(self, namespace: str, key: str, value: Any, ttl: Optional[float]):
+        expires_at = time.time() + ttl if ttl is not None else None
+        self._data.setdefault(namespace, {})[key] = (value, expires_at)
+
+    def get(self, namespace, key, default=None):
+        with self._lock:
+            found, value = self._live(namespace, key)
+        return value if found else default
+
+    def set(self, namespace, key, value, ttl=None):
+        with self._lock:
+            self._put(namespace, key, value, ttl)
+
+    def delete(self, namespace, key):
+        with self._lock:
+            self._data.get(namespace, {}).pop(key, None)
+
+    def incr(self, namespace, key, amount=1, ttl=None):
+        with self._lock:
+            found, value = self._live(namespace, key)
+            if found:
+                expires_at = self._data[namespace][key][1]
+                self._data[namespace][key] = (value + amount, expires_at)
+                return value + amount
+            self._put(namespace, key, amount, ttl)
+            return amount
+
+    def items(self, namespace):
+        with self._lock:
+            result = {}
+            for key in list(self._data.get(namespace, {})):
+                found, value = self._live(namespace, key)
+                if found:
+                    result[key] = value
+            return result
+
+    def acquire(self, namespace, key, owner, ttl):
+        with self._lock:
+            found, holder = self._live(namespace, key)
+            if found and holder != owner:
+                return False
+            self._put(namespace, key, owner, ttl)
+            return True
+
+    def release(self, namespace, key, owner):
+        with self._lock:
+            found, holder = self._live(namespace, key)
+            if found and holder == owner:
+                del self._data[namespace][key]
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS shared_state (
+        namespace TEXT NOT NULL,
+        key TEXT NOT NULL,
+        value TEXT NOT NULL,
+        expires_at REAL,
+        PRIMARY KEY (namespace, key)
+    ) WITHOUT ROWID;
+"""
+
+class SQLiteState(SharedState):
+    """Shared state in a SQLite file, for several worker processes on one host
+
+    Each thread gets its own connection; read-modify-write operations run in
+    ``BEGIN IMMEDIATE`` transactions so they are atomic across processes.
+    Expired rows are ignored on read and swept every ``purge_every`` writes.
+    """
+
+    def __init__(self, db_path: Union[str, Path] = SHARED_STATE_PATH, purge_every: int = 1000):
+        self.db_path = str(db_path)
+        self.purge_every = purge_every
+        self._local = threading.local()
+        self._writes = 0
+        self._setup(self._connection())
+
+    def _setup(self, db: sqlite3.Connection, attempts: int = 50):
+        """Switch to WAL and create the table; workers starting together may see it locked"""
+        for attempt in range(attempts):
+            try:
+                if db.execute("PRAGMA journal_mode").fetchone()[0].lower() != "wal":
+                    db.execute("PRAGMA journal_mode=WAL")
+                db.executescript(SCHEMA)
+                return
+            except sqlite3.OperationalError as e:
+                # Switching journal mode returns SQLITE_BUSY without waiting on busy_timeout
+                if "locked" not in str(e) or attempt == attempts - 1:
+                    raise
+                time.sleep(0.05)
+
+    def _connection(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.db_path, isolation_level=None, timeout=30)
+            db.execute("PRAGMA busy_timeout=30000")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    @contextmanager
+    def _transaction(self):
+        db = self._connection()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+        self._writes += 1
+        if self._writes % self.purge_every == 0:
+            db.execute("DELETE FROM shared_state WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+
+    def _live(self, db: sqlite3.Connection, namespace: str, key: str):
+        row = db.execute(
+            "SELECT value FROM shared_state WHERE namespace = ? AND key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (namespace, key, time.time())
+        ).fetchone()
+        return (True, json.loads(row[0])) if row else (False, None)
+
+    def _put(self, db: sqlite3.Connection, namespace: str, key: str, value: Any, ttl: Optional[float]):
+        expires_at = time.time() + ttl if ttl is not None else None
+        db.execute(
+            "INSERT OR REPLACE INTO shared_state (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+            (namespace, key, json.dumps(value), expires_at)
+        )
+
+    def get(self, namespace, key, default=None):
+        found, value = self._live(self._connection(), namespace, key)
+        return value if found else default
+
+    def set(self, namespace, key, value, ttl=None):
+        with self._transaction() as db:
+            self._put(db, namespace, key, value, ttl)
+
+    def delete(self, namespace, key):
+        with self._transaction() as db:
+            db.execute("DELETE FROM shared_state WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def incr(self, namespace, key, amount=1, ttl=None):
+        with self._transaction() as db:
+            row = db.execute(
+                "SELECT value, expires_at FROM shared_state WHERE namespace = ? AND key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (namespace, key, time.time())
+            ).fetchone()
+            if row is None:
+                self._put(db, namespace, key, amount, ttl)
+                return amount
+            value = json.loads(row[0]) + amount
+            db.execute(
+                "UPDATE shared_state SET value = ? WHERE namespace = ? AND key = ?",
+                (json.dumps(value), namespace, key)
+            )
+            return value
+
+    def items(self, namespace):
+        rows = self._connection().execute(
+            "SELECT key, value FROM shared_state WHERE namespace = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (namespace, time.time())
+        ).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def acquire(self, namespace, key, owner, ttl):
+        with self._transaction() as db:
+            found, holder = self._live(db, namespace, key)
+            if found and holder != owner:
+                return False
+            self._put(db, namespace, key, owner, ttl)
+            return True
+
+    def release(self, namespace, key, owner):
+        with self._transaction() as db:
+            found, holder = self._live(db, namespace, key)
+            if found and holder == owner:
+                db.execute("DELETE FROM shared_state WHERE namespace = ? AND key = ?", (namespace, key))
+
+def create_shared_state(backend: str = SHARED_STATE_BACKEND) -> SharedState:
+    """Build the backend named by SHARED_STATE_BACKEND ("memory" or "sqlite")"""
+    if backend == "sqlite":
+        logger.info("Using SQLite shared state at %s", SHARED_STATE_PATH)
+        return SQLiteState()
+    if backend != "memory":
+        raise ValueError(f"Unknown SHARED_STATE_BACKEND: {backend}")
+    return InProcessState()
+
+# Global shared state backend
+shared_state = create_shared_state()
@@ -0,0 +1,164 @@
+"""Synthetic GameSnapshot streams for load testing
+
+``SnapshotGenerator`` moves a population of NPCs and players around a set of
+locations and emits one snapshot per ``tick``, shaped like the ones the Lua
+side posts to /letta/v1/snapshot/game. Groups come from proximity, the way
+the game forms them, so they change as entities move; ``group_churn`` adds
+random jumps on top to force membership changes.
+
+Movement patterns:
+
+- ``static``: entities never move
+- ``wander``: a random walk of up to ``speed`` studs per tick
+- ``commute``: each entity walks to a location, then picks another
+"""
+import math
+import random
+from typing import Dict, Iterator, List, Optional, Tuple
+
+MOVEMENT_PATTERNS = ("static", "wander", "commute")
+
+def synthetic_locations(count: int, spread: float = 400.0, seed: Optional[int] = None) -> Dict[str, dict]:
+    """``count`` locations scattered over a square, keyed by slug like LOCATION_CACHE"""
+    rng = random.Random(seed)
+    return {
+        f"location_{i}": {
+            "name": f"Location {i}",
+            "coordinates": [round(rng.uniform(-spread, spread), 3), 3.0, round(rng.uniform(-spread, spread), 3)],
+            "slug": f"location_{i}"
+        }
+        for i in range(count)
+    }
+
+class SnapshotGenerator:
+    """Deterministic (for a given seed) stream of snapshots"""
+
+    def __init__(
+        self,
+        npc_names: List[str],
+        players: int = 10,
+        locations: Optional[Dict[str, dict]] = None,
+        movement: str = "commute",
+        group_radius: float = 10.0,
+        group_churn: float = 0.0,
+        speed: float = 8.0,
+        game_id: Optional[int] = None,
+        seed: Optional[int] = None
+    ):
+        if movement not in MOVEMENT_PATTERNS:
+            raise ValueError(f"Unknown movement pattern {movement}; expected one of {MOVEMENT_PATTERNS}")
+        self.rng = random.Random(seed)
+        self.npcs = set(npc_names)
+        self.names = list(npc_names) + [f"Player{i}" for i in range(players)]
+        self.locations = locations or synthetic_locations(10, seed=seed)
+        self.anchors = [tuple(loc["coordinates"]) for loc in self.locations.values()]
+        self.movement = movement
+        self.group_radius = group_radius
+        self.group_churn = group_churn
+        self.speed = speed
+        self.game_id = game_id
+        self.timestamp = 1_700_000_000
+        self.positions: Dict[str, List[float]] = {name: self._near_anchor() for name in self.names}
+        self.targets: Dict[str, Tuple[float, float, float]] = {name: self.rng.choice(self.anchors) for name in self.names}
+        self.moving: Dict[str, bool] = {name: False for name in self.names}
+        self.formed: Dict[Tuple[str, ...], int] = {}
+
+    def _near_anchor(self) -> List[float]:
+        x, y, z = self.rng.choice(self.anchors)
+        return [x + self.rng.uniform(-5, 5), y, z + self.rng.uniform(-5, 5)]
+
+    def _move(self, name: str):
+        position = self.positions[name]
+        before = list(position)
+        if self.group_churn and self.rng.random() < self.group_churn:
+            self.positions[name] = self._near_anchor()
+        elif self.movement == "wander":
+            position[0] += self.rng.uniform(-self.speed, self.speed)
+            position[2] += self.rng.uniform(-self.speed, self.speed)
+        elif self.movement == "commute":
+            tx, _, tz = self.targets[name]
+            dx, dz = tx - position[0], tz - position[2]
+            distance = math.hypot(dx, dz)
+            if distance <= self.speed:
+                position[0], position[2] = tx + self.rng.uniform(-3, 3), tz + self.rng.uniform(-3, 3)
+                # Linger a while before heading somewhere else
+                if self.rng.random() < 0.1:
+                    self.targets[name] = self.rng.choice(self.anchors)
+            else:
+                position[0] += dx / distance * self.speed
+                position[2] += dz / distance * self.speed
+        self.moving[name] = self.positions[name] != before
+
+    def _groups(self) -> List[List[str]]:
+        """Connected components of entities within ``group_radius`` of each other"""
+        cell = self.group_radius
+        grid: Dict[Tuple[int, int], List[str]] = {}
+        for name, (x, _, z) in self.positions.items():
+            grid.setdefault((int(x // cell), int(z // cell)), []).append(name)
+
+        parent = {name: name for name in self.names}
+
+        def find(name: str) -> str:
+            while parent[name] != name:
+                parent[name] = parent[parent[name]]
+                name = parent[name]
+            return name
+
+        radius_sq = self.group_radius ** 2
+        for (cx, cz), members in grid.items():
+            neighbours = [n for dx in (-1, 0, 1) for dz in (-1, 0, 1) for n in grid.get((cx + dx, cz + dz), ())]
+            for name in members:
+                x, _, z = self.positions[name]
+                for other in neighbours:
+                    ox, _, oz = self.positions[other]
+                    if other != name and (x - ox) ** 2 + (z - oz) ** 2 <= radius_sq:
+                        parent[find(name)] = find(other)
+
+        groups: Dict[str, List[str]] = {}
+        for name in self.names:
+            groups.setdefault(find(name), []).append(name)
+        return list(groups.values())
+
+    def tick(self, seconds: int = 1) -> dict:
+        """Advance the world and return the next snapshot"""
+        self.timestamp += seconds
+        for name in self.names:
+            self._move(name)
+
+        human_context = {}
+        clusters = []
+        for members in self._groups():
+            key = tuple(sorted(members))
+            formed = self.formed.setdefault(key, self.timestamp)
+            npcs = sum(1 for member in members if member in self.npcs)
+            group = {"members": members, "npcs": npcs, "players": len(members) - npcs, "formed": formed}
+            clusters.append({"members": members, "npcs": npcs, "players": len(members) - npcs})
+            for name in members:
+                x, y, z = self.positions[name]
+                human_context[name] = {
+                    "relationships": [],
+                    "currentGroups": group,
+                    "recentInteractions": [],
+                    "lastSeen": self.timestamp,
+                    "position": {"x": round(x, 3), "y": round(y, 3), "z": round(z, 3)},
+                    "health": {
+                        "state": "Running" if self.moving[name] else "Idle",
+                        "current": 100,
+                        "max": 100,
+                        "velocity": self.speed if self.moving[name] else 0,
+                        "isMoving": self.moving[name]
+                    }
+                }
+
+        # Forget groups that no longer exist so the map stays bounded
+        live = {tuple(sorted(cluster["members"])) for cluster in clusters}
+        self.formed = {key: formed for key, formed in self.formed.items() if key in live}
+
+        snapshot = {"timestamp": self.timestamp, "events": [], "clusters": clusters, "humanContext": human_context}
+        if self.game_id is not None:
+            snapshot["gameId"] = self.game_id
+        return snapshot
+
+    def stream(self, count: int, seconds: int = 1) -> Iterator[dict]:
+        for _ in range(count):
+            yield self.tick(seconds)
@@ -0,0 +1,271 @@
+"""Snapshot ingestion: decode the request body once into compact records
+
+``GameSnapshot`` leaves ``humanContext`` untyped, so a snapshot used to be
+parsed into dicts by FastAPI, converted piecewise into pydantic models during
+enrichment and dumped back to dicts for the previous-state store. This path
+parses the raw body with orjson (the stdlib parser when it is not installed)
+straight into ``__slots__`` records for positions, health and groups.
+
+The records keep the attribute names of the pydantic models (and ``Health``
+answers ``.get`` like the dict it replaces), so the status and group code
+takes either. The stored previous state holds only what the next snapshot
+diffs against, in the same layout ``enrich_snapshot_with_context`` reads.
+"""
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from .cache import get_locations
+from .location_utils import location_narrative
+from .logging_utils import get_logger
+from .metrics import metrics
+from .shared_state import shared_state
+from .snapshot_processor import SNAPSHOT_NAMESPACE, _generate_group_updates, _snapshot_key, get_previous_entity_state
+from .utils import get_current_action
+
+try:
+    from orjson import loads as _loads
+except ImportError:
+    _loads = json.loads
+
+logger = get_logger("snapshot")
+
+class SnapshotDecodeError(ValueError):
+    """The body is not valid JSON or not shaped like a game snapshot"""
+    pass
+
+@dataclass
+class Position:
+    __slots__ = ("x", "y", "z")
+
+    x: float
+    y: float
+    z: float
+
+    def get_location_narrative(self, locations: Optional[Dict[str, dict]] = None) -> str:
+        if locations is None:
+            locations = get_locations()
+        return location_narrative(self.x, self.y, self.z, locations)
+
+    def as_dict(self) -> Dict[str, float]:
+        return {"x": self.x, "y": self.y, "z": self.z}
+
+@dataclass
+class Health:
+    __slots__ = ("state", "current", "max", "velocity", "isMoving")
+
+    state: Optional[str]
+    current: Optional[float]
+    max: Optional[float]
+    velocity: Optional[float]
+    isMoving: Optional[bool]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Dict-style access, so code written against the health dict still works"""
+        value = getattr(self, key, None)
+        return default if value is None else value
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {key: getattr(self, key) for key in self.__slots__ if getattr(self, key) is not None}
+
+@dataclass
+class Group:
+    __slots__ = ("members", "npcs", "players", "formed", "updates")
+
+    members: List[str]
+    npcs: int
+    players: int
+    formed: int
+    updates: List[str]
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "members": self.members, "npcs": self.npcs, "players": self.players,
+            "formed": self.formed, "updates": self.updates
+        }
+
+@dataclass
+class Interaction:
+    __slots__ = ("timestamp", "narrative")
+
+    timestamp: int
+    narrative: str
+
+@dataclass
+class EntityContext:
+    __slots__ = (
+        "health", "position", "currentGroups", "recentInteractions", "lastSeen",
+        "stateTimestamp", "positionTimestamp", "location", "needs_status_update"
+    )
+
+    health: Optional[Health]
+    position: Optional[Position]
+    currentGroups: Optional[Group]
+    recentInteractions: Optional[List[Interaction]]
+    lastSeen: Optional[int]
+    stateTimestamp: Optional[int]
+    positionTimestamp: Optional[int]
+    location: Optional[str]
+    needs_status_update: bool
+
+    def state_dict(self) -> Dict[str, Any]:
+        """What the next snapshot diffs against"""
+        data = {}
+        if self.health:
+            data["health"] = self.health.as_dict()
+        if self.position:
+            data["position"] = self.position.as_dict()
+        if self.currentGroups:
+            data["currentGroups"] = self.currentGroups.as_dict()
+        if self.location is not None:
+            data["location"] = self.location
+        return data
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "health": self.health.as_dict() if self.health else None,
+            "position": self.position.as_dict() if self.position else None,
+            "currentGroups": self.currentGroups.as_dict() if self.currentGroups else None,
+            "recentInteractions": [
+                {"timestamp": i.timestamp, "narrative": i.narrative} for i in self.recentInteractions
+            ] if self.recentInteractions is not None else None,
+            "lastSeen": self.lastSeen,
+            "stateTimestamp": self.stateTimestamp,
+            "positionTimestamp": self.positionTimestamp,
+            "location": self.location,
+            "needs_status_update": self.needs_status_update
+        }
+
+@dataclass
+class Snapshot:
+    __slots__ = ("timestamp", "gameId", "events", "clusters", "humanContext")
+
+    timestamp: int
+    gameId: Optional[int]
+    events: List[Dict[str, Any]]
+    clusters: List[Dict[str, Any]]
+    humanContext: Dict[str, EntityContext]
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "timestamp": self.timestamp,
+            "gameId": self.gameId,
+            "events": self.events,
+            "clusters": self.clusters,
+            "humanContext": {name: context.as_dict() for name, context in self.humanContext.items()}
+        }
+
+def _optional_int(value: Any) -> Optional[int]:
+    return None if value is None else int(value)
+
+def _optional_float(value: Any) -> Optional[float]:
+    return None if value is None else float(value)
+
+def decode_context(data: Dict[str, Any]) -> EntityContext:
+    """One humanContext entry; also reads stored previous state"""
+    position = data.get("position")
+    health = data.get("health")
+    group = data.get("currentGroups")
+    interactions = data.get("recentInteractions")
+    return EntityContext(
+        health=Health(
+            health.get("state"),
+            _optional_float(health.get("current")),
+            _optional_float(health.get("max")),
+            _optional_float(health.get("velocity")),
+            health.get("isMoving")
+        ) if health else None,
+        # Rounded like PositionData
+        position=Position(
+            round(float(position["x"]), 3),
+            round(float(position["y"]), 3),
+            round(float(position["z"]), 3)
+        ) if position else None,
+        currentGroups=Group(
+            list(group["members"]),
+            int(group.get("npcs", 0)),
+            int(group.get("players", 0)),
+            int(group.get("formed", 0)),
+            list(group.get("updates") or [])
+        ) if group else None,
+        recentInteractions=[
+            Interaction(int(i["timestamp"]), i["narrative"]) for i in interactions
+        ] if interactions is not None else None,
+        lastSeen=_optional_int(data.get("lastSeen")),
+        stateTimestamp=_optional_int(data.get("stateTimestamp")),
+        positionTimestamp=_optional_int(data.get("positionTimestamp")),
+        location=data.get("location"),
+        needs_status_update=bool(data.get("needs_status_update", False))
+    )
+
+def decode_snapshot(body: bytes) -> Snapshot:
+    """Parse a /snapshot/game body into records, raising SnapshotDecodeError if malformed"""
+    try:
+        data = _loads(body)
+    except ValueError as e:
+        raise SnapshotDecodeError(f"Invalid JSON: {e}") from e
+    if not isinstance(data, dict):
+        raise SnapshotDecodeError("Snapshot must be a JSON object")
+
+    for field, kind in (("timestamp", int), ("events", list), ("clusters", list), ("humanContext", dict)):
+        if not isinstance(data.get(field), kind):
+            raise SnapshotDecodeError(f"{field} is missing or not a {kind.__name__}")
+
+    human_context = {}
+    for name, context in data["humanContext"].items():
+        try:
+            human_context[name] = decode_context(context)
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            raise SnapshotDecodeError(f"humanContext.{name}: {e!r}") from e
+
+    try:
+        game_id = _optional_int(data.get("gameId"))
+    except (TypeError, ValueError) as e:
+        raise SnapshotDecodeError(f"gameId: {e!r}") from e
+    return Snapshot(data["timestamp"], game_id, data["events"], data["clusters"], human_context)
+
+def store_previous_state(snapshot: Snapshot):
+    """Keep the state the next snapshot diffs against"""
+    shared_state.set(SNAPSHOT_NAMESPACE, _snapshot_key(snapshot.gameId), {
+        "timestamp": snapshot.timestamp,
+        "gameId": snapshot.gameId,
+        "humanContext": {name: context.state_dict() for name, context in snapshot.humanContext.items()}
+    })
+
+@metrics.timed("snapshot_enrichment")
+def enrich_snapshot(snapshot: Snapshot) -> Snapshot:
+    """Add location narratives, group updates and status flags, like enrich_snapshot_with_context"""
+    previous_state = get_previous_entity_state(snapshot.gameId)
+    locations = get_locations(snapshot.gameId)
+
+    for entity_id, context in snapshot.humanContext.items():
+        if context.position:
+            narrative = (
+                location_narrative(context.position.x, context.position.y, context.position.z, locations)
+                if locations else
+                f"at coordinates ({context.position.x}, {context.position.y}, {context.position.z})"
+            )
+            context.location = narrative
+            if context.recentInteractions:
+                context.recentInteractions[-1].narrative = narrative
+
+        previous = previous_state.get(entity_id)
+        if not previous:
+            # First sighting, always update
+            context.needs_status_update = True
+            continue
+
+        previous_group = previous.get("currentGroups")
+        if previous_group and context.currentGroups:
+            updates = _generate_group_updates(previous_group["members"], context.currentGroups.members)
+            if updates:
+                context.currentGroups.updates = updates
+
+        previous = decode_context(previous)
+        location_changed = (context.location or "Unknown") != (previous.location or "Unknown")
+        action_changed = get_current_action(context) != get_current_action(previous)
+        context.needs_status_update = location_changed or action_changed
+        logger.debug("Status update needed for %s: %s", entity_id, context.needs_status_update)
+
+    store_previous_state(snapshot)
+    return snapshot
@@ -1,32 +1,37 @@
 from typing import Dict, Optional, List
 import math
 import logging
-from .cache import LOCATION_CACHE
+from .cache import get_locations
 from .models import GameSnapshot, PositionData, HumanContextData, GroupData, InteractionData
 import json
 from .utils import get_current_action
+from .logging_utils import get_logger, Lazy
+from .metrics import metrics
+from .shared_state import shared_state
 
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
+logger = get_logger("snapshot")
 
-# Store previous snapshot for comparison
-last_snapshot: Dict = {}
+# Previous snapshot per game, shared across workers so consecutive snapshots
+# diff correctly whichever worker receives them
+SNAPSHOT_NAMESPACE = "previous_snapshot"
+
+def _snapshot_key(game_id: Optional[int]) -> str:
+    return "default" if game_id is None else str(game_id)
 
 def update_previous_state(snapshot_data: GameSnapshot):
     """Update the previous state cache"""
-    global last_snapshot
-    last_snapshot = snapshot_data.model_dump()
+    shared_state.set(SNAPSHOT_NAMESPACE, _snapshot_key(snapshot_data.gameId), snapshot_data.model_dump(mode="json"))
 
-def get_previous_entity_state() -> Dict:
+def get_previous_entity_state(game_id: Optional[int] = None) -> Dict:
     """Get previous snapshot state"""
-    global last_snapshot
+    last_snapshot = shared_state.get(SNAPSHOT_NAMESPACE, _snapshot_key(game_id))
     if last_snapshot and 'humanContext' in last_snapshot:
         return last_snapshot['humanContext']
     return {}
 
-def get_entity_previous_state(entity_id: str) -> Optional[Dict]:
+def get_entity_previous_state(entity_id: str, game_id: Optional[int] = None) -> Optional[Dict]:
     """Get specific entity's state from previous snapshot"""
-    previous = get_previous_entity_state()
+    previous = get_previous_entity_state(game_id)
     return previous.get(entity_id)
 
 def generate_health_context(old_health: Dict, new_health: Dict) -> str:
@@ -142,26 +147,29 @@ def _generate_group_updates(old_members: List[str], new_members: List[str]) -> L
     
     return updates
 
+@metrics.timed("location_resolution")
 def get_location_from_coordinates(x: float, y: float, z: float) -> str:
     """Convert coordinates to location description"""
-    logger.debug(f"Getting location for coordinates: ({x}, {y}, {z})")
+    logger.debug("Getting location for coordinates: (%s, %s, %s)", x, y, z)
     
     # Add your location lookup logic here
     location = "Unknown"  # Default value
     
     # Log the result
-    logger.debug(f"Resolved location: {location}")
+    logger.debug("Resolved location: %s", location)
     return location
 
+@metrics.timed("snapshot_enrichment")
 def enrich_snapshot_with_context(snapshot: GameSnapshot) -> GameSnapshot:
     """Add location context and other enrichments to snapshot"""
     logger.debug("=== Starting snapshot enrichment ===")
     
     # Get previous state first
-    previous_state = get_previous_entity_state()
+    previous_state = get_previous_entity_state(snapshot.gameId)
+    locations = get_locations(snapshot.gameId)
     
     for entity_id, context_dict in snapshot.humanContext.items():
-        logger.debug(f"\nProcessing entity: {entity_id}")
+        logger.debug("Processing entity: %s", entity_id)
         
         # Convert to model first
         if isinstance(context_dict, dict):
@@ -183,9 +191,9 @@ def enrich_snapshot_with_context(snapshot: GameSnapshot) -> GameSnapshot:
             
         # Now we can safely get location
         if context.position:
-            nearest_location = context.position.get_nearest_location()
-            location_narrative = context.position.get_location_narrative()
-            logger.debug(f"Location narrative: {location_narrative}")
+            nearest_location = context.position.get_nearest_location(locations)
+            location_narrative = context.position.get_location_narrative(locations)
+            logger.debug("Location narrative: %s", location_narrative)
             
             # Update context with enriched location data
             context.location = location_narrative  # Use the actual generated narrative
@@ -236,8 +244,8 @@ def enrich_snapshot_with_context(snapshot: GameSnapshot) -> GameSnapshot:
             # Compare actual state changes
             action_changed = get_current_action(context) != get_current_action(prev_context)
             
-            logger.debug(f"Location changed: {location_changed} ({prev_context.location} -> {context.location})")
-            logger.debug(f"Action changed: {action_changed}")
+            logger.debug("Location changed: %s (%s -> %s)", location_changed, prev_context.location, context.location)
+            logger.debug("Action changed: %s", action_changed)
             
             if location_changed or action_changed:
                 context.needs_status_update = True
@@ -245,7 +253,7 @@ def enrich_snapshot_with_context(snapshot: GameSnapshot) -> GameSnapshot:
             # No previous state, always update first time
             context.needs_status_update = True
         
-        logger.debug(f"Status update needed for {entity_id}: {getattr(context, 'needs_status_update', False)}")
+        logger.debug("Status update needed for %s: %s", entity_id, getattr(context, 'needs_status_update', False))
         if previous_state and entity_id in previous_state:
             prev_context = previous_state[entity_id]
             # Convert prev_context to model first for logging
@@ -258,10 +266,10 @@ def enrich_snapshot_with_context(snapshot: GameSnapshot) -> GameSnapshot:
                         prev_context['currentGroups'] = GroupData(**prev_context['currentGroups'])
                 prev_context = HumanContextData(**prev_context)
             
-            logger.debug(f"Previous location: {prev_context.location}")
-            logger.debug(f"Current location: {context.location}")
-            logger.debug(f"Previous action: {get_current_action(prev_context)}")
-            logger.debug(f"Current action: {get_current_action(context)}")
+            logger.debug("Previous location: %s", prev_context.location)
+            logger.debug("Current location: %s", context.location)
+            logger.debug("Previous action: %s", Lazy(get_current_action, prev_context))
+            logger.debug("Current action: %s", Lazy(get_current_action, context))
         
         snapshot.humanContext[entity_id] = context
     
@@ -1,22 +1,21 @@
 import logging
 from typing import Dict, Optional
 from .models import GameSnapshot, HumanContextData
-from .cache import get_npc_id_from_name, get_agent_id, get_player_info
-from letta_templates.npc_utils_v2 import update_location_status, update_group_members_v2
-from letta_templates.npc_tools import create_letta_client
+from .cache import get_agent_id_for_name
+from letta_templates.npc_utils_v2 import update_location_status
+from .clients import get_letta_client
+from .metrics import metrics
 
 logger = logging.getLogger(__name__)
 
-direct_client = create_letta_client()
-
 async def update_status_block(entity_id: str, context: Optional[HumanContextData], enriched_snapshot: GameSnapshot):
-    """Update NPC status with enriched context and group info"""
+    """Update NPC status with enriched context and group size"""
     try:
         if not context:
             logger.warning(f"No context data for {entity_id}, skipping status update")
             return
 
-        agent_id = get_agent_id(get_npc_id_from_name(entity_id))
+        agent_id = get_agent_id_for_name(entity_id)
         if not agent_id:
             logger.warning(f"No agent found for NPC {entity_id}")
             return
@@ -48,41 +47,9 @@ async def update_status_block(entity_id: str, context: Optional[HumanContextData
         if hasattr(context, 'currentActivity') and context.currentActivity:
             updates.append(f"Activity: {context.currentActivity}")
         
-        # Group status - handle missing or partial data
-        try:
-            if hasattr(context, 'currentGroups') and context.currentGroups and context.currentGroups.members:
-                member_info = []
-                for member in context.currentGroups.members:
-                    try:
-                        player_info = get_player_info(member)
-                        member_info.append({
-                            "id": member,
-                            "name": member,
-                            "location": (enriched_snapshot.humanContext.get(member, {})
-                                       .get('location', 'Unknown'))
-                        })
-                    except Exception as e:
-                        logger.warning(f"Error processing member {member}: {e}")
-                        continue
-
-                if member_info:  # Only update if we have valid members
-                    try:
-                        await update_group_members_v2(
-                            client=direct_client,
-                            agent_id=agent_id,
-                            nearby_players=member_info
-                        )
-                        updates.append(f"Group: With {len(member_info)} others")
-                    except Exception as e:
-                        logger.error(f"Error updating group members: {e}")
-                        updates.append("Group: Alone")  # Add on error
-                else:
-                    updates.append("Group: Alone")  # Add if no valid members
-            else:
-                updates.append("Group: Alone")  # Add if no group data
-        except Exception as e:
-            logger.error(f"Error processing group data: {e}")
-            updates.append("Group: Alone")  # Add on any error
+        # Group size only; the group block itself is written by the group reconciler
+        members = context.currentGroups.members if getattr(context, 'currentGroups', None) else []
+        updates.append(f"Group: With {len(members)} others" if members else "Group: Alone")
         
         # Update status if we have any updates
         if updates:
@@ -90,12 +57,13 @@ async def update_status_block(entity_id: str, context: Optional[HumanContextData
                 status_text = " | ".join(updates)
                 logger.info(f"Updating status for {entity_id}: {status_text}")
                 
-                await update_location_status(
-                    client=direct_client,
-                    agent_id=agent_id,
-                    current_location=context.location or 'Unknown',
-                    current_action=status_text
-                )
+                async with metrics.timer("letta", "update_location_status"):
+                    await update_location_status(
+                        client=get_letta_client(),
+                        agent_id=agent_id,
+                        current_location=context.location or 'Unknown',
+                        current_action=status_text
+                    )
             except Exception as e:
                 logger.error(f"Error updating status: {e}")
                 
@@ -9,6 +9,7 @@ import shutil
 import logging
 from .paths import get_database_paths
 from .models import HumanContextData
+from .metrics import metrics
 
 # Set up logger
 logger = logging.getLogger("roblox_app")
@@ -117,6 +118,7 @@ def format_asset_as_lua(asset: dict) -> str:
             type = "{asset.get('type', 'Model')}",{location_info}
         }},\n"""
 
+@metrics.timed("lua_export")
 def save_lua_database(game_slug: str, db: sqlite3.Connection) -> None:
     """Save both NPC and Asset Lua databases for a game"""
     try:
@@ -276,6 +278,7 @@ def ensure_game_directories(game_slug: str, clone_from: Optional[str] = None) ->
         logger.error("Stack trace:", exc_info=True)
         raise
 
+@metrics.timed("lua_export")
 def save_databases(game_slug: str, db: sqlite3.Connection) -> None:
     """Save both Lua and JSON databases for a game"""
     try:
@@ -0,0 +1,58 @@
+"""Add conversation store tables
+
+This migration adds tables used to persist conversation history so that
+conversations survive restarts and are shared between workers.
+"""
+
+# Also applied by app/conversation_store.py, so a fresh DB works without migrating
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS conversations (
+        id TEXT PRIMARY KEY,
+        type TEXT NOT NULL,
+        participants TEXT NOT NULL DEFAULT '{}',  -- JSON object
+        metadata TEXT NOT NULL DEFAULT '{}',  -- JSON object
+        created_at TIMESTAMP NOT NULL,
+        last_update TIMESTAMP NOT NULL,
+        ended_at TIMESTAMP
+    );
+
+    CREATE TABLE IF NOT EXISTS conversation_messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        conversation_id TEXT NOT NULL,
+        sender_id TEXT NOT NULL,
+        content TEXT NOT NULL,
+        timestamp TIMESTAMP NOT NULL,
+        FOREIGN KEY (conversation_id) REFERENCES conversations(id)
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_conversation_messages_conversation
+    ON conversation_messages(conversation_id, id);
+"""
+
+def migrate(db):
+    """Create conversations and conversation_messages tables"""
+    print("Creating conversation store tables...")
+
+    try:
+        db.executescript(SCHEMA)
+        db.commit()
+        print("✓ Successfully created conversation store tables")
+
+    except Exception as e:
+        print(f"! Failed to create conversation store tables: {str(e)}")
+        db.rollback()
+        raise
+
+def rollback(db):
+    """Remove conversation store tables"""
+    print("Removing conversation store tables...")
+
+    try:
+        db.execute("DROP TABLE IF EXISTS conversation_messages")
+        db.execute("DROP TABLE IF EXISTS conversations")
+        db.commit()
+        print("✓ Successfully removed conversation store tables")
+    except Exception as e:
+        print(f"! Failed to remove conversation store tables: {str(e)}")
+        db.rollback()
+        raise
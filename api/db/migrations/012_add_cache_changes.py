@@ -0,0 +1,79 @@
+"""Add the cache_changes log and its triggers
+
+Every insert, update or delete on npcs, assets and npc_agents appends a row
+to cache_changes so running API servers can refresh just the affected cache
+entries, including after edits made by the scripts/ tools.
+"""
+
+TABLES = ("npcs", "assets", "npc_agents")
+
+# Also applied by app/cache_poller.py, so a fresh DB works without migrating
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS cache_changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name TEXT NOT NULL,
+        row_key TEXT NOT NULL,
+        game_id INTEGER,
+        changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+    CREATE TRIGGER IF NOT EXISTS cache_changes_npcs_insert AFTER INSERT ON npcs BEGIN
+        INSERT INTO cache_changes (table_name, row_key, game_id) VALUES ('npcs', NEW.npc_id, NEW.game_id);
+    END;
+    CREATE TRIGGER IF NOT EXISTS cache_changes_npcs_update AFTER UPDATE ON npcs BEGIN
+        INSERT INTO cache_changes (table_name, row_key, game_id) VALUES ('npcs', NEW.npc_id, NEW.game_id);
+    END;
+    CREATE TRIGGER IF NOT EXISTS cache_changes_npcs_delete AFTER DELETE ON npcs BEGIN
+        INSERT INTO cache_changes (table_name, row_key, game_id) VALUES ('npcs', OLD.npc_id, OLD.game_id);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS cache_changes_assets_insert AFTER INSERT ON assets BEGIN
+        INSERT INTO cache_changes (table_name, row_key, game_id) VALUES ('assets', NEW.asset_id, NEW.game_id);
+    END;
+    CREATE TRIGGER IF NOT EXISTS cache_changes_assets_update AFTER UPDATE ON assets BEGIN
+        INSERT INTO cache_changes (table_name, row_key, game_id) VALUES ('assets', NEW.asset_id, NEW.game_id);
+    END;
+    CREATE TRIGGER IF NOT EXISTS cache_changes_assets_delete AFTER DELETE ON assets BEGIN
+        INSERT INTO cache_changes (table_name, row_key, game_id) VALUES ('assets', OLD.asset_id, OLD.game_id);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS cache_changes_npc_agents_insert AFTER INSERT ON npc_agents BEGIN
+        INSERT INTO cache_changes (table_name, row_key) VALUES ('npc_agents', NEW.npc_id);
+    END;
+    CREATE TRIGGER IF NOT EXISTS cache_changes_npc_agents_update AFTER UPDATE ON npc_agents BEGIN
+        INSERT INTO cache_changes (table_name, row_key) VALUES ('npc_agents', NEW.npc_id);
+    END;
+    CREATE TRIGGER IF NOT EXISTS cache_changes_npc_agents_delete AFTER DELETE ON npc_agents BEGIN
+        INSERT INTO cache_changes (table_name, row_key) VALUES ('npc_agents', OLD.npc_id);
+    END;
+"""
+
+def migrate(db):
+    """Create cache_changes and the triggers that feed it"""
+    print("Creating cache change log...")
+
+    try:
+        db.executescript(SCHEMA)
+        db.commit()
+        print("✓ Successfully created cache change log")
+
+    except Exception as e:
+        print(f"! Failed to create cache change log: {str(e)}")
+        db.rollback()
+        raise
+
+def rollback(db):
+    """Remove cache_changes and its triggers"""
+    print("Removing cache change log...")
+
+    try:
+        for table in TABLES:
+            for op in ("insert", "update", "delete"):
+                db.execute(f"DROP TRIGGER IF EXISTS cache_changes_{table}_{op}")
+        db.execute("DROP TABLE IF EXISTS cache_changes")
+        db.commit()
+        print("✓ Successfully removed cache change log")
+    except Exception as e:
+        print(f"! Failed to remove cache change log: {str(e)}")
+        db.rollback()
+        raise
@@ -0,0 +1,103 @@
+import argparse
+import logging
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add api directory to path
+api_dir = Path(__file__).parent.parent
+sys.path.append(str(api_dir))
+
+from app.conversation_managerV2 import ConversationManagerV2
+
+def timed(label: str, count: int, func):
+    """Run func, print total time and per-operation cost"""
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed:8.3f}s  {elapsed / count * 1e6:8.2f}us/op")
+    return result
+
+def run_benchmark(conversations: int, messages: int, max_messages: int, players: int, trace_memory: bool):
+    """Exercise ConversationManagerV2 with many concurrent conversations"""
+    manager = ConversationManagerV2(max_messages=max_messages, max_conversations=None)
+    rng = random.Random(42)
+
+    if trace_memory:
+        tracemalloc.start()
+
+    def create_all():
+        return [
+            manager.create_conversation(
+                "npc_user",
+                {"id": f"npc_{i % 50}", "type": "npc"},
+                {"id": f"player_{i % players}", "type": "player"}
+            )
+            for i in range(conversations)
+        ]
+    conv_ids = timed("create", conversations, create_all)
+
+    total_messages = conversations * messages
+    def add_all():
+        for _ in range(messages):
+            for conv_id in conv_ids:
+                manager.add_message(conv_id, "npc", "Hello there, traveler!")
+    timed("add_message", total_messages, add_all)
+
+    if trace_memory:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    lookups = 100000
+    def lookup_all():
+        for _ in range(lookups):
+            manager.get_active_conversations(f"player_{rng.randrange(players)}")
+    timed("get_active_conversations", lookups, lookup_all)
+
+    def history_all():
+        for conv_id in conv_ids[:lookups]:
+            manager.get_history(conv_id, limit=5)
+    timed("get_history(limit=5)", min(lookups, conversations), history_all)
+
+    def cleanup_none():
+        return manager.cleanup_expired()
+    timed("cleanup_expired (none due)", 1, cleanup_none)
+
+    # Age half of the conversations so cleanup has work to do
+    stale = datetime.now() - manager.expiry_time - timedelta(seconds=1)
+    for conv_id in list(manager.conversations)[:conversations // 2]:
+        manager.conversations[conv_id].last_update = stale
+    removed = timed("cleanup_expired (half due)", conversations // 2, cleanup_none)
+
+    remaining = list(manager.conversations)
+    def end_all():
+        for conv_id in remaining:
+            manager.end_conversation(conv_id)
+    timed("end_conversation", len(remaining), end_all)
+
+    print()
+    print(f"Expired {removed} conversations, {len(manager.conversations)} remaining")
+    if trace_memory:
+        print(f"Memory after load: {current / 1e6:.1f} MB (peak {peak / 1e6:.1f} MB)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ConversationManagerV2")
+    parser.add_argument("--conversations", type=int, default=100000)
+    parser.add_argument("--messages", type=int, default=20, help="Messages added per conversation")
+    parser.add_argument("--max-messages", type=int, default=10, help="History cap per conversation")
+    parser.add_argument("--players", type=int, default=5000)
+    parser.add_argument("--trace-memory", action="store_true", help="Report memory (slows the timings)")
+    args = parser.parse_args()
+
+    # Per-conversation info logs would dominate the timings
+    logging.getLogger("roblox_app").setLevel(logging.WARNING)
+
+    print(f"{args.conversations} conversations, {args.messages} messages each "
+          f"(history cap {args.max_messages})\n")
+    run_benchmark(args.conversations, args.messages, args.max_messages, args.players, args.trace_memory)
+
+if __name__ == "__main__":
+    main()
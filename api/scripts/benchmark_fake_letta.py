@@ -0,0 +1,124 @@
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+# Add api directory to path
+api_dir = Path(__file__).parent.parent
+sys.path.append(str(api_dir))
+
+from app.clients import set_letta_client
+from app.fake_letta import FakeLetta, FakeLettaClient
+from app.group_blocks import empty_group_block
+
+def seed_agents(client: FakeLettaClient) -> dict:
+    """Load the default game's NPCs and give each a fake agent; returns npc_id -> name"""
+    from app.cache import NPC_CACHE, init_static_cache, set_agent_id
+    init_static_cache()
+    for name, npc in NPC_CACHE.items():
+        agent = client.agents.create(name=name, memory_blocks=[
+            {"label": "status", "value": json.dumps({"current_location": "unknown", "state": "Idle", "description": ""})},
+            {"label": "group_members", "value": json.dumps(empty_group_block())},
+            {"label": "locations", "value": json.dumps({"known_locations": []})}
+        ])
+        set_agent_id(npc['id'], agent.id)
+    return {npc['id']: name for name, npc in NPC_CACHE.items()}
+
+def make_snapshot(npc_names: list, players: int, rng: random.Random) -> dict:
+    """One snapshot where every NPC stands with a random handful of players"""
+    human_context = {}
+    for name in npc_names + [f"Player{i}" for i in range(players)]:
+        members = [name] + rng.sample([f"Player{i}" for i in range(players)], k=min(players, rng.randint(0, 3)))
+        human_context[name] = {
+            "position": {"x": rng.uniform(-100, 100), "y": 3, "z": rng.uniform(-100, 100)},
+            "health": {"current": rng.randint(50, 100), "max": 100, "isMoving": rng.random() < 0.5},
+            "currentGroups": {"members": members, "npcs": 1, "players": len(members) - 1, "formed": int(time.time())}
+        }
+    return {"timestamp": int(time.time()), "events": [], "clusters": [], "humanContext": human_context}
+
+async def run_load(label: str, send, total: int, concurrency: int):
+    """Fire ``total`` requests, ``concurrency`` at a time, and report latency"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one(i: int):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            ok = await send(i)
+            latencies.append(time.perf_counter() - start)
+            errors += 0 if ok else 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    elapsed = time.perf_counter() - start
+
+    cuts = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    print(
+        f"{label:<16} {total / elapsed:8.1f} req/s  p50 {cuts[49] * 1000:7.1f}ms  "
+        f"p95 {cuts[94] * 1000:7.1f}ms  p99 {cuts[98] * 1000:7.1f}ms  errors {errors}"
+    )
+
+async def main_async(args):
+    backend = FakeLetta(
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        error_rate=args.error_rate,
+        seed=args.seed
+    )
+    client = FakeLettaClient(backend)
+    set_letta_client(client)
+
+    from app.main import app
+    npcs = seed_agents(client)
+    if not npcs:
+        raise SystemExit("No NPCs in the default game; nothing to benchmark")
+    npc_ids = list(npcs)
+    rng = random.Random(args.seed)
+
+    # ASGITransport does not send lifespan events; run startup/shutdown ourselves
+    async with app.router.lifespan_context(app):
+        await app.state.warmup
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=120) as http:
+            async def chat(i: int) -> bool:
+                response = await http.post("/letta/v1/chat/v3", json={
+                    "npc_id": npc_ids[i % len(npc_ids)],
+                    "participant_id": f"player_{i % args.players}",
+                    "messages": [{"role": "user", "content": f"Hello #{i}", "name": f"Player{i % args.players}"}]
+                })
+                return response.status_code == 200 and not response.json().get("metadata", {}).get("error")
+
+            async def snapshot(i: int) -> bool:
+                response = await http.post("/letta/v1/snapshot/game", json=make_snapshot(list(npcs.values()), args.players, rng))
+                return response.status_code == 200
+
+            print(f"{len(npc_ids)} NPCs, fake Letta latency {args.latency_ms}ms, error rate {args.error_rate}")
+            if args.chats:
+                await run_load("/chat/v3", chat, args.chats, args.concurrency)
+            if args.snapshots:
+                await run_load("/snapshot/game", snapshot, args.snapshots, args.concurrency)
+
+    print(f"Letta calls: {json.dumps(backend.calls, sort_keys=True)}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /chat/v3 and /snapshot/game against a fake Letta")
+    parser.add_argument("--chats", type=int, default=500)
+    parser.add_argument("--snapshots", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--players", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    asyncio.run(main_async(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
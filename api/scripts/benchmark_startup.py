@@ -0,0 +1,79 @@
+import argparse
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import requests
+
+# Run everything from the api directory so `app` is importable
+api_dir = Path(__file__).parent.parent
+
+IMPORT_SNIPPET = (
+    "import time; start = time.perf_counter(); "
+    "import app.main; "
+    "print(time.perf_counter() - start)"
+)
+
+def measure_import(runs: int) -> list:
+    """Time `import app.main` in fresh interpreters"""
+    timings = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", IMPORT_SNIPPET],
+            cwd=api_dir, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            print(result.stderr)
+            raise SystemExit("Import failed")
+        timings.append(float(result.stdout.strip().splitlines()[-1]))
+    return timings
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def measure_first_request(runs: int, path: str, timeout: float) -> list:
+    """Time from launching uvicorn until `path` first answers 200"""
+    timings = []
+    for _ in range(runs):
+        port = free_port()
+        start = time.perf_counter()
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=api_dir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            while True:
+                if time.perf_counter() - start > timeout:
+                    raise SystemExit(f"Server did not answer {path} within {timeout}s")
+                try:
+                    if requests.get(f"http://127.0.0.1:{port}{path}", timeout=1).status_code == 200:
+                        break
+                except requests.RequestException:
+                    pass
+                time.sleep(0.02)
+            timings.append(time.perf_counter() - start)
+        finally:
+            server.terminate()
+            server.wait()
+    return timings
+
+def report(label: str, timings: list):
+    print(f"{label:<22} min {min(timings):6.3f}s  median {statistics.median(timings):6.3f}s  max {max(timings):6.3f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark API import time and time-to-first-request")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--path", default="/metrics", help="Endpoint polled for the first request")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    report("import app.main", measure_import(args.runs))
+    report(f"first {args.path}", measure_first_request(args.runs, args.path, args.timeout))
+
+if __name__ == "__main__":
+    main()
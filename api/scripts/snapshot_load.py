@@ -0,0 +1,185 @@
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+# Add api directory to path
+api_dir = Path(__file__).parent.parent
+sys.path.append(str(api_dir))
+
+from app.snapshot_generator import MOVEMENT_PATTERNS, SnapshotGenerator, synthetic_locations
+
+# Block writes and message sends are what a snapshot costs Letta
+LETTA_WRITES = ("blocks.update", "messages.create")
+
+def build_generator(args, npc_names: list) -> SnapshotGenerator:
+    if args.locations:
+        locations = synthetic_locations(args.locations, spread=args.spread, seed=args.seed)
+    else:
+        from app.cache import LOCATION_CACHE
+        locations = dict(LOCATION_CACHE) or synthetic_locations(10, spread=args.spread, seed=args.seed)
+    return SnapshotGenerator(
+        npc_names,
+        players=args.players,
+        locations=locations,
+        movement=args.movement,
+        group_radius=args.group_radius,
+        group_churn=args.churn,
+        speed=args.speed,
+        game_id=args.game_id,
+        seed=args.seed
+    )
+
+def load_snapshots(path: str) -> list:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+async def replay(post, snapshots: list, rate: float) -> dict:
+    """Open-loop replay: snapshot i is sent at i / rate seconds whether or not earlier ones returned"""
+    latencies = []
+    errors = 0
+
+    async def one(snapshot: dict):
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            ok = await post(snapshot)
+        except httpx.HTTPError:
+            ok = False
+        latencies.append(time.perf_counter() - start)
+        errors += 0 if ok else 1
+
+    start = time.perf_counter()
+    tasks = []
+    for i, snapshot in enumerate(snapshots):
+        delay = start + i / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.ensure_future(one(snapshot)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+
+    cuts = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        "snapshots": len(snapshots),
+        "elapsed": elapsed,
+        "throughput": len(snapshots) / elapsed,
+        "p50_ms": cuts[49] * 1000,
+        "p95_ms": cuts[94] * 1000,
+        "p99_ms": cuts[98] * 1000,
+        "errors": errors
+    }
+
+def report(result: dict, calls_before: dict, calls_after: dict):
+    calls = {op: calls_after.get(op, 0) - calls_before.get(op, 0) for op in calls_after}
+    writes = sum(calls.get(op, 0) for op in LETTA_WRITES)
+    print(
+        f"{result['snapshots']} snapshots in {result['elapsed']:.1f}s  {result['throughput']:.1f} snap/s  "
+        f"p50 {result['p50_ms']:.1f}ms  p95 {result['p95_ms']:.1f}ms  p99 {result['p99_ms']:.1f}ms  "
+        f"errors {result['errors']}"
+    )
+    if calls:
+        print(f"Letta writes: {writes} ({writes / max(result['snapshots'], 1):.1f} per snapshot)")
+        print(f"Letta calls: {json.dumps({op: n for op, n in calls.items() if n}, sort_keys=True)}")
+
+async def run_in_process(args):
+    """Replay against app.main in this process, with a fake Letta behind it"""
+    from app.clients import set_letta_client
+    from app.fake_letta import FakeLetta, FakeLettaClient
+    sys.path.append(str(Path(__file__).parent))
+    from benchmark_fake_letta import seed_agents
+
+    backend = FakeLetta(latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000, seed=args.seed)
+    client = FakeLettaClient(backend)
+    set_letta_client(client)
+
+    from app.main import app
+    npcs = seed_agents(client)
+    if not npcs:
+        raise SystemExit("No NPCs in the default game; nothing to replay")
+    snapshots = load_snapshots(args.replay) if args.replay else list(
+        build_generator(args, list(npcs.values())).stream(args.rate * args.duration)
+    )
+    if args.record:
+        record(args.record, snapshots)
+
+    print(f"{len(npcs)} NPCs, {args.players} players, {args.movement} movement, {args.rate}/s for {len(snapshots) / args.rate:.0f}s")
+    # ASGITransport does not send lifespan events; run startup/shutdown ourselves
+    async with app.router.lifespan_context(app):
+        await app.state.warmup
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://load", timeout=120) as http:
+            async def post(snapshot: dict) -> bool:
+                response = await http.post("/letta/v1/snapshot/game", json=snapshot)
+                return response.status_code == 200
+
+            before = dict(backend.calls)
+            result = await replay(post, snapshots, args.rate)
+            report(result, before, dict(backend.calls))
+
+async def run_remote(args):
+    """Replay against a running server; Letta calls are counted if it is a fake Letta"""
+    if args.replay:
+        snapshots = load_snapshots(args.replay)
+    else:
+        names = [f"NPC{i}" for i in range(args.npcs)]
+        if not args.npcs:
+            from app.cache import NPC_CACHE, init_static_cache
+            init_static_cache()
+            names = list(NPC_CACHE)
+        snapshots = list(build_generator(args, names).stream(args.rate * args.duration))
+    if args.record:
+        record(args.record, snapshots)
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=120) as http:
+        async def fake_letta_calls() -> dict:
+            if not args.fake_letta_url:
+                return {}
+            response = await http.get(f"{args.fake_letta_url.rstrip('/')}/fake/stats")
+            return response.json()["calls"]
+
+        async def post(snapshot: dict) -> bool:
+            response = await http.post("/letta/v1/snapshot/game", json=snapshot)
+            return response.status_code == 200
+
+        print(f"Replaying {len(snapshots)} snapshots to {args.url} at {args.rate}/s")
+        before = await fake_letta_calls()
+        result = await replay(post, snapshots, args.rate)
+        report(result, before, await fake_letta_calls())
+
+def record(path: str, snapshots: list):
+    with open(path, "w") as f:
+        for snapshot in snapshots:
+            f.write(json.dumps(snapshot) + "\n")
+    print(f"Recorded {len(snapshots)} snapshots to {path}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate or replay GameSnapshot streams against /letta/v1/snapshot/game")
+    parser.add_argument("--url", help="Server to replay against; runs app.main in process with a fake Letta if omitted")
+    parser.add_argument("--fake-letta-url", help="Fake Letta the remote server uses, to count Letta writes")
+    parser.add_argument("--rate", type=int, default=5, help="Snapshots per second")
+    parser.add_argument("--duration", type=int, default=30, help="Seconds of generated snapshots")
+    parser.add_argument("--npcs", type=int, default=0, help="Synthetic NPC count for remote runs (0 = default game's NPCs)")
+    parser.add_argument("--players", type=int, default=20)
+    parser.add_argument("--locations", type=int, default=0, help="Synthetic location count (0 = the game's locations)")
+    parser.add_argument("--spread", type=float, default=400.0)
+    parser.add_argument("--movement", choices=MOVEMENT_PATTERNS, default="commute")
+    parser.add_argument("--speed", type=float, default=8.0)
+    parser.add_argument("--group-radius", type=float, default=10.0)
+    parser.add_argument("--churn", type=float, default=0.0, help="Chance per entity per tick of jumping to another location")
+    parser.add_argument("--game-id", type=int)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--record", help="Write the snapshots to this JSONL file")
+    parser.add_argument("--replay", help="Replay snapshots from this JSONL file instead of generating them")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    asyncio.run(run_remote(args) if args.url else run_in_process(args))
+
+if __name__ == "__main__":
+    main()
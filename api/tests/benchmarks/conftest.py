@@ -0,0 +1,151 @@
+"""Performance baselines, run with pytest-benchmark
+
+Skipped in the normal test run. From api/:
+
+    python -m pytest tests/benchmarks --benchmark-only --benchmark-autosave
+    python -m pytest tests/benchmarks --benchmark-only --benchmark-compare --benchmark-compare-fail=mean:20%
+
+Results are stored under .benchmarks/ so later runs compare against them.
+Each benchmark runs against seeded synthetic databases; BENCHMARK_ROWS
+(default "1000,10000,100000") sets the asset counts. A database has one NPC
+per 10 assets and one location per 100.
+"""
+import json
+import os
+import random
+import sqlite3
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+import app.cache as cache
+import app.config as config
+import app.database as database
+
+BENCHMARK_DIR = Path(__file__).parent
+SIZES = [int(rows) for rows in os.getenv("BENCHMARK_ROWS", "1000,10000,100000").split(",")]
+GAME_ID = 1
+GAME_SLUG = "benchmark-game"
+
+SCHEMA = """
+    CREATE TABLE games (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        slug TEXT UNIQUE NOT NULL,
+        description TEXT
+    );
+    CREATE TABLE assets (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        asset_id TEXT NOT NULL,
+        name TEXT NOT NULL,
+        slug TEXT,
+        description TEXT,
+        image_url TEXT,
+        type TEXT,
+        tags TEXT DEFAULT '[]',
+        game_id INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        location_data TEXT,
+        is_location BOOLEAN DEFAULT 0,
+        position_x REAL,
+        position_y REAL,
+        position_z REAL,
+        aliases TEXT,
+        UNIQUE(asset_id, game_id)
+    );
+    CREATE TABLE npcs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        npc_id TEXT UNIQUE NOT NULL,
+        display_name TEXT NOT NULL,
+        asset_id TEXT NOT NULL,
+        model TEXT,
+        system_prompt TEXT,
+        response_radius INTEGER DEFAULT 20,
+        spawn_x REAL,
+        spawn_y REAL,
+        spawn_z REAL,
+        abilities TEXT,
+        enabled BOOLEAN DEFAULT 1,
+        game_id INTEGER
+    );
+    CREATE TABLE npc_agents (npc_id TEXT, participant_id TEXT, letta_agent_id TEXT);
+    CREATE INDEX idx_assets_game ON assets(game_id);
+    CREATE INDEX idx_npcs_game ON npcs(game_id);
+"""
+
+WORDS = ["red", "old", "tall", "quiet", "busy", "stone", "wooden", "shiny", "market", "garden", "tower", "harbor"]
+TYPES = ["Model", "NPC", "Vehicle", "Building", "Prop"]
+ABILITIES = ["move", "chat", "trade", "follow", "emote", "navigate"]
+
+def build_database(path: Path, rows: int, seed: int = 42):
+    """Assets, NPCs and locations for one game, the same for a given size and seed"""
+    rng = random.Random(seed)
+    words = lambda n: " ".join(rng.choice(WORDS) for _ in range(n))
+    locations = max(rows // 100, 1)
+    npcs = rows // 10
+
+    assets = []
+    for i in range(rows):
+        is_location = i < locations
+        assets.append((
+            f"asset-{i}", f"{words(2).title()} {i}", f"asset_{i}", words(12), f"/assets/{i}.png",
+            "Building" if is_location else rng.choice(TYPES), json.dumps([rng.choice(WORDS)]), GAME_ID,
+            json.dumps({"area": words(1), "type": "shop", "owner": "", "interactable": True, "tags": [words(1)]})
+            if is_location else None,
+            is_location,
+            round(rng.uniform(-500, 500), 3) if is_location else None,
+            3.0 if is_location else None,
+            round(rng.uniform(-500, 500), 3) if is_location else None,
+            json.dumps([words(1), words(1)]) if is_location else None
+        ))
+
+    db = sqlite3.connect(path)
+    db.executescript(SCHEMA)
+    db.execute("INSERT INTO games (id, title, slug, description) VALUES (?, ?, ?, ?)",
+               (GAME_ID, "Benchmark Game", GAME_SLUG, "Synthetic game for benchmarks"))
+    db.executemany("""
+        INSERT INTO assets (asset_id, name, slug, description, image_url, type, tags, game_id,
+                            location_data, is_location, position_x, position_y, position_z, aliases)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, assets)
+    db.executemany("""
+        INSERT INTO npcs (npc_id, display_name, asset_id, model, system_prompt, response_radius,
+                          spawn_x, spawn_y, spawn_z, abilities, enabled, game_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, [
+        (
+            f"npc-{i}", f"NPC {i}", f"asset-{locations + i}", f"asset-{locations + i}", words(30), 20,
+            round(rng.uniform(-500, 500), 3), 3.0, round(rng.uniform(-500, 500), 3),
+            json.dumps(rng.sample(ABILITIES, 3)), rng.random() < 0.9, GAME_ID
+        )
+        for i in range(npcs)
+    ])
+    db.commit()
+    db.close()
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("benchmark_only", default=False):
+        return
+    skip = pytest.mark.skip(reason="benchmark; run with --benchmark-only")
+    for item in items:
+        if BENCHMARK_DIR in Path(item.fspath).parents:
+            item.add_marker(skip)
+
+@pytest.fixture(scope="session", params=SIZES, ids=lambda rows: f"{rows}rows")
+def rows(request, tmp_path_factory) -> int:
+    path = tmp_path_factory.getbasetemp() / f"benchmark_{request.param}.db"
+    if not path.exists():
+        build_database(path, request.param)
+    return request.param
+
+@pytest.fixture
+def bench_db(rows, tmp_path_factory, tmp_path, monkeypatch):
+    """Point the app's database and games directory at the synthetic database"""
+    path = tmp_path_factory.getbasetemp() / f"benchmark_{rows}.db"
+    (tmp_path / "games" / GAME_SLUG / "src" / "data").mkdir(parents=True)
+    monkeypatch.setattr(database, "SQLITE_DB_PATH", path)
+    monkeypatch.setattr(config, "GAMES_DIR", tmp_path / "games")
+    monkeypatch.setattr(cache, "game_caches", cache.GameCacheRegistry(cache.GameCache(GAME_ID)))
+    monkeypatch.setattr(cache, "npc_directory", cache.NPCDirectory())
+    return SimpleNamespace(path=path, rows=rows, game_id=GAME_ID, slug=GAME_SLUG)
@@ -0,0 +1,40 @@
+import itertools
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from app.conversation_managerV2 import ConversationManagerV2
+
+@pytest.fixture
+def manager(rows):
+    """A manager holding one conversation per row, each with a few messages"""
+    manager = ConversationManagerV2(max_conversations=rows)
+    for i in range(rows):
+        conversation_id = manager.create_conversation(
+            "npc_user",
+            {"id": f"npc-{i % 100}", "type": "npc", "name": f"NPC {i % 100}"},
+            {"id": f"player-{i}", "type": "player", "name": f"Player {i}"}
+        )
+        for turn in range(3):
+            manager.add_message(conversation_id, f"player-{i}", f"Message {turn}")
+    return manager
+
+def test_create_conversation_at_capacity(benchmark, manager):
+    players = itertools.count()
+    benchmark(lambda: manager.create_conversation(
+        "npc_user",
+        {"id": "npc-0", "type": "npc", "name": "NPC 0"},
+        {"id": f"new-player-{next(players)}", "type": "player", "name": "New player"}
+    ))
+
+def test_add_message(benchmark, manager):
+    conversation_id = next(reversed(manager.conversations))
+    assert benchmark(manager.add_message, conversation_id, "npc-0", "Hello there")
+
+def test_get_active_conversations(benchmark, manager):
+    assert benchmark(manager.get_active_conversations, "npc-7")
+
+def test_get_conversation_context(benchmark, manager):
+    conversation_id = next(iter(manager.conversations))
+    assert benchmark(manager.get_conversation_context, conversation_id)
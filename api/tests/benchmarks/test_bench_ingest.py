@@ -0,0 +1,39 @@
+import json
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from app.models import GameSnapshot
+from app.shared_state import shared_state
+from app.snapshot_generator import SnapshotGenerator
+from app.snapshot_ingest import decode_snapshot, enrich_snapshot
+from app.snapshot_processor import SNAPSHOT_NAMESPACE, enrich_snapshot_with_context
+
+@pytest.fixture
+def body(bench_db):
+    """A 100-entity snapshot body, with the previous one already stored"""
+    import app.cache as cache
+    generator = SnapshotGenerator(
+        [f"NPC {i}" for i in range(50)], players=50, locations=cache.get_locations(bench_db.game_id),
+        group_radius=20, game_id=bench_db.game_id, seed=42
+    )
+    previous, current = generator.tick(), generator.tick()
+    yield json.dumps(previous).encode(), json.dumps(current).encode()
+    shared_state.delete(SNAPSHOT_NAMESPACE, str(bench_db.game_id))
+
+def after_previous(ingest, previous: bytes, current: bytes):
+    """Store the previous snapshot so each round diffs against the same state"""
+    ingest(previous)
+    return (current,), {}
+
+@pytest.mark.benchmark(group="snapshot_ingest")
+def test_ingest_pydantic(benchmark, body):
+    """FastAPI's path: parse to dicts, validate GameSnapshot, enrich, dump previous state"""
+    ingest = lambda raw: enrich_snapshot_with_context(GameSnapshot(**json.loads(raw)))
+    benchmark.pedantic(ingest, setup=lambda: after_previous(ingest, *body), rounds=50)
+
+@pytest.mark.benchmark(group="snapshot_ingest")
+def test_ingest_compact(benchmark, body):
+    ingest = lambda raw: enrich_snapshot(decode_snapshot(raw))
+    benchmark.pedantic(ingest, setup=lambda: after_previous(ingest, *body), rounds=50)
@@ -0,0 +1,21 @@
+import sqlite3
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from app.utils import format_npc_as_lua, save_lua_database
+
+@pytest.fixture
+def db(bench_db):
+    db = sqlite3.connect(bench_db.path)
+    db.row_factory = sqlite3.Row
+    yield db
+    db.close()
+
+def test_save_lua_database(benchmark, bench_db, db):
+    benchmark.pedantic(save_lua_database, args=(bench_db.slug, db), rounds=5)
+
+def test_format_npcs_as_lua(benchmark, bench_db, db):
+    npcs = [dict(npc) for npc in db.execute("SELECT * FROM npcs WHERE game_id = ? AND enabled = 1", (bench_db.game_id,))]
+    benchmark(lambda: [format_npc_as_lua(npc) for npc in npcs])
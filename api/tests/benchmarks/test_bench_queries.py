@@ -0,0 +1,38 @@
+import asyncio
+import zlib
+
+import numpy as np
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+import app.dashboard_router as dashboard_router
+from app.dashboard_router import list_assets, list_npcs, semantic_location_search
+
+EMBEDDING_DIMENSIONS = 1536
+
+def stub_embedding(text: str) -> list:
+    """Deterministic stand-in for the OpenAI embedding, the same size"""
+    return np.random.default_rng(zlib.crc32(text.encode())).standard_normal(EMBEDDING_DIMENSIONS).tolist()
+
+@pytest.fixture
+def run(bench_db):
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.close()
+
+def test_list_assets(benchmark, bench_db, run):
+    result = benchmark.pedantic(lambda: run(list_assets(game_id=bench_db.game_id)), rounds=5)
+    assert result["assets"]
+
+def test_list_npcs(benchmark, bench_db, run):
+    response = benchmark.pedantic(lambda: run(list_npcs(game_id=bench_db.game_id)), rounds=5)
+    assert response.status_code == 200
+
+def test_semantic_location_search(benchmark, bench_db, run, monkeypatch):
+    monkeypatch.setattr(dashboard_router, "get_embedding", stub_embedding)
+    result = benchmark.pedantic(
+        lambda: run(semantic_location_search(game_id=bench_db.game_id, query="the market", threshold=-1.0, limit=3)),
+        rounds=5
+    )
+    assert len(result["locations"]) == 3
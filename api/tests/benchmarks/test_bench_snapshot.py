@@ -0,0 +1,37 @@
+import copy
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+import app.cache as cache
+from app.models import GameSnapshot, PositionData
+from app.shared_state import shared_state
+from app.snapshot_generator import SnapshotGenerator
+from app.snapshot_processor import SNAPSHOT_NAMESPACE, enrich_snapshot_with_context
+
+@pytest.fixture
+def locations(bench_db):
+    return cache.get_locations(bench_db.game_id)
+
+def test_enrich_snapshot_100_entities(benchmark, bench_db, locations):
+    generator = SnapshotGenerator(
+        [f"NPC {i}" for i in range(50)], players=50, locations=locations, group_radius=20, game_id=bench_db.game_id, seed=42
+    )
+    generator.tick()
+    snapshot = generator.tick()
+    # Consecutive snapshots, so enrichment diffs against a previous state
+    enrich_snapshot_with_context(GameSnapshot(**copy.deepcopy(snapshot)))
+
+    try:
+        benchmark.pedantic(
+            enrich_snapshot_with_context,
+            setup=lambda: ((GameSnapshot(**copy.deepcopy(snapshot)),), {}),
+            rounds=50
+        )
+    finally:
+        shared_state.delete(SNAPSHOT_NAMESPACE, str(bench_db.game_id))
+
+def test_location_narrative(benchmark, locations):
+    position = PositionData(x=12.5, y=3.0, z=-40.25)
+    assert benchmark(position.get_location_narrative, locations)
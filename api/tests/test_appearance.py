@@ -0,0 +1,108 @@
+import pytest
+
+import app.appearance as appearance_module
+import app.cache as cache
+from app.appearance import AppearanceDirectory, PlayerNameCache, summarize_appearance
+from app.cache import NPCDirectory, NPCEntry, PlayerCache
+
+def test_summary_cuts_at_word_boundary():
+    assert summarize_appearance("Short hat", limit=20) == "Short hat"
+    assert summarize_appearance("A tall   knight\nin silver armor with a long red cape", limit=30) == "A tall knight in silver..."
+    assert summarize_appearance(None) == ""
+
+PLAYERS = {
+    "123": {"description": "green hoodie", "display_name": "greggytheegg"},
+    "456": {"description": "", "display_name": None}
+}
+
+@pytest.fixture
+def queries(monkeypatch):
+    """Player rows served by id and by display name, recording each query"""
+    calls = []
+
+    def by_id(player_ids):
+        calls.append(("id", list(player_ids)))
+        return {pid: dict(PLAYERS[pid]) for pid in player_ids if pid in PLAYERS}
+
+    def by_name(names):
+        calls.append(("name", list(names)))
+        return {
+            info["display_name"]: {"player_id": pid, **info}
+            for pid, info in PLAYERS.items() if info["display_name"] in names
+        }
+
+    monkeypatch.setattr(cache, "db_get_player_infos", by_id)
+    monkeypatch.setattr(appearance_module, "get_player_infos_by_name", by_name)
+    return calls
+
+@pytest.fixture
+def directory(monkeypatch, queries):
+    monkeypatch.setattr(cache, "npc_directory", NPCDirectory([
+        NPCEntry("npc-a", 1, "Pete", "asset-1", "agent-a", "red hat"),
+        NPCEntry("npc-b", 2, "Pete", "asset-1", "agent-b", "blue hat")
+    ], 1))
+    return AppearanceDirectory(PlayerCache(max_size=10), PlayerNameCache(max_size=10))
+
+def test_npcs_by_name_per_game_and_by_id(directory):
+    assert directory.summary("Pete") == "red hat"
+    assert directory.summary("Pete", 2) == "blue hat"
+    assert directory.summary("npc-b") == "blue hat"
+
+def test_players_by_id_and_display_name(directory):
+    assert directory.summary("123") == "green hoodie"
+    assert directory.summary("greggytheegg") == "green hoodie"
+    assert directory.summary("456", default="Unknown") == "Unknown"
+    assert directory.summary("nobody", default="Unknown") == "Unknown"
+
+def test_new_player_description_is_visible(directory):
+    directory.set_player("789", "purple wizard hat", "Merlin")
+    assert directory.summary("Merlin") == "purple wizard hat"
+    assert directory.get("789").description == "purple wizard hat"
+
+def test_npc_appearances_follow_directory_rebuilds(directory, monkeypatch):
+    assert directory.summary("Pete") == "red hat"
+    monkeypatch.setattr(cache, "npc_directory", NPCDirectory([
+        NPCEntry("npc-a", 1, "Pete", "asset-1", "agent-a", "green hat")
+    ], 1))
+    assert directory.summary("Pete") == "green hat"
+    assert directory.summary("Pete", 2) == ""
+
+def test_player_lookups_are_cached(directory, queries):
+    assert directory.summary("greggytheegg") == "green hoodie"
+    assert directory.summary("greggytheegg") == "green hoodie"
+    assert directory.summary("Pete") == "red hat"
+    assert queries == [("id", ["greggytheegg"]), ("name", ["greggytheegg"])]
+
+def test_prefetch_batches_players_and_skips_npcs(directory, queries):
+    directory.prefetch(["Pete", "123", "greggytheegg", "nobody"])
+    assert queries == [("id", ["123", "greggytheegg", "nobody"]), ("name", ["greggytheegg", "nobody"])]
+
+    del queries[:]
+    assert directory.summary("greggytheegg") == "green hoodie"
+    assert directory.summary("nobody", default="Unknown") == "Unknown"
+    assert queries == []
+
+def test_renamed_player_loses_old_name(directory):
+    assert directory.summary("greggytheegg") == "green hoodie"
+    directory.set_player("123", "green hoodie", "eggbert")
+
+    assert directory.summary("eggbert") == "green hoodie"
+    assert directory.summary("greggytheegg", default="Unknown") == "Unknown"
+
+def test_player_storage_is_bounded(queries):
+    directory = AppearanceDirectory(PlayerCache(max_size=2), PlayerNameCache(max_size=2))
+    for i in range(5):
+        directory.set_player(f"p{i}", f"outfit {i}", f"Player{i}")
+    assert directory.stats()["players"] == 2
+    assert directory.stats()["player_names"] == 2
+
+def test_cached_summary_never_queries(directory, queries):
+    assert directory.cached_summary("Pete") == "red hat"
+    assert directory.cached_summary("greggytheegg", default="Unknown") == "Unknown"
+    assert queries == []
+
+    directory.prefetch(["123", "greggytheegg"])
+    del queries[:]
+    assert directory.cached_summary("123") == "green hoodie"
+    assert directory.cached_summary("greggytheegg") == "green hoodie"
+    assert queries == []
@@ -0,0 +1,168 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.chat_dispatcher import ChatDispatcher, AgentQueueFull, greeting_dedupe_key
+from app.fake_letta import FakeLetta, FakeLettaClient
+from app.resilience import LettaResilience
+
+GREETING = [{"role": "system", "content": "Player1 has entered your range", "name": "SYSTEM"}]
+
+@pytest.mark.asyncio
+async def test_same_agent_requests_are_serialized():
+    dispatcher = ChatDispatcher()
+    active = []
+    overlaps = []
+    lock = threading.Lock()
+
+    def call():
+        with lock:
+            active.append(1)
+            overlaps.append(len(active))
+        time.sleep(0.05)
+        with lock:
+            active.pop()
+        return "ok"
+
+    results = await asyncio.gather(*[dispatcher.submit("agent-1", call) for _ in range(3)])
+
+    assert results == ["ok", "ok", "ok"]
+    assert max(overlaps) == 1
+    assert dispatcher.get_stats()["agent-1"]["total_requests"] == 3
+
+@pytest.mark.asyncio
+async def test_different_agents_run_in_parallel():
+    dispatcher = ChatDispatcher()
+
+    started = time.monotonic()
+    await asyncio.gather(*[
+        dispatcher.submit(f"agent-{i}", time.sleep, 0.2) for i in range(4)
+    ])
+
+    assert time.monotonic() - started < 0.6
+
+@pytest.mark.asyncio
+async def test_duplicate_greetings_are_collapsed():
+    dispatcher = ChatDispatcher()
+    calls = []
+
+    def call():
+        calls.append(1)
+        time.sleep(0.05)
+        return {"message": "Hello!"}
+
+    key = greeting_dedupe_key(GREETING)
+    results = await asyncio.gather(*[
+        dispatcher.submit("agent-1", call, dedupe_key=key) for _ in range(3)
+    ])
+
+    assert len(calls) == 1
+    assert all(r == {"message": "Hello!"} for r in results)
+    assert dispatcher.get_stats()["agent-1"]["collapsed_requests"] == 2
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_requests():
+    dispatcher = ChatDispatcher(max_queue_per_agent=1)
+
+    first = asyncio.create_task(dispatcher.submit("agent-1", time.sleep, 0.1))
+    second = asyncio.create_task(dispatcher.submit("agent-1", time.sleep, 0.1))
+    await asyncio.sleep(0.01)
+
+    assert dispatcher.get_stats()["agent-1"]["queue_depth"] == 1
+    with pytest.raises(AgentQueueFull):
+        await dispatcher.submit("agent-1", time.sleep, 0.1)
+
+    await asyncio.gather(first, second)
+    assert dispatcher.get_stats()["agent-1"]["rejected_requests"] == 1
+
+@pytest.mark.asyncio
+async def test_coroutine_functions_are_awaited():
+    dispatcher = ChatDispatcher()
+
+    async def call(value):
+        await asyncio.sleep(0)
+        return value
+
+    assert await dispatcher.submit("agent-1", call, "ok") == "ok"
+
+@pytest.mark.asyncio
+async def test_collapsed_request_survives_leader_cancellation():
+    dispatcher = ChatDispatcher()
+    key = greeting_dedupe_key(GREETING)
+
+    async def call():
+        await asyncio.sleep(0.05)
+        return "Hello!"
+
+    leader = asyncio.create_task(dispatcher.submit("agent-1", call, dedupe_key=key))
+    follower = asyncio.create_task(dispatcher.submit("agent-1", call, dedupe_key=key))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+
+    assert await follower == "Hello!"
+    assert leader.cancelled()
+
+@pytest.mark.asyncio
+async def test_cancelled_queued_request_frees_its_place():
+    dispatcher = ChatDispatcher(max_queue_per_agent=1)
+
+    first = asyncio.create_task(dispatcher.submit("agent-1", time.sleep, 0.05))
+    queued = asyncio.create_task(dispatcher.submit("agent-1", time.sleep, 0.05))
+    await asyncio.sleep(0.01)
+    queued.cancel()
+    await asyncio.sleep(0.01)
+
+    assert await dispatcher.submit("agent-1", time.sleep, 0) is None
+    await first
+    assert dispatcher.get_stats()["agent-1"]["queue_depth"] == 0
+
+@pytest.mark.asyncio
+async def test_idle_lanes_are_dropped():
+    dispatcher = ChatDispatcher(idle_seconds=0)
+
+    await asyncio.gather(*[dispatcher.submit(f"agent-{i}", time.sleep, 0) for i in range(3)])
+
+    assert dispatcher.get_stats() == {}
+
+@pytest.mark.asyncio
+async def test_timed_out_chat_keeps_the_agent_lane():
+    client = FakeLettaClient(FakeLetta(latency=0.15, tool_call_every=0))
+    agent = client.agents.create(name="Pete")
+    resilience = LettaResilience(timeouts={"messages.create": 0.02})
+    dispatcher = ChatDispatcher()
+    active = []
+    overlaps = []
+    lock = threading.Lock()
+
+    def create(**request):
+        with lock:
+            active.append(1)
+            overlaps.append(len(active))
+        try:
+            return client.agents.messages.create(**request)
+        finally:
+            with lock:
+                active.pop()
+
+    async def guarded(**request):
+        # How the router wires messages.create through the dispatcher
+        return await resilience.call("messages.create", create, drain=True, **request)
+
+    async def chat():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(
+                dispatcher.submit(agent.id, guarded, agent_id=agent.id, messages=[{"role": "user", "content": "hi"}]),
+                2.0
+            )
+
+    await asyncio.gather(*[chat() for _ in range(3)])
+
+    assert overlaps == [1, 1, 1]
+    assert resilience.stats()["timeouts"] == {"messages.create": 3}
+
+def test_greeting_key_only_for_pure_greetings():
+    mixed = GREETING + [{"role": "user", "content": "hi", "name": "Player1"}]
+    assert greeting_dedupe_key(GREETING) is not None
+    assert greeting_dedupe_key(mixed) is None
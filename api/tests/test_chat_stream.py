@@ -0,0 +1,103 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("letta_templates")
+
+from app.main import app  # Loads letta_router, which imports from main
+from app import letta_router
+from app.chat_dispatcher import chat_dispatcher
+from app.clients import set_letta_client
+from app.fake_letta import FakeLetta, FakeLettaClient
+from app.letta_router import ChatRequest, _stream_npc_chat, tool_call_to_action
+
+MARKET = {"x": 10, "y": 3, "z": -4}
+
+@pytest.fixture
+def agent_id(monkeypatch):
+    client = FakeLettaClient(FakeLetta(tool_call_every=1))
+    set_letta_client(client)
+    agent = client.agents.create(name="Pete")
+
+    async def get_or_create_agent_id(npc_id):
+        return agent.id
+
+    monkeypatch.setattr(letta_router, "get_or_create_agent_id", get_or_create_agent_id)
+    monkeypatch.setattr(letta_router, "get_coordinates_for_slug", lambda slug, game_id=None: MARKET if slug == "market" else None)
+    yield agent.id
+    set_letta_client(None)
+
+def chat_request(content="hi"):
+    return ChatRequest(npc_id="npc-1", participant_id="player-1", messages=[{"role": "user", "content": content, "name": "Player1"}])
+
+async def collect(request):
+    return [json.loads(line) async for line in _stream_npc_chat(request)]
+
+@pytest.mark.asyncio
+async def test_stream_event_order(agent_id):
+    events = await collect(chat_request())
+
+    types = [event["type"] for event in events]
+    assert types[0] == "tool_call"
+    assert types[1] == "action"
+    assert set(types[2:-1]) == {"text"}
+    assert types[-1] == "done"
+
+    done = events[-1]
+    assert done["message"] == "".join(event["content"] for event in events if event["type"] == "text")
+    assert done["message"] == "Pete says hello! (reply 1)"
+
+@pytest.mark.asyncio
+async def test_stream_accumulates_tool_arguments(agent_id):
+    events = await collect(chat_request())
+
+    action = next(event["action"] for event in events if event["type"] == "action")
+    assert action == {"type": "navigate", "data": {"coordinates": MARKET}, "message": "Moving to market..."}
+
+    done = events[-1]
+    tool_call = done["metadata"]["tool_calls"][0]
+    assert tool_call["tool"] == "navigate_to"
+    assert tool_call["args"] == {"destination_slug": "market"}
+    assert done["action"] == {"actions": [action]}
+
+@pytest.mark.asyncio
+async def test_disconnect_closes_the_letta_stream(agent_id, monkeypatch):
+    closed = []
+
+    class Stream:
+        def __iter__(self):
+            yield SimpleNamespace(message_type="assistant_message", content="Hello")
+            yield SimpleNamespace(message_type="assistant_message", content=" again")
+
+        def close(self):
+            closed.append(True)
+
+    monkeypatch.setattr(letta_router, "open_agent_stream", lambda **_: Stream())
+
+    events = _stream_npc_chat(chat_request())
+    assert json.loads(await events.__anext__()) == {"type": "text", "content": "Hello"}
+    # What Starlette does when the client goes away
+    await events.aclose()
+
+    assert closed
+    assert not chat_dispatcher.get_stats()[agent_id]["in_flight"]
+
+def test_perform_action_uses_roblox_format():
+    roblox_format = {"type": "emote", "data": {"emote": "wave"}, "message": "Waving"}
+    tool_call = {"id": "call-1", "tool": "perform_action", "tool_return": json.dumps({"roblox_format": roblox_format})}
+
+    assert tool_call_to_action(tool_call) == roblox_format
+
+def test_perform_action_falls_back_to_tool_results():
+    roblox_format = {"type": "follow", "data": {"target": "Player1"}, "message": "Following"}
+    tool_call = {"id": "call-1", "tool": "perform_action"}
+    results = [{"tool_call": {"id": "call-1"}, "result": json.dumps({"roblox_format": roblox_format})}]
+
+    assert tool_call_to_action(tool_call, results) == roblox_format
+    assert tool_call_to_action(tool_call, []) is None
+
+def test_navigate_to_unknown_slug_has_no_action(monkeypatch):
+    monkeypatch.setattr(letta_router, "get_coordinates_for_slug", lambda slug, game_id=None: None)
+
+    assert tool_call_to_action({"id": "call-1", "tool": "navigate_to", "args": {"destination_slug": "nowhere"}}) is None
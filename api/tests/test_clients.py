@@ -0,0 +1,18 @@
+from app import clients
+
+def test_openai_client_is_created_once(monkeypatch):
+    monkeypatch.setattr(clients, "OPENAI_API_KEY", "test_key")
+    clients.set_openai_client(None)
+    try:
+        first = clients.get_openai_client()
+        assert clients.get_openai_client() is first
+    finally:
+        clients.set_openai_client(None)
+
+def test_clients_can_be_replaced():
+    fake = object()
+    clients.set_letta_client(fake)
+    try:
+        assert clients.get_letta_client() is fake
+    finally:
+        clients.set_letta_client(None)
@@ -0,0 +1,147 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.ai_handler import AIHandler
+from app.concurrency import AdaptiveConcurrencyLimiter, ConcurrencyLimitExceeded, SingleFlight
+
+def make_completion(message: str):
+    """Build a minimal chat completion object"""
+    content = json.dumps({"message": message, "action": {"type": "none"}})
+    return SimpleNamespace(choices=[
+        SimpleNamespace(
+            message=SimpleNamespace(content=content, refusal=None),
+            finish_reason="stop"
+        )
+    ])
+
+@pytest.mark.asyncio
+async def test_limit_grows_on_fast_success():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=4)
+    for _ in range(20):
+        async with limiter.slot():
+            pass
+    assert limiter.get_metrics()["limit"] == 4
+
+@pytest.mark.asyncio
+async def test_limit_backs_off_once_per_cooldown():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=8, decrease_cooldown=60)
+    for _ in range(3):
+        async with limiter.slot() as slot:
+            slot.overloaded = True
+    metrics = limiter.get_metrics()
+    assert metrics["limit"] == 4
+    assert metrics["overloaded_requests"] == 3
+
+@pytest.mark.asyncio
+async def test_queue_depth_and_shedding():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=1, max_queue_depth=1)
+    release = asyncio.Event()
+
+    async def hold():
+        async with limiter.slot():
+            await release.wait()
+
+    holder = asyncio.create_task(hold())
+    waiter = asyncio.create_task(hold())
+    await asyncio.sleep(0.01)
+
+    assert limiter.get_metrics()["queue_depth"] == 1
+    with pytest.raises(ConcurrencyLimitExceeded):
+        await limiter.acquire()
+
+    release.set()
+    await asyncio.gather(holder, waiter)
+    assert limiter.get_metrics()["queue_depth"] == 0
+    assert limiter.get_metrics()["shed_requests"] == 1
+
+@pytest.mark.asyncio
+async def test_parallel_responses_return_partial_results():
+    handler = AIHandler(api_key="test_key")
+
+    def fake_create(**kwargs):
+        delay = 1.0 if "slow" in kwargs["messages"][-1]["content"] else 0.01
+        time.sleep(delay)
+        return make_completion("done")
+
+    handler.client = SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(create=fake_create))
+    )
+
+    requests = [
+        {"messages": [{"role": "user", "content": "fast"}], "system_prompt": "npc"},
+        {"messages": [{"role": "user", "content": "slow"}], "system_prompt": "npc"},
+    ]
+    started = time.monotonic()
+    responses = await handler.process_parallel_responses(requests, timeout=0.5)
+
+    assert time.monotonic() - started < 0.9
+    assert responses[0].message == "done"
+    assert responses[1].internal_state.get("timed_out") is True
+
+@pytest.mark.asyncio
+async def test_single_flight_runs_once_per_key():
+    flight = SingleFlight()
+    calls = []
+
+    def create(npc_id):
+        calls.append(npc_id)
+        time.sleep(0.05)
+        return f"agent-{npc_id}"
+
+    results = await asyncio.gather(*[flight.do("npc-1", create, "npc-1") for _ in range(5)])
+
+    assert results == ["agent-npc-1"] * 5
+    assert calls == ["npc-1"]
+    assert flight.in_flight() == 0
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_errors_then_retries():
+    flight = SingleFlight()
+
+    def fail():
+        time.sleep(0.02)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(
+        flight.do("npc-1", fail), flight.do("npc-1", fail), return_exceptions=True
+    )
+    assert all(isinstance(r, ValueError) for r in results)
+    assert await flight.do("npc-1", lambda: "ok") == "ok"
+
+@pytest.mark.asyncio
+async def test_timed_out_call_holds_its_slot_until_the_thread_returns():
+    handler = AIHandler(api_key="test_key")
+
+    def fake_create(**kwargs):
+        time.sleep(0.3)
+        return make_completion("late")
+
+    handler.client = SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(create=fake_create))
+    )
+
+    response = await handler.get_response([{"role": "user", "content": "hi"}], "npc", timeout=0.05)
+
+    assert response.internal_state.get("timed_out") is True
+    assert handler.limiter.in_flight == 1
+    await asyncio.sleep(0.4)
+    assert handler.limiter.in_flight == 0
+    assert handler.limiter.overloaded_requests == 1
+
+@pytest.mark.asyncio
+async def test_explicit_zero_timeout_is_not_the_default():
+    handler = AIHandler(api_key="test_key", request_timeout=5.0)
+    handler.client = SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(create=lambda **kwargs: time.sleep(0.2) or make_completion("late")))
+    )
+
+    started = time.monotonic()
+    response = await handler.get_response([{"role": "user", "content": "hi"}], "npc", timeout=0)
+
+    assert response.internal_state.get("timed_out") is True
+    assert time.monotonic() - started < 0.15
+    await asyncio.sleep(0.3)
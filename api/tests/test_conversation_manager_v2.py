@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+
+from app.conversation_managerV2 import ConversationManagerV2
+
+def start(manager, npc_id="npc1", player_id="player1"):
+    return manager.create_conversation(
+        "npc_user",
+        {"id": npc_id, "type": "npc", "name": npc_id},
+        {"id": player_id, "type": "player", "name": player_id}
+    )
+
+def test_history_is_capped():
+    manager = ConversationManagerV2(max_messages=3)
+    conv_id = start(manager)
+
+    for i in range(5):
+        manager.add_message(conv_id, "npc1", f"msg {i}")
+
+    assert manager.get_history(conv_id) == ["msg 2", "msg 3", "msg 4"]
+    assert manager.get_history(conv_id, limit=2) == ["msg 3", "msg 4"]
+
+def test_participant_index_is_cleaned_up():
+    manager = ConversationManagerV2()
+    first = start(manager, player_id="player1")
+    second = start(manager, player_id="player2")
+
+    assert set(manager.get_active_conversations("npc1")) == {first, second}
+
+    manager.end_conversation(first)
+    assert manager.get_active_conversations("npc1") == [second]
+    assert "player1" not in manager.participant_conversations
+
+def test_cleanup_only_removes_idle_conversations():
+    manager = ConversationManagerV2()
+    idle = start(manager, player_id="player1")
+    active = start(manager, player_id="player2")
+
+    manager.conversations[idle].last_update = datetime.now() - timedelta(minutes=31)
+    manager.conversations[active].last_update = datetime.now() - timedelta(minutes=31)
+    manager.add_message(active, "npc1", "still here")
+
+    assert manager.cleanup_expired() == 1
+    assert list(manager.conversations) == [active]
+
+def test_least_recently_active_conversation_is_evicted():
+    manager = ConversationManagerV2(max_conversations=2)
+    first = start(manager, player_id="player1")
+    second = start(manager, player_id="player2")
+    manager.add_message(first, "player1", "hi")
+
+    third = start(manager, player_id="player3")
+
+    assert set(manager.conversations) == {first, third}
+    assert second not in manager.get_active_conversations("npc1")
+    assert manager.evicted_conversations == 1
@@ -0,0 +1,95 @@
+import json
+import socket
+import threading
+import time
+
+import pytest
+import uvicorn
+
+from app.fake_letta import FakeLetta, FakeLettaClient, FakeLettaError, create_fake_letta_app
+
+def test_blocks_round_trip():
+    client = FakeLettaClient()
+    agent = client.agents.create(name="Pete", memory_blocks=[{"label": "status", "value": "idle"}])
+
+    assert client.agents.blocks.retrieve("status", agent_id=agent.id).value == "idle"
+    client.agents.blocks.update("status", agent_id=agent.id, value="walking")
+    assert client.agents.core_memory.retrieve_block(agent.id, "status").value == "walking"
+
+def test_every_third_reply_calls_a_tool():
+    client = FakeLettaClient(FakeLetta(tool_call_every=3))
+    agent = client.agents.create(name="Pete")
+
+    replies = [client.agents.messages.create(agent.id, messages=[{"role": "user", "content": "hi"}]) for _ in range(3)]
+
+    assert [m.message_type for m in replies[0].messages] == ["reasoning_message", "assistant_message"]
+    tool_calls = [m for m in replies[2].messages if m.message_type == "tool_call_message"]
+    assert tool_calls[0].tool_call.name == "navigate_to"
+    assert "Pete" in replies[2].messages[-1].content
+
+def test_stream_splits_text_and_tool_arguments():
+    client = FakeLettaClient(FakeLetta(tool_call_every=1))
+    agent = client.agents.create(name="Pete")
+
+    stream = client.agents.messages.create_stream(agent.id, messages=[{"role": "user", "content": "hi"}], stream_tokens=True)
+    chunks = list(stream)
+
+    tool_chunks = [c for c in chunks if c.message_type == "tool_call_message"]
+    assert len(tool_chunks) == 2
+    assert json.loads("".join(c.tool_call.arguments for c in tool_chunks)) == {"destination_slug": "market"}
+    text = "".join(c.content for c in chunks if c.message_type == "assistant_message")
+    assert text == "Pete says hello! (reply 1)"
+    assert chunks[-2].message_type == "stop_reason"
+
+def test_injected_latency_and_errors():
+    backend = FakeLetta(latency=0.05)
+    client = FakeLettaClient(backend)
+    agent = client.agents.create(name="Pete", memory_blocks=[{"label": "status", "value": "idle"}])
+
+    start = time.monotonic()
+    client.agents.blocks.retrieve("status", agent_id=agent.id)
+    assert time.monotonic() - start >= 0.05
+
+    backend.latency = 0
+    backend.error_rate = 1.0
+    with pytest.raises(FakeLettaError):
+        client.agents.blocks.retrieve("status", agent_id=agent.id)
+    assert backend.calls["blocks.retrieve"] == 2
+
+def test_unknown_agent_is_not_found():
+    client = FakeLettaClient()
+    with pytest.raises(FakeLettaError) as error:
+        client.agents.messages.create("agent-missing", messages=[])
+    assert error.value.status_code == 404
+
+@pytest.fixture
+def fake_server():
+    backend = FakeLetta()
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(create_fake_letta_app(backend), host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    yield backend, f"http://127.0.0.1:{port}"
+    server.should_exit = True
+    thread.join()
+
+def test_letta_client_talks_to_http_fake(fake_server):
+    letta_client = pytest.importorskip("letta_client")
+    backend, base_url = fake_server
+    client = letta_client.Letta(base_url=base_url, max_retries=0)
+
+    agent = client.agents.create(name="Pete", memory_blocks=[{"label": "status", "value": "idle"}])
+    client.agents.blocks.update("status", agent_id=agent.id, value="walking")
+    assert client.agents.blocks.retrieve("status", agent_id=agent.id).value == "walking"
+
+    response = client.agents.messages.create(agent.id, messages=[{"role": "user", "content": "hi"}])
+    assert response.messages[-1].message_type == "assistant_message"
+    assert [a.id for a in client.agents.list()] == [agent.id]
+
+    backend.error_rate = 1.0
+    with pytest.raises(letta_client.InternalServerError):
+        client.agents.blocks.retrieve("status", agent_id=agent.id)
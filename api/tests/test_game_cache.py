@@ -0,0 +1,271 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import pytest
+
+import app.cache as cache
+from app.cache import AGENT_ID_CACHE, CacheChange, GameCache, GameCacheRegistry, NPCEntry, publish_change
+from app.cache_poller import CacheChangePoller
+
+@pytest.fixture
+def game_db(tmp_path, monkeypatch):
+    """Two games with an NPC of the same name and their own locations"""
+    path = tmp_path / "games.db"
+    db = sqlite3.connect(path)
+    db.executescript("""
+        CREATE TABLE npcs (npc_id TEXT, display_name TEXT, system_prompt TEXT, asset_id TEXT, game_id INTEGER);
+        CREATE TABLE assets (asset_id TEXT, name TEXT, slug TEXT, description TEXT, is_location INTEGER,
+                             position_x REAL, position_y REAL, position_z REAL, game_id INTEGER);
+        CREATE TABLE npc_agents (npc_id TEXT, participant_id TEXT, letta_agent_id TEXT);
+
+        INSERT INTO npcs VALUES ('npc-a', 'Pete', 'prompt a', 'asset-1', 1);
+        INSERT INTO npcs VALUES ('npc-b', 'Pete', 'prompt b', 'asset-1', 2);
+        INSERT INTO assets VALUES ('asset-1', 'Pete', NULL, 'red hat', 0, NULL, NULL, NULL, 1);
+        INSERT INTO assets VALUES ('asset-1', 'Pete', NULL, 'blue hat', 0, NULL, NULL, NULL, 2);
+        INSERT INTO assets VALUES ('loc-1', 'Stand', 'stand', NULL, 1, 1, 2, 3, 1);
+        INSERT INTO assets VALUES ('loc-2', 'Beach', 'beach', NULL, 1, 4, 5, 6, 2);
+        INSERT INTO npc_agents VALUES ('npc-a', 'letta_v3', 'agent-a');
+        INSERT INTO npc_agents VALUES ('npc-b', 'letta_v3', 'agent-b');
+    """)
+    db.commit()
+    db.close()
+
+    @contextmanager
+    def get_db():
+        conn = sqlite3.connect(path)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    monkeypatch.setattr(cache, "get_db", get_db)
+    monkeypatch.setattr(cache, "npc_directory", cache.NPCDirectory())
+    yield path
+    AGENT_ID_CACHE.pop("npc-a", None)
+    AGENT_ID_CACHE.pop("npc-b", None)
+
+def test_games_are_namespaced(game_db):
+    registry = GameCacheRegistry(GameCache(1))
+    registry.default.load()
+
+    other = registry.get(2)
+    assert registry.get().npcs["Pete"]["description"] == "red hat"
+    assert other.npcs["Pete"] == {"id": "npc-b", "system_prompt": "prompt b", "description": "blue hat"}
+    assert list(other.locations) == ["beach"]
+    assert AGENT_ID_CACHE["npc-a"] == "agent-a"
+    assert AGENT_ID_CACHE["npc-b"] == "agent-b"
+
+def test_games_load_once_on_first_use(game_db):
+    registry = GameCacheRegistry(GameCache(1))
+
+    assert registry.peek(2) is None
+    first = registry.get(2)
+    assert registry.get(2) is first
+    assert registry.loads == 1
+
+def test_lru_eviction_keeps_default_game(game_db):
+    registry = GameCacheRegistry(GameCache(99), max_games=1)
+
+    registry.get(1)
+    registry.get(2)
+
+    assert registry.peek(1) is None
+    assert registry.peek(99) is registry.default
+    assert registry.evictions == 1
+    assert "npc-a" not in AGENT_ID_CACHE
+    assert AGENT_ID_CACHE["npc-b"] == "agent-b"
+
+def test_idle_games_are_evicted(game_db):
+    registry = GameCacheRegistry(GameCache(99), idle_seconds=60)
+    registry.get(2).last_used -= 120
+
+    assert registry.evict_idle() == 1
+    assert registry.stats()["games_cached"] == [99]
+
+@pytest.fixture
+def registry(game_db, monkeypatch):
+    registry = GameCacheRegistry(GameCache(1))
+    registry.default.load()
+    monkeypatch.setattr(cache, "game_caches", registry)
+    return registry
+
+def execute(path, sql, *params):
+    db = sqlite3.connect(path)
+    db.execute(sql, params)
+    db.commit()
+    db.close()
+
+def test_npc_change_updates_only_that_entry(game_db, registry):
+    execute(game_db, "UPDATE npcs SET display_name = 'Peter' WHERE npc_id = 'npc-a'")
+    publish_change(CacheChange("npcs", "npc-a", 1))
+
+    assert list(registry.default.npcs) == ["Peter"]
+    assert AGENT_ID_CACHE["npc-a"] == "agent-a"
+
+    execute(game_db, "DELETE FROM npcs WHERE npc_id = 'npc-a'")
+    publish_change(CacheChange("npcs", "npc-a", 1))
+
+    assert registry.default.npcs == {}
+    assert "npc-a" not in AGENT_ID_CACHE
+
+def test_asset_change_updates_location_and_npc_description(game_db, registry):
+    execute(game_db, "UPDATE assets SET description = 'green hat' WHERE asset_id = 'asset-1' AND game_id = 1")
+    execute(game_db, "UPDATE assets SET slug = 'pete_stand', position_x = 9 WHERE asset_id = 'loc-1'")
+    publish_change(CacheChange("assets", "asset-1", 1))
+    publish_change(CacheChange("assets", "loc-1", 1))
+
+    assert registry.default.npcs["Pete"]["description"] == "green hat"
+    assert registry.default.locations == {"pete_stand": {"name": "Stand", "coordinates": [9.0, 2.0, 3.0]}}
+
+def test_changes_to_uncached_games_are_ignored(game_db, registry):
+    publish_change(CacheChange("npcs", "npc-b", 2))
+
+    assert registry.peek(2) is None
+    assert "npc-b" not in AGENT_ID_CACHE
+
+def test_listeners_run_after_change(game_db, registry, monkeypatch):
+    seen = []
+    monkeypatch.setattr(cache, "change_listeners", [seen.append])
+
+    publish_change(CacheChange("npcs", "npc-a", 1))
+
+    assert seen == [CacheChange("npcs", "npc-a", 1)]
+
+def test_poller_applies_changes_from_other_connections(game_db, registry):
+    poller = CacheChangePoller(db_path=game_db)
+    poller.open()
+    assert poller.poll() == 0
+
+    execute(game_db, "UPDATE npcs SET system_prompt = 'new prompt' WHERE npc_id = 'npc-a'")
+    execute(game_db, "UPDATE npcs SET system_prompt = 'newer prompt' WHERE npc_id = 'npc-a'")
+    execute(game_db, "UPDATE npc_agents SET letta_agent_id = 'agent-a2' WHERE npc_id = 'npc-a'")
+
+    assert poller.poll() == 2
+    assert registry.default.npcs["Pete"]["system_prompt"] == "newer prompt"
+    assert AGENT_ID_CACHE["npc-a"] == "agent-a2"
+    assert poller.poll() == 0
+    poller.close()
+
+@pytest.mark.asyncio
+async def test_poller_runs_off_the_event_loop(game_db, registry, monkeypatch):
+    poller = CacheChangePoller(db_path=game_db, interval_ms=10)
+    polled_on = []
+    poll = poller.poll
+    monkeypatch.setattr(poller, "poll", lambda: polled_on.append(threading.get_ident()) or poll())
+
+    task = asyncio.create_task(poller.run())
+    await asyncio.sleep(0.05)
+    execute(game_db, "UPDATE npcs SET system_prompt = 'new prompt' WHERE npc_id = 'npc-a'")
+    await asyncio.sleep(0.1)
+    task.cancel()
+    poller.close()
+
+    assert polled_on and threading.get_ident() not in polled_on
+    assert registry.default.npcs["Pete"]["system_prompt"] == "new prompt"
+
+def test_directory_lookups_in_every_direction(game_db, registry):
+    registry.get(2)
+    directory = cache.get_npc_directory()
+
+    assert directory.by_name("Pete") == NPCEntry("npc-a", 1, "Pete", "asset-1", "agent-a", "red hat")
+    assert directory.by_name("Pete", 2).npc_id == "npc-b"
+    assert directory.by_npc_id("npc-b").game_id == 2
+    assert directory.name_for_agent("agent-a") == "Pete"
+    assert [entry.npc_id for entry in directory.by_asset_id("asset-1", 2)] == ["npc-b"]
+    assert cache.get_agent_id_for_name("Pete", 2) == "agent-b"
+    assert directory.by_name("Nobody") is None
+
+def test_directory_is_replaced_not_mutated(game_db, registry):
+    cache.rebuild_npc_directory()
+    before = cache.get_npc_directory()
+
+    execute(game_db, "UPDATE npcs SET display_name = 'Peter' WHERE npc_id = 'npc-a'")
+    publish_change(CacheChange("npcs", "npc-a", 1))
+
+    after = cache.get_npc_directory()
+    assert after is not before
+    assert before.agent_for_name("Pete") == "agent-a"
+    assert after.agent_for_name("Pete") is None
+    assert after.agent_for_name("Peter") == "agent-a"
+
+def test_directory_drops_evicted_games(game_db, registry):
+    registry.max_games = 0
+    registry.get(2)
+
+    assert cache.get_npc_directory().by_npc_id("npc-b") is None
+    assert cache.get_npc_directory().by_npc_id("npc-a") is not None
+
+def test_reload_swaps_in_place_without_emptying(game_db, registry):
+    game = registry.default
+    npcs, locations = game.npcs, game.locations
+    seen = []
+    fetch = game._fetch_npcs
+    game._fetch_npcs = lambda *args: seen.append(dict(game.npcs)) or fetch(*args)
+    execute(game_db, "UPDATE npcs SET display_name = 'Peter' WHERE npc_id = 'npc-a'")
+
+    game.load()
+
+    assert seen == [{"Pete": {"id": "npc-a", "system_prompt": "prompt a", "description": "red hat"}}]
+    assert game.npcs is npcs and game.locations is locations
+    assert list(game.npcs) == ["Peter"]
+    assert AGENT_ID_CACHE["npc-a"] == "agent-a"
+
+def test_games_load_outside_the_registry_lock(game_db, registry, monkeypatch):
+    loading, release = threading.Event(), threading.Event()
+    load = GameCache.load
+
+    def slow_load(game):
+        loading.set()
+        release.wait(5)
+        load(game)
+
+    monkeypatch.setattr(GameCache, "load", slow_load)
+    loader = threading.Thread(target=registry.get, args=(2,))
+    loader.start()
+    assert loading.wait(5)
+
+    # Held games and stats stay readable while game 2 loads
+    assert registry.stats()["games_cached"] == [1]
+    assert registry.get(1) is registry.default
+
+    release.set()
+    loader.join(5)
+    assert registry.peek(2) is not None
+    assert registry.loads == 1
+
+@pytest.mark.asyncio
+async def test_aget_loads_new_games_in_a_thread(game_db, registry, monkeypatch):
+    loaded_on = []
+    load = GameCache.load
+    monkeypatch.setattr(GameCache, "load", lambda game: loaded_on.append(threading.get_ident()) or load(game))
+
+    game = await registry.aget(2)
+
+    assert game.npcs["Pete"]["id"] == "npc-b"
+    assert loaded_on and threading.get_ident() not in loaded_on
+    assert await registry.aget(2) is game
+    assert await registry.aget() is registry.default
+
+def test_concurrent_first_use_loads_once(game_db, registry, monkeypatch):
+    load = GameCache.load
+
+    def slow_load(game):
+        time.sleep(0.05)
+        load(game)
+
+    monkeypatch.setattr(GameCache, "load", slow_load)
+    games = []
+    threads = [threading.Thread(target=lambda: games.append(registry.get(2))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.01)
+    for thread in threads:
+        thread.join(5)
+
+    assert len(games) == 8 and all(game is games[0] for game in games)
+    assert registry.loads == 1
+    assert registry._loading == {}
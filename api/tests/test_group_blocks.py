@@ -0,0 +1,29 @@
+from app.group_blocks import merge_member_updates
+
+def test_merge_applies_every_update_in_one_block():
+    block = {
+        "members": {"p1": {"name": "Ann", "is_present": True, "appearance": "red"}},
+        "summary": "Current members: Ann",
+        "updates": ["Ann joined"]
+    }
+    updates = [
+        ("p1", {"name": "Ann", "is_present": False, "last_seen": "now"}),
+        ("p2", {"name": "Bob", "is_present": True}),
+        ("p3", {"name": "Cy", "is_present": True})
+    ]
+
+    merged, results = merge_member_updates(block, updates)
+
+    assert merged["members"]["p1"] == {"name": "Ann", "is_present": False, "appearance": "red", "last_seen": "now"}
+    assert merged["summary"] == "Current members: Bob, Cy"
+    assert merged["updates"] == ["Ann joined"]
+    assert [r["message"] for r in results] == ["Member p1 left", "Member p2 added", "Member p3 added"]
+    assert results[0]["data"] == {"group_size": 3, "present_count": 2}
+    # The block read from Letta is left untouched
+    assert block["members"]["p1"]["is_present"] is True
+
+def test_merge_starts_from_empty_block():
+    merged, results = merge_member_updates(None, [("p1", {"name": "Ann", "is_present": True})])
+
+    assert merged["members"] == {"p1": {"name": "Ann", "is_present": True}}
+    assert results[0]["success"]
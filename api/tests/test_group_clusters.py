@@ -0,0 +1,51 @@
+import pytest
+
+import app.appearance as appearance_module
+import app.cache as cache
+import app.group_clusters as group_clusters
+from app.appearance import AppearanceDirectory, PlayerNameCache
+from app.cache import GameCache, GameCacheRegistry, NPCDirectory, NPCEntry, PlayerCache
+from app.group_clusters import joining_members
+from app.group_manager import GroupDelta
+from app.models import GroupData, HumanContextData
+
+@pytest.fixture
+def npcs(monkeypatch):
+    """Three NPCs with agents, plus a location for narratives"""
+    npcs = {
+        name: {"id": f"npc-{name}", "description": f"{name} look"}
+        for name in ("Pete", "Diamond", "Kaiden")
+    }
+    locations = {"stand": {"name": "Stand", "coordinates": [0, 0, 0], "slug": "stand"}}
+    monkeypatch.setattr(cache, "game_caches", GameCacheRegistry(GameCache(1, npcs, locations)))
+    monkeypatch.setattr(cache, "npc_directory", NPCDirectory(
+        [NPCEntry(f"npc-{name}", 1, name, None, f"agent-{name}", f"{name} look") for name in npcs], 1
+    ))
+    # No stored players
+    monkeypatch.setattr(group_clusters, "appearances", AppearanceDirectory(PlayerCache(), PlayerNameCache()))
+    monkeypatch.setattr(cache, "db_get_player_infos", lambda player_ids: {})
+    monkeypatch.setattr(appearance_module, "get_player_infos_by_name", lambda names: {})
+    return npcs
+
+def context(*members, position=None):
+    group = GroupData(members=list(members), npcs=len(members), players=0, formed=0)
+    return HumanContextData(currentGroups=group, position=position)
+
+def test_joining_member_entries_are_shared_across_npcs(npcs, monkeypatch):
+    calls = []
+    appearances = group_clusters.appearances
+    real = appearances.summary
+    monkeypatch.setattr(appearances, "summary", lambda name, game_id=None, default="": calls.append(name) or real(name, game_id, default))
+    deltas = [
+        GroupDelta("Pete", frozenset({"Kaiden", "Player1"}), frozenset(), frozenset({"Kaiden", "Player1"})),
+        GroupDelta("Diamond", frozenset({"Kaiden", "Player1"}), frozenset({"Player2"}), frozenset({"Kaiden", "Player1"}))
+    ]
+    human_context = {"Kaiden": context("Kaiden", "Pete", "Diamond", "Player1")}
+
+    entries = joining_members(deltas, human_context)
+
+    assert sorted(calls) == ["Kaiden", "Player1"]
+    assert entries["Kaiden"]["appearance"] == "Kaiden look"
+    assert entries["Player1"]["appearance"] == "Unknown"
+    assert entries["Player1"]["location"] is None
+    assert set(entries) == {"Kaiden", "Player1"}
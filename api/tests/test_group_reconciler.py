@@ -0,0 +1,122 @@
+import threading
+import time
+
+from app.group_manager import GroupDelta, GroupReconciler
+from app.shared_state import InProcessState
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def make_reconciler(timeout=15):
+    clock = FakeClock()
+    return GroupReconciler(removal_timeout=timeout, state=InProcessState(), clock=clock), clock
+
+def test_join_reported_immediately():
+    reconciler, _ = make_reconciler()
+    deltas = reconciler.observe({"Pete": ["Kaiden", "Diamond"]})
+    assert len(deltas) == 1
+    assert deltas[0].npc == "Pete"
+    assert deltas[0].joined == {"Kaiden", "Diamond"}
+    assert deltas[0].left == frozenset()
+
+def test_unchanged_group_has_no_delta():
+    reconciler, _ = make_reconciler()
+    reconciler.observe({"Pete": ["Kaiden"]})
+    assert reconciler.observe({"Pete": ["Kaiden"]}) == []
+
+def test_departure_waits_for_grace_period():
+    reconciler, clock = make_reconciler(timeout=15)
+    reconciler.observe({"Pete": ["Kaiden", "Diamond"]})
+
+    clock.now += 5
+    assert reconciler.observe({"Pete": ["Kaiden"]}) == []
+    assert "Diamond" in reconciler.pending_removals()["Pete"]
+
+    clock.now += 15
+    deltas = reconciler.observe({"Pete": ["Kaiden"]})
+    assert [(d.npc, d.left, d.members) for d in deltas] == [("Pete", {"Diamond"}, {"Kaiden"})]
+    assert reconciler.pending_removals() == {}
+
+def test_return_within_grace_period_cancels_removal():
+    reconciler, clock = make_reconciler(timeout=15)
+    reconciler.observe({"Pete": ["Kaiden"]})
+    clock.now += 5
+    reconciler.observe({"Pete": []})
+    clock.now += 5
+    assert reconciler.observe({"Pete": ["Kaiden"]}) == []
+    clock.now += 30
+    assert reconciler.observe({"Pete": ["Kaiden"]}) == []
+
+def test_npc_excluded_from_own_group():
+    reconciler, _ = make_reconciler()
+    deltas = reconciler.observe({"Pete": ["Pete", "Kaiden"]})
+    assert deltas[0].members == {"Kaiden"}
+
+def test_games_are_tracked_separately():
+    reconciler, _ = make_reconciler()
+    reconciler.observe({"Pete": ["Kaiden"]}, game_id=1)
+    assert len(reconciler.observe({"Pete": ["Kaiden"]}, game_id=2)) == 1
+    assert reconciler.observe({"Pete": ["Kaiden"]}, game_id=1) == []
+
+class SlowState(InProcessState):
+    """Widens the window between reading and writing the saved groups"""
+
+    def get(self, namespace, key, default=None):
+        value = super().get(namespace, key, default)
+        if namespace == GroupReconciler.NAMESPACE:
+            time.sleep(0.05)
+        return value
+
+def test_concurrent_snapshots_do_not_lose_updates():
+    reconciler = GroupReconciler(removal_timeout=15, state=SlowState(), clock=FakeClock())
+    deltas = []
+
+    def observe(members):
+        deltas.extend(reconciler.observe({"Pete": members}))
+
+    threads = [threading.Thread(target=observe, args=(m,)) for m in (["Kaiden"], ["Kaiden", "Diamond"])]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    joined = [member for delta in deltas for member in delta.joined]
+    assert sorted(joined) == ["Diamond", "Kaiden"]
+
+def test_failed_join_is_reported_again():
+    reconciler, _ = make_reconciler()
+    deltas = reconciler.observe({"Pete": ["Kaiden", "Diamond"]})
+
+    # The group write raised (or was shed); hand the delta back
+    reconciler.retry(deltas)
+
+    again = reconciler.observe({"Pete": ["Kaiden", "Diamond"]})
+    assert [(d.npc, d.joined, d.left) for d in again] == [("Pete", {"Kaiden", "Diamond"}, frozenset())]
+    assert reconciler.observe({"Pete": ["Kaiden", "Diamond"]}) == []
+
+def test_failed_departure_is_reported_again_without_a_new_grace_period():
+    reconciler, clock = make_reconciler(timeout=15)
+    reconciler.observe({"Pete": ["Kaiden", "Diamond"]})
+    reconciler.observe({"Pete": ["Kaiden"]})
+    clock.now += 20
+    deltas = reconciler.observe({"Pete": ["Kaiden"]})
+    assert deltas[0].left == {"Diamond"}
+
+    reconciler.retry(deltas)
+
+    clock.now += 1
+    again = reconciler.observe({"Pete": ["Kaiden"]})
+    assert [(d.npc, d.joined, d.left, d.members) for d in again] == [("Pete", frozenset(), {"Diamond"}, {"Kaiden"})]
+
+def test_partial_retry_keeps_the_written_members():
+    reconciler, _ = make_reconciler()
+    [delta] = reconciler.observe({"Pete": ["Kaiden", "Diamond"]})
+
+    reconciler.retry([GroupDelta("Pete", frozenset({"Diamond"}), frozenset(), delta.members)])
+
+    [again] = reconciler.observe({"Pete": ["Kaiden", "Diamond"]})
+    assert again.joined == {"Diamond"}
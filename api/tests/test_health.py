@@ -0,0 +1,46 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.ai_handler import AIHandler
+from app.health import ReadinessState, collect_health
+
+def test_ready_only_after_all_steps_succeed():
+    state = ReadinessState()
+    assert not state.ready
+
+    state.require("static_cache")
+    state.require("agent_warmup")
+    state.complete("static_cache", detail={"npcs": True, "locations": True})
+    assert not state.ready
+
+    state.complete("agent_warmup", ok=False, detail="letta down")
+    assert not state.ready
+
+    state.complete("agent_warmup")
+    assert state.ready
+
+def test_health_report_shape():
+    report = collect_health({"reachable": False, "version": None})
+
+    assert set(report["caches"]) == {"npcs", "agents", "locations", "games", "players"}
+    assert report["letta"]["reachable"] is False
+    assert "ok" in report["database"]
+    assert report["queues"]["chat_waiting"] == 0
+
+@pytest.mark.asyncio
+async def test_health_reports_openai_limiter_and_failures():
+    handler = AIHandler(api_key="test_key")
+
+    def fail(**kwargs):
+        raise RuntimeError("upstream down")
+
+    handler.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=fail)))
+    await handler.get_response([{"role": "user", "content": "hi"}], "npc")
+
+    assert handler.get_metrics()["recent_failures"] == {"timeout": 0, "shed": 0, "error": 1}
+    openai = collect_health()["openai"]
+    assert openai["handlers"] >= 1
+    assert openai["limit"] >= handler.limiter.get_metrics()["limit"]
+    assert openai["recent_failures"]["error"] >= 1
+    assert "upstream down" in openai["last_error"]
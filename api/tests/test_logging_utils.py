@@ -0,0 +1,61 @@
+import logging
+import logging.handlers
+
+import pytest
+
+from app import logging_utils
+from app.logging_utils import LazyJSON, SamplingFilter, configure_logging, get_logger, stop_logging
+
+@pytest.fixture(autouse=True)
+def restore_logging():
+    """Leave handlers, levels and the listener as they were, whatever order tests run in"""
+    root = logging.getLogger()
+    loggers = [root, logging.getLogger(logging_utils.ROOT_LOGGER)] + [get_logger(s) for s in logging_utils.SUBSYSTEMS]
+    levels = [logger.level for logger in loggers]
+    handlers = list(root.handlers)
+    listening = logging_utils._listener is not None
+    yield
+    if not listening:
+        stop_logging()
+        root.handlers[:] = handlers
+    for logger, level in zip(loggers, levels):
+        logger.setLevel(level)
+
+class Exploding:
+    def model_dump(self):
+        raise AssertionError("payload serialized while debug logging is off")
+
+def make_record(msg, **extra):
+    record = logging.LogRecord("roblox_app.snapshot", logging.INFO, __file__, 1, msg, (), None)
+    record.__dict__.update(extra)
+    return record
+
+def test_lazy_payload_is_not_serialized_when_filtered():
+    logger = get_logger("chat")
+    logger.setLevel(logging.INFO)
+    logger.debug("Request: %s", LazyJSON(Exploding()))
+    assert str(LazyJSON({"a": 1})) == '{"a": 1}'
+
+def test_sampling_filter_passes_one_in_n():
+    sampler = SamplingFilter()
+    passed = [sampler.filter(make_record("tick", sample_rate=5)) for _ in range(20)]
+    assert sum(passed) == 4
+    assert all(sampler.filter(make_record("other")) for _ in range(3))
+
+def test_subsystem_levels_from_environment(monkeypatch):
+    monkeypatch.setenv("LOG_LEVEL", "WARNING")
+    monkeypatch.setenv("LOG_LEVEL_CHAT", "DEBUG")
+
+    configure_logging()
+
+    assert get_logger("chat").level == logging.DEBUG
+    assert get_logger("snapshot").level == logging.WARNING
+    assert isinstance(logging.getLogger().handlers[0], logging.handlers.QueueHandler)
+
+def test_levels_reapplied_after_handler_install(monkeypatch):
+    configure_logging()
+    monkeypatch.setenv("LOG_LEVEL_SNAPSHOT", "ERROR")
+
+    configure_logging()
+
+    assert get_logger("snapshot").level == logging.ERROR
@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from app.metrics import MetricsRegistry, _NOOP
+
+def test_histogram_percentiles_and_prometheus_output():
+    registry = MetricsRegistry()
+    for ms in range(1, 101):
+        registry.stage_latency.observe(ms / 1000, "sqlite", "get_npc_context")
+
+    [stage] = registry.summary()["stages"]
+    assert stage["count"] == 100
+    assert 25 <= stage["p50_ms"] <= 50
+    assert 50 <= stage["p95_ms"] <= 100
+    assert stage["p99_ms"] <= 100
+
+    text = registry.render_prometheus()
+    assert "# TYPE roblox_stage_duration_seconds histogram" in text
+    assert 'roblox_stage_duration_seconds_bucket{stage="sqlite",operation="get_npc_context",le="+Inf"} 100' in text
+    assert 'roblox_stage_duration_seconds_count{stage="sqlite",operation="get_npc_context"} 100' in text
+
+@pytest.mark.asyncio
+async def test_decorator_times_sync_and_async_functions():
+    registry = MetricsRegistry()
+
+    @registry.timed("cache")
+    def lookup():
+        return "hit"
+
+    @registry.timed("letta", "messages.create")
+    async def send():
+        await asyncio.sleep(0)
+        return "sent"
+
+    assert lookup() == "hit"
+    assert await send() == "sent"
+
+    stages = {(s["stage"], s["operation"]): s["count"] for s in registry.summary()["stages"]}
+    assert stages == {("cache", "lookup"): 1, ("letta", "messages.create"): 1}
+
+def test_disabled_registry_records_nothing():
+    registry = MetricsRegistry(enabled=False)
+
+    @registry.timed("cache")
+    def lookup():
+        return "hit"
+
+    assert lookup() == "hit"
+    assert registry.timer("sqlite") is _NOOP
+    with registry.timer("sqlite"):
+        pass
+    assert registry.summary()["stages"] == []
+
+def test_dashboard_renders_the_summary(monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from app import dashboard_router
+
+    registry = MetricsRegistry()
+    registry.stage_latency.observe(0.004, "lua_export", "save_lua_database")
+    monkeypatch.setattr(dashboard_router, "metrics", registry)
+    app = FastAPI()
+    app.include_router(dashboard_router.router)
+
+    response = TestClient(app).get("/dashboard/metrics")
+
+    assert response.status_code == 200
+    assert "save_lua_database" in response.text
+    assert response.text.count("<tr") == 2  # Header plus one stage
@@ -0,0 +1,96 @@
+import json
+import logging
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.middleware import ConversationMetrics, ConversationMiddleware
+
+def make_client():
+    tracker = ConversationMetrics()
+    app = FastAPI()
+    app.add_middleware(ConversationMiddleware, conversation_metrics_override=tracker)
+
+    @app.post("/robloxgpt/v4")
+    async def chat(request: Request):
+        body = await request.json()
+        return {"echo": body["message"]}
+
+    @app.post("/letta/v1/chat/v3/stream")
+    async def stream():
+        async def events():
+            for i in range(3):
+                yield json.dumps({"type": "text", "content": str(i)}) + "\n"
+        return StreamingResponse(events(), media_type="application/x-ndjson")
+
+    @app.get("/other")
+    async def other():
+        return {}
+
+    @app.get("/letta/v1/chat/dispatcher")
+    async def dispatcher():
+        return {}
+
+    return TestClient(app), tracker
+
+def test_tracks_body_conversation_without_consuming_it():
+    client, tracker = make_client()
+    response = client.post("/robloxgpt/v4", json={
+        "conversation_id": "conv-1",
+        "conversation_type": "npc_npc",
+        "message": "hello"
+    })
+
+    assert response.json() == {"echo": "hello"}
+    assert tracker.total_conversations == 1
+    assert tracker.successful_conversations == 1
+    assert tracker.conversation_types["npc_npc"] == 1
+    assert tracker.active_conversations == 0
+
+def test_streaming_response_passes_through():
+    client, tracker = make_client()
+    response = client.post(
+        "/letta/v1/chat/v3/stream",
+        json={"npc_id": "npc1", "messages": []},
+        headers={"X-Conversation-Id": "conv-2"}
+    )
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["content"] for line in lines] == ["0", "1", "2"]
+    assert tracker.successful_conversations == 1
+
+def test_untracked_paths_are_ignored():
+    client, tracker = make_client()
+    client.get("/other")
+    client.get("/letta/v1/chat/dispatcher")
+    assert tracker.total_conversations == 0
+    assert tracker.active_conversations == 0
+
+@pytest.mark.asyncio
+async def test_failed_final_send_still_finishes(caplog):
+    caplog.set_level(logging.DEBUG, logger="ella_app")
+    tracker = ConversationMetrics()
+
+    async def app(scope, receive, send):
+        await receive()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    async def receive():
+        return {"type": "http.request", "body": b'{"conversation_id": "conv-\xff"}'}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            raise OSError("client went away")
+
+    middleware = ConversationMiddleware(app, conversation_metrics_override=tracker)
+    with pytest.raises(OSError):
+        await middleware({"type": "http", "method": "POST", "path": "/robloxgpt/v4", "headers": []}, receive, send)
+
+    assert tracker.active_conversations == 0
+    assert tracker.total_conversations == 1
+    assert tracker.failed_conversations == 1
+    # The undecodable id byte is replaced rather than raising
+    assert "conv-\ufffd" in caplog.text
@@ -0,0 +1,74 @@
+import pytest
+
+import app.cache as cache
+from app.cache import PlayerCache
+
+@pytest.fixture
+def queries(monkeypatch):
+    """Record each batched player query against a fixed table"""
+    rows = {
+        "p1": {"description": "tall", "display_name": "One"},
+        "p2": {"description": "short", "display_name": "Two"}
+    }
+    calls = []
+
+    def get_player_infos(player_ids):
+        calls.append(list(player_ids))
+        return {player_id: dict(rows[player_id]) for player_id in player_ids if player_id in rows}
+
+    monkeypatch.setattr(cache, "db_get_player_infos", get_player_infos)
+    return calls
+
+def test_hits_are_served_from_memory(queries):
+    players = PlayerCache()
+
+    assert players.lookup("p1")["description"] == "tall"
+    assert players.lookup("p1")["description"] == "tall"
+    assert queries == [["p1"]]
+    assert players.stats()["hit_rate"] == 0.5
+
+def test_unknown_players_are_negatively_cached(queries, monkeypatch):
+    players = PlayerCache(negative_ttl_seconds=30)
+
+    assert players.lookup("ghost") is None
+    assert players.lookup("ghost") is None
+    assert queries == [["ghost"]]
+    assert players.stats()["negative_hits"] == 1
+
+    now = cache.time.monotonic()
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now + 31)
+    players.lookup("ghost")
+    assert len(queries) == 2
+
+def test_lru_eviction_and_ttl(queries, monkeypatch):
+    players = PlayerCache(max_size=2, ttl_seconds=60)
+    players.lookup("p1")
+    players.lookup("p2")
+    players.lookup("p1")
+    players.lookup("ghost")
+
+    assert "p2" not in players
+    assert "p1" in players
+    assert players.stats()["evictions"] == 1
+
+    now = cache.time.monotonic()
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now + 61)
+    assert "p1" not in players
+
+def test_prefetch_uses_one_query_for_all_misses(queries):
+    players = PlayerCache()
+    players.lookup("p1")
+
+    found = players.lookup_many(["p1", "p2", "ghost", "p2"])
+
+    assert queries == [["p1"], ["p2", "ghost"]]
+    assert found["p2"]["display_name"] == "Two"
+    assert found["ghost"] is None
+
+def test_update_merges_description(queries):
+    players = PlayerCache()
+    players.lookup("ghost")
+
+    players.update("ghost", description="new look")
+
+    assert players.lookup("ghost") == {"description": "new look"}
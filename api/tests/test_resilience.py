@@ -0,0 +1,186 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.resilience import CircuitBreaker, CircuitOpen, LettaResilience, RetryBudget
+
+class FakeLetta:
+    """Blocking stand-in for a Letta call with scripted latency and errors"""
+
+    def __init__(self, latencies=(), errors=()):
+        self.latencies = list(latencies)
+        self.errors = list(errors)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def get_block(self, agent_id):
+        with self._lock:
+            self.calls += 1
+            latency = self.latencies.pop(0) if self.latencies else 0
+            error = self.errors.pop(0) if self.errors else None
+        time.sleep(latency)
+        if error:
+            raise error
+        return {"agent_id": agent_id}
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def make_resilience(**kwargs):
+    kwargs.setdefault("breaker", CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=FakeClock()))
+    kwargs.setdefault("retry_backoff", 0)
+    return LettaResilience(timeouts={}, default_timeout=kwargs.pop("timeout", 1.0), **kwargs)
+
+@pytest.mark.asyncio
+async def test_timeout_fails_fast():
+    letta = FakeLetta(latencies=[0.5])
+    resilience = make_resilience(timeout=0.05)
+
+    start = time.monotonic()
+    with pytest.raises(asyncio.TimeoutError):
+        await resilience.call("group_members.read", letta.get_block, "agent-1")
+    assert time.monotonic() - start < 0.4
+    assert resilience.stats()["timeouts"] == {"group_members.read": 1}
+
+@pytest.mark.asyncio
+async def test_open_circuit_sheds_non_essential_calls():
+    letta = FakeLetta(errors=[RuntimeError("500")] * 3)
+    resilience = make_resilience()
+
+    for _ in range(3):
+        with pytest.raises(RuntimeError):
+            await resilience.call("status.write", letta.get_block, "agent-1", essential=False)
+    assert resilience.breaker.state == CircuitBreaker.OPEN
+
+    with pytest.raises(CircuitOpen):
+        await resilience.call("status.write", letta.get_block, "agent-1", essential=False)
+    assert letta.calls == 3
+    assert resilience.stats()["shed"] == {"status.write": 1}
+
+    # Essential calls still go through, and a success closes the circuit
+    assert await resilience.call("messages.create", letta.get_block, "agent-1") == {"agent_id": "agent-1"}
+    assert resilience.breaker.state == CircuitBreaker.CLOSED
+
+@pytest.mark.asyncio
+async def test_half_open_allows_one_probe():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+    breaker.record_failure()
+    assert not breaker.allow(essential=False)
+
+    clock.now += 30
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow(essential=False)
+    assert not breaker.allow(essential=False)
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    clock.now += 30
+    assert breaker.allow(essential=False)
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.times_opened == 1
+
+@pytest.mark.asyncio
+async def test_idempotent_reads_retry_within_budget():
+    letta = FakeLetta(errors=[RuntimeError("502")])
+    resilience = make_resilience()
+
+    assert await resilience.call("group_members.read", letta.get_block, "agent-1", idempotent=True)
+    assert letta.calls == 2
+    assert resilience.stats()["retries"] == {"group_members.read": 1}
+
+@pytest.mark.asyncio
+async def test_writes_are_not_retried():
+    letta = FakeLetta(errors=[RuntimeError("502")])
+    resilience = make_resilience()
+
+    with pytest.raises(RuntimeError):
+        await resilience.call("group_members.write", letta.get_block, "agent-1")
+    assert letta.calls == 1
+
+@pytest.mark.asyncio
+async def test_exhausted_budget_stops_retries():
+    letta = FakeLetta(errors=[RuntimeError("502")] * 2)
+    resilience = make_resilience(budget=RetryBudget(ratio=0.1, reserve=0))
+
+    with pytest.raises(RuntimeError):
+        await resilience.call("group_members.read", letta.get_block, "agent-1", idempotent=True)
+    assert letta.calls == 1
+    assert resilience.budget.exhausted == 1
+
+def test_budget_refills_with_traffic():
+    budget = RetryBudget(ratio=0.25, reserve=0)
+    for _ in range(4):
+        budget.deposit()
+    assert budget.withdraw()
+    assert not budget.withdraw()
+
+@pytest.mark.asyncio
+async def test_hedged_read_returns_first_answer():
+    letta = FakeLetta(latencies=[0.5, 0.0])
+    resilience = make_resilience(hedge_delay=0.05)
+
+    start = time.monotonic()
+    assert await resilience.call("group_members.read", letta.get_block, "agent-1", idempotent=True)
+    assert time.monotonic() - start < 0.4
+    assert letta.calls == 2
+    assert resilience.stats()["hedges"] == {"group_members.read": 1}
+
+@pytest.mark.asyncio
+async def test_writes_are_not_hedged():
+    letta = FakeLetta(latencies=[0.15])
+    resilience = make_resilience(hedge_delay=0.01)
+
+    await resilience.call("group_members.write", letta.get_block, "agent-1")
+    assert letta.calls == 1
+
+class FakeStream:
+    """Blocking chunk iterator like a Letta stream, with a close() that unblocks it"""
+
+    def __init__(self, chunks, stall_after=None):
+        self.chunks = list(chunks)
+        self.stall_after = stall_after
+        self.closed = threading.Event()
+
+    def __iter__(self):
+        for i, chunk in enumerate(self.chunks):
+            if i == self.stall_after:
+                self.closed.wait(5)
+                return
+            yield chunk
+
+    def close(self):
+        self.closed.set()
+
+@pytest.mark.asyncio
+async def test_stream_yields_chunks_and_closes():
+    stream = FakeStream(["a", "b", "c"])
+    resilience = make_resilience()
+
+    chunks = [chunk async for chunk in resilience.stream("messages.create_stream", lambda: stream)]
+
+    assert chunks == ["a", "b", "c"]
+    assert stream.closed.is_set()
+    assert resilience.breaker.failures == 0
+
+@pytest.mark.asyncio
+async def test_stalled_stream_times_out():
+    stream = FakeStream(["a", "b"], stall_after=1)
+    resilience = make_resilience(timeout=0.05)
+
+    chunks = []
+    with pytest.raises(asyncio.TimeoutError):
+        async for chunk in resilience.stream("messages.create_stream", lambda: stream):
+            chunks.append(chunk)
+
+    assert chunks == ["a"]
+    assert stream.closed.is_set()
+    assert resilience.stats()["timeouts"] == {"messages.create_stream": 1}
+    assert resilience.breaker.failures == 1
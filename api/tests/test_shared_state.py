@@ -0,0 +1,105 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+import pytest
+
+from app.queue_system import QueueSystem, SnapshotQueueItem
+from app.shared_state import InProcessState, LeaseTimeout, SharedState, SQLiteState
+
+API_DIR = Path(__file__).parent.parent
+
+@pytest.fixture(params=["memory", "sqlite"])
+def state(request, tmp_path):
+    if request.param == "memory":
+        return InProcessState()
+    return SQLiteState(tmp_path / "state.db")
+
+def test_backends_must_implement_the_interface():
+    class Partial(SharedState):
+        def get(self, namespace, key, default=None):
+            return default
+
+    with pytest.raises(TypeError):
+        Partial()
+
+def test_get_set_delete_and_ttl(state):
+    state.set("ns", "a", {"x": 1})
+    state.set("ns", "gone", 1, ttl=-1)
+
+    assert state.get("ns", "a") == {"x": 1}
+    assert state.get("ns", "gone", "missing") == "missing"
+    assert state.items("ns") == {"a": {"x": 1}}
+
+    state.delete("ns", "a")
+    assert state.get("ns", "a") is None
+
+def test_incr(state):
+    assert state.incr("ns", "count") == 1
+    assert state.incr("ns", "count", 4) == 5
+
+def test_lease_is_exclusive(state):
+    assert state.acquire("locks", "npc", "worker-1", ttl=60)
+    assert not state.acquire("locks", "npc", "worker-2", ttl=60)
+
+    with pytest.raises(LeaseTimeout):
+        with state.lease("locks", "npc", timeout=0.1):
+            pass
+
+    state.release("locks", "npc", "worker-1")
+    with state.lease("locks", "npc", timeout=0.1):
+        assert not state.acquire("locks", "npc", "worker-2", ttl=60)
+
+async def test_queue_counters_live_in_shared_state(state):
+    first, second = QueueSystem(state), QueueSystem(state)
+    item = SnapshotQueueItem(clusters=[], human_context={}, timestamp=0)
+
+    await first.enqueue_snapshot(item)
+    await second.enqueue_snapshot(item)
+
+    assert first.total_snapshots == second.total_snapshots == 2
+    assert second.get_queue_sizes()["current_snapshot_rate"] == 2
+
+WORKER = textwrap.dedent("""
+    import json, sys
+    from app.shared_state import shared_state
+    from app.models import GameSnapshot
+    from app.snapshot_processor import update_previous_state, get_previous_entity_state
+
+    worker = int(sys.argv[1])
+    for _ in range(50):
+        shared_state.incr("test", "counter")
+    for _ in range(10):
+        # Unprotected read-modify-write: only correct if the lease is exclusive
+        with shared_state.lease("test", "lock", timeout=30):
+            shared_state.set("test", "guarded", shared_state.get("test", "guarded", 0) + 1)
+
+    if worker == 0:
+        update_previous_state(GameSnapshot(timestamp=1, gameId=7, events=[], clusters=[],
+                                           humanContext={"Pete": {"location": "stand"}}))
+        shared_state.set("test", "snapshot_written", True)
+    else:
+        while not shared_state.get("test", "snapshot_written"):
+            pass
+        print(json.dumps(get_previous_entity_state(7)))
+""")
+
+def test_workers_share_state_through_sqlite(tmp_path):
+    env = dict(os.environ, SHARED_STATE_BACKEND="sqlite", SHARED_STATE_PATH=str(tmp_path / "state.db"))
+    workers = [
+        subprocess.Popen([sys.executable, "-c", WORKER, str(i)], cwd=API_DIR, env=env,
+                         stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        for i in range(4)
+    ]
+    outputs = [worker.communicate(timeout=60) for worker in workers]
+    for worker, (_, stderr) in zip(workers, outputs):
+        assert worker.returncode == 0, stderr
+
+    state = SQLiteState(tmp_path / "state.db")
+    assert state.get("test", "counter") == 200
+    assert state.get("test", "guarded") == 40
+    for stdout, _ in outputs[1:]:
+        assert json.loads(stdout.strip().splitlines()[-1]) == {"Pete": {"location": "stand"}}
@@ -0,0 +1,47 @@
+import pytest
+
+from app.models import GameSnapshot
+from app.snapshot_generator import SnapshotGenerator, synthetic_locations
+
+NPCS = ["Pete", "Kaiden", "Diamond", "Goldie"]
+
+def make_generator(**kwargs):
+    options = dict(players=6, locations=synthetic_locations(3, spread=50, seed=1), seed=7)
+    options.update(kwargs)
+    return SnapshotGenerator(NPCS, **options)
+
+def test_same_seed_same_stream():
+    assert list(make_generator().stream(5)) == list(make_generator().stream(5))
+    assert list(make_generator().stream(5)) != list(make_generator(seed=8).stream(5))
+
+def test_snapshots_validate_and_cover_everyone():
+    for snapshot in make_generator(game_id=2).stream(3):
+        parsed = GameSnapshot(**snapshot)
+        assert parsed.gameId == 2
+        assert set(parsed.humanContext) == set(NPCS + [f"Player{i}" for i in range(6)])
+
+def test_groups_are_symmetric_and_match_clusters():
+    snapshot = make_generator(group_radius=30).tick()
+    context = snapshot["humanContext"]
+    for name, entry in context.items():
+        group = entry["currentGroups"]
+        assert name in group["members"]
+        assert group["npcs"] == sum(1 for member in group["members"] if member in NPCS)
+        for member in group["members"]:
+            assert context[member]["currentGroups"]["members"] == group["members"]
+    assert sorted(sum((c["members"] for c in snapshot["clusters"]), [])) == sorted(context)
+
+def test_static_movement_keeps_groups():
+    generator = make_generator(movement="static")
+    first, second = generator.tick(), generator.tick()
+    assert first["clusters"] == second["clusters"]
+    assert not any(entry["health"]["isMoving"] for entry in second["humanContext"].values())
+
+def test_churn_changes_groups():
+    generator = make_generator(movement="static", group_churn=0.5)
+    first, second = generator.tick(), generator.tick()
+    assert first["clusters"] != second["clusters"]
+
+def test_unknown_movement_rejected():
+    with pytest.raises(ValueError):
+        make_generator(movement="teleport")
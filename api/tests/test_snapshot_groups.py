@@ -0,0 +1,95 @@
+import threading
+
+import pytest
+
+pytest.importorskip("letta_templates")
+
+from app.main import app  # Loads letta_router, which imports from main
+from app import group_processor as group_processor_module
+from app import letta_router
+from app.appearance import AppearanceDirectory, PlayerNameCache
+from app.cache import PlayerCache
+from app.group_manager import GroupReconciler
+from app.resilience import LettaResilience
+from app.shared_state import InProcessState
+from app.snapshot_ingest import decode_context, Snapshot
+
+def snapshot(members):
+    context = decode_context({"currentGroups": {"members": members}})
+    return Snapshot(1, None, [], [], {"Pete": context})
+
+@pytest.fixture
+def reconciler(monkeypatch):
+    reconciler = GroupReconciler(state=InProcessState())
+    monkeypatch.setattr(letta_router, "group_reconciler", reconciler)
+    monkeypatch.setattr(letta_router, "get_agent_id_for_name", lambda name, game_id=None: f"agent-{name}")
+    monkeypatch.setattr(letta_router, "joining_members", lambda deltas, human_context, game_id: {
+        member: {"entity_id": member, "name": member, "is_joining": True, "appearance": "red hat"}
+        for delta in deltas for member in delta.joined
+    })
+    monkeypatch.setattr(group_processor_module, "letta_resilience", LettaResilience(max_retries=0))
+    monkeypatch.setattr(group_processor_module, "get_memory_block", lambda client, agent_id, label: {"members": {}})
+    return reconciler
+
+@pytest.mark.asyncio
+async def test_failed_group_write_is_retried_next_snapshot(reconciler, monkeypatch):
+    written = []
+
+    def fail(client, agent_id, label, value):
+        raise RuntimeError("letta down")
+
+    monkeypatch.setattr(group_processor_module, "update_memory_block", fail)
+    await letta_router.reconcile_groups({"Pete": ["Kaiden"]}, snapshot(["Pete", "Kaiden"]))
+
+    monkeypatch.setattr(
+        group_processor_module, "update_memory_block",
+        lambda client, agent_id, label, value: written.append((agent_id, sorted(value["members"])))
+    )
+    await letta_router.reconcile_groups({"Pete": ["Kaiden"]}, snapshot(["Pete", "Kaiden"]))
+    await letta_router.reconcile_groups({"Pete": ["Kaiden"]}, snapshot(["Pete", "Kaiden"]))
+
+    assert written == [("agent-Pete", ["Kaiden"])]
+
+@pytest.mark.asyncio
+async def test_unexpected_error_keeps_the_delta(reconciler, monkeypatch):
+    async def explode(updates_by_agent):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(letta_router.group_processor, "batch_update_agents", explode)
+    with pytest.raises(RuntimeError):
+        await letta_router.reconcile_groups({"Pete": ["Kaiden"]}, snapshot(["Pete", "Kaiden"]))
+
+    [delta] = reconciler.observe({"Pete": ["Kaiden"]})
+    assert delta.joined == {"Kaiden"}
+
+@pytest.mark.asyncio
+async def test_group_update_loads_appearances_off_the_event_loop(monkeypatch):
+    loop_thread = threading.current_thread()
+    fetched_on = []
+
+    class Players(PlayerCache):
+        def _fetch(self, player_ids):
+            fetched_on.append(threading.current_thread())
+            return {pid: {"description": "green hoodie"} for pid in player_ids if pid == "123"}
+
+    class Names(PlayerNameCache):
+        def _fetch(self, display_names):
+            fetched_on.append(threading.current_thread())
+            return {}
+
+    monkeypatch.setattr(group_processor_module, "appearances", AppearanceDirectory(Players(), Names()))
+    written = []
+
+    def upsert(client, agent_id, entity_id, update_data):
+        written.append(update_data)
+        return {"success": True, "message": "ok", "data": {"group_size": 1, "present_count": 1}}
+
+    monkeypatch.setattr(group_processor_module, "upsert_group_member", upsert)
+    processor = group_processor_module.GroupProcessor(letta_client=object())
+
+    result = await processor.process_group_update("agent-Pete", "123", True, player_name="greggytheegg")
+
+    assert result["success"]
+    assert written[0]["appearance"] == "green hoodie"
+    assert fetched_on and loop_thread not in fetched_on
+    assert processor._member_update({"entity_id": "nobody", "name": "nobody", "is_joining": True})["appearance"] == "Unknown"
@@ -0,0 +1,74 @@
+import copy
+import json
+from pathlib import Path
+
+import pytest
+
+import app.snapshot_ingest as snapshot_ingest
+import app.snapshot_processor as snapshot_processor
+from app.models import GameSnapshot
+from app.shared_state import InProcessState
+from app.snapshot_generator import SnapshotGenerator, synthetic_locations
+from app.snapshot_ingest import SnapshotDecodeError, decode_snapshot, enrich_snapshot
+
+SAMPLE = Path(__file__).parent / "data" / "sample_snapshot.json"
+LOCATIONS = synthetic_locations(4, spread=40, seed=3)
+
+@pytest.fixture(autouse=True)
+def isolated(monkeypatch):
+    """Fresh previous-state store and a fixed location cache for both paths"""
+    state = InProcessState()
+    monkeypatch.setattr(snapshot_processor, "shared_state", state)
+    monkeypatch.setattr(snapshot_ingest, "shared_state", state)
+    monkeypatch.setattr(snapshot_processor, "get_locations", lambda game_id=None: LOCATIONS)
+    monkeypatch.setattr(snapshot_ingest, "get_locations", lambda game_id=None: LOCATIONS)
+
+def test_decodes_sample_snapshot():
+    snapshot = decode_snapshot(SAMPLE.read_bytes())
+    raw = json.loads(SAMPLE.read_text())
+
+    assert set(snapshot.humanContext) == set(raw["humanContext"])
+    name, context = next(iter(snapshot.humanContext.items()))
+    assert context.currentGroups.members == raw["humanContext"][name]["currentGroups"]["members"]
+    assert context.health.get("max") == raw["humanContext"][name]["health"]["max"]
+    assert context.health.get("missing", "default") == "default"
+
+@pytest.mark.parametrize("body, message", [
+    (b"{not json", "Invalid JSON"),
+    (b"[]", "JSON object"),
+    (b'{"events": [], "clusters": [], "humanContext": {}}', "timestamp"),
+    (b'{"timestamp": 1, "events": [], "clusters": [], "humanContext": {"Pete": {"position": {"x": 1}}}}', "humanContext.Pete"),
+])
+def test_rejects_malformed_snapshots(body, message):
+    with pytest.raises(SnapshotDecodeError, match=message):
+        decode_snapshot(body)
+
+def test_matches_pydantic_enrichment():
+    """Both paths agree on narratives, group updates and status flags across consecutive snapshots"""
+    stream = list(SnapshotGenerator(["Pete", "Kaiden", "Goldie"], players=5, locations=LOCATIONS,
+                                    group_radius=15, group_churn=0.3, seed=11).stream(6))
+
+    compact, typed = [], []
+    for raw in stream:
+        compact.append(enrich_snapshot(decode_snapshot(json.dumps(raw).encode())))
+    snapshot_processor.shared_state.delete(snapshot_processor.SNAPSHOT_NAMESPACE, "default")
+    for raw in stream:
+        typed.append(snapshot_processor.enrich_snapshot_with_context(GameSnapshot(**copy.deepcopy(raw))))
+
+    for ours, theirs in zip(compact, typed):
+        for name, context in theirs.humanContext.items():
+            assert ours.humanContext[name].location == context.location
+            assert ours.humanContext[name].needs_status_update == context.needs_status_update
+            assert ours.humanContext[name].currentGroups.updates == context.currentGroups.updates
+
+def test_previous_state_is_compact_and_readable_by_pydantic_path():
+    raw = json.loads(SAMPLE.read_text())
+    enrich_snapshot(decode_snapshot(json.dumps(raw).encode()))
+
+    stored = snapshot_processor.get_previous_entity_state()
+    entry = next(iter(stored.values()))
+    assert set(entry) <= {"health", "position", "currentGroups", "location"}
+
+    # Same snapshot again through the pydantic path: nothing changed
+    again = snapshot_processor.enrich_snapshot_with_context(GameSnapshot(**raw))
+    assert not any(context.needs_status_update for context in again.humanContext.values())
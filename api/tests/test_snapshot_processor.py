@@ -12,7 +12,8 @@ from app.models import (
     ClusterData
 )
 from unittest.mock import AsyncMock, patch
-from app.cache import NPC_CACHE, AGENT_ID_CACHE
+import app.cache as cache
+from app.cache import NPC_CACHE, AGENT_ID_CACHE, NPCDirectory, NPCEntry
 from app.status_manager import update_status_block
 import time
 
@@ -53,6 +54,15 @@ def cleanup_caches():
     NPC_CACHE.clear()
     AGENT_ID_CACHE.clear()
 
+def register_npc(monkeypatch, npc_id, agent_id):
+    """Cache an NPC and its agent, and publish them in the NPC directory lookups use"""
+    NPC_CACHE[npc_id] = {"id": npc_id}
+    AGENT_ID_CACHE[npc_id] = agent_id
+    default_game_id = cache.game_caches.default.game_id
+    monkeypatch.setattr(cache, "npc_directory", NPCDirectory(
+        [NPCEntry(npc_id, default_game_id, npc_id, None, agent_id)], default_game_id
+    ))
+
 def test_snapshot_enrichment():
     """Test snapshot enrichment with real data"""
     snapshot = load_sample_snapshot()
@@ -443,15 +453,13 @@ def test_group_member_states():
         # Create and process snapshots...
 
 @pytest.mark.asyncio
-async def test_status_and_group_updates():
-    """Test status block updates and group member handling"""
+async def test_status_updates_leave_the_group_block_alone(monkeypatch):
+    """Status block updates report group size; the group block belongs to the reconciler"""
     npc_id = "test_npc"
     agent_id = "test_agent"
     current_time = int(time.time())  # Integer timestamp
     
-    # Mock cache entries
-    NPC_CACHE[npc_id] = {"id": npc_id}
-    AGENT_ID_CACHE[npc_id] = agent_id
+    register_npc(monkeypatch, npc_id, agent_id)
     
     # Create test snapshot with health, location, group
     snapshot = GameSnapshot(
@@ -477,8 +485,7 @@ async def test_status_and_group_updates():
     )
     
     # Mock the client calls - update patch paths
-    with patch('app.status_manager.update_location_status', new_callable=AsyncMock) as mock_status_update, \
-         patch('app.status_manager.update_group_members_v2', new_callable=AsyncMock) as mock_group_update:
+    with patch('app.status_manager.update_location_status', new_callable=AsyncMock) as mock_status_update:
         
         # Process snapshot
         enriched = enrich_snapshot_with_context(snapshot)
@@ -490,22 +497,14 @@ async def test_status_and_group_updates():
         assert status_call['current_location'] == "Town Square"
         assert "Status: Injured" in status_call['current_action']
         assert "Group: With 2 others" in status_call['current_action']
-        
-        # Verify group update was called with correct members
-        mock_group_update.assert_called_once()
-        group_call = mock_group_update.call_args[1]
-        assert len(group_call['nearby_players']) == 2
-        assert all(p['id'] in ['player1', 'player2'] for p in group_call['nearby_players'])
 
 @pytest.mark.asyncio
-async def test_status_updates_with_missing_data():
+async def test_status_updates_with_missing_data(monkeypatch):
     """Test status updates with partial or missing data"""
     npc_id = "test_npc"
     agent_id = "test_agent"
     
-    # Mock cache entries
-    NPC_CACHE[npc_id] = {"id": npc_id}
-    AGENT_ID_CACHE[npc_id] = agent_id
+    register_npc(monkeypatch, npc_id, agent_id)
     
     test_cases = [
         {
@@ -529,7 +528,7 @@ async def test_status_updates_with_missing_data():
                 recentInteractions=[],
                 relationships=[]
             ),
-            'expected_updates': ["Location: Town Square", "Status: Injured", "Group: Alone"]
+            'expected_updates': ["Location: Town Square", "Status: Injured", "Group: With 1 others"]
         },
         {
             'name': 'minimal_data',